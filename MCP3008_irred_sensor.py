@@ -5,17 +5,24 @@ Description = SHARP IR sensor GP2Y0A21 control via ADC MCP3008 on Raspberry Pi 3
             = IR sensor measures distance using infrared reflection
             = MCP3008 channel 0 for IR sensor analog-to-digital conversion
             = Value range: 0.0 to 1.0 (representing 0V to 3.3V)
+            = Channel 0 is read by adc_engine.py: 64 conversions averaged per reading
+            = Distance comes from the 1024-entry lookup table built by ir_calibration.py
+            = (falls back to the datasheet formula until ir_lut.npz exists)
 '''
 
-from gpiozero import MCP3008
-from time import sleep
+from adc_engine import ADCEngine
+from ir_calibration import load_lut
+from robot_clock import sleep
 
 # Initialize IR sensor on MCP3008 channel 0
-ir_sensor = MCP3008(0)
+adc = ADCEngine(channels=(0,), rate_hz=10, oversample=64)
+ir_sensor = adc.channel(0)
 
 # Configuration
 REFERENCE_VOLTAGE = 3.3  # MCP3008 reference voltage (3.3V for Raspberry Pi)
 IR_SENSOR_MIN_VOLTAGE = 0.42  # Minimum voltage for GP2Y0A21 (no object detected)
+IR_LUT_FILE = 'ir_lut.npz'    # python ir_calibration.py fit ir_points.csv -o ir_lut.npz
+ir_lut = load_lut(IR_LUT_FILE)
 
 
 def get_voltage():
@@ -30,21 +37,17 @@ def get_voltage():
 
 def calculate_distance(voltage):
     """
-    Convert IR sensor voltage to distance using GP2Y0A21 formula.
+    Convert IR sensor voltage to distance using the GP2Y0A21 lookup table.
     
     Args:
         voltage: Voltage reading from sensor
     
     Returns:
-        float: Distance in centimeters (or -1 if calculation fails)
+        float: Distance in centimeters (inf if out of range, -1 if conversion fails)
     """
     try:
-        if voltage <= IR_SENSOR_MIN_VOLTAGE:
-            return float('inf')  # Object too far or out of range
-        
-        # GP2Y0A21 formula: distance = 27.86 / (voltage - 0.42)
-        distance = 27.86 / (voltage - IR_SENSOR_MIN_VOLTAGE)
-        return distance
+        # Table lookup by ADC code; no division per sample
+        return ir_lut.convert_voltage(voltage)
     except Exception as e:
         print(f"Error calculating distance: {e}")
         return -1
@@ -60,7 +63,10 @@ def main():
         print(f"Reference Voltage: {REFERENCE_VOLTAGE}V")
         print(f"Value Range: 0.0 to 1.0")
         print(f"Voltage Range: 0V to {REFERENCE_VOLTAGE}V")
+        print(f"Oversampling: {adc.oversample}x ({adc.effective_bits:.0f} effective bits)")
+        print(f"Distance table: {ir_lut.params.get('method')}")
         print("Press Ctrl+C to stop\n")
+        adc.start()
         
         while True:
             # Get raw value and voltage
@@ -68,7 +74,7 @@ def main():
             voltage = get_voltage()
             
             # Calculate distance
-            distance = calculate_distance(voltage)
+            distance = ir_lut.convert(ir_sensor.raw_value)
             
             # Display results
             print(f"Raw Value: {raw_value:.4f} | Voltage: {voltage:.2f}V | Distance: {distance:.2f} cm")
@@ -83,6 +89,9 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
 
+    finally:
+        adc.close()
+
 
 if __name__ == '__main__':
     main()
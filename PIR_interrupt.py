@@ -8,8 +8,9 @@ Description = Event-based interrupt handling for PIR sensor using gpiozero libra
 '''
 
 from gpiozero import MotionSensor
-from time import sleep
 import time
+import robot_clock
+from robot_clock import sleep
 
 # Initialize PIR sensor on GPIO 4 with debounce to avoid false triggers
 pir = MotionSensor(4, queue_len=1, sample_rate=10, threshold=0.5)
@@ -26,7 +27,7 @@ def on_motion():
     This runs asynchronously without blocking the main loop.
     """
     global motion_detected_time, motion_count, last_motion_event
-    motion_detected_time = time.time()
+    motion_detected_time = robot_clock.time()
     motion_count += 1
     last_motion_event = "Motion"
     print(f"[INTERRUPT] Motion detected! (Event #{motion_count})")
@@ -41,7 +42,7 @@ def on_no_motion():
     global last_motion_event
     last_motion_event = "No Motion"
     print(f"[INTERRUPT] No motion detected")
-    print(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime())}")
+    print(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime(robot_clock.time()))}")
 
 
 def get_motion_status():
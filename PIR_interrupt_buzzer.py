@@ -5,15 +5,18 @@ Description = Event-based interrupt handling for PIR sensor using gpiozero libra
             = Uses callback functions (when_motion and when_no_motion) for non-blocking motion detection
             = GPIO 4 on Raspberry Pi 3B
             = Allows the main program to continue running while monitoring PIR sensor
+            = The callbacks only queue the event; alarm_worker.py plays the buzzer pattern
 '''
 
 from gpiozero import MotionSensor, PWMOutputDevice
-from time import sleep
 import time
+from robot_clock import sleep
+from alarm_worker import AlarmWorker, beep_pattern, FINISHED
 
 # Initialize PIR sensor on GPIO 4 with debounce to avoid false triggers
 pir = MotionSensor(4, queue_len=1, sample_rate=10, threshold=0.5)
 buzzer = PWMOutputDevice(22, frequency=440, initial_value=0)
+INTRUDER_ALERT_COOLDOWN = 0    # Seconds before the buzzer pattern can sound again
 
 # Global state tracking
 motion_detected_time = 0
@@ -26,17 +29,7 @@ def on_motion():
     Callback function triggered when motion is detected.
     This runs asynchronously without blocking the main loop.
     """
-    global motion_detected_time, motion_count, last_motion_event
-    motion_detected_time = time.time()
-    motion_count += 1
-    last_motion_event = "Motion"
-    print(f"[INTERRUPT] Motion detected! (Event #{motion_count})")
-    print(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime(motion_detected_time))}")
-    for _ in range(10):
-        buzzer.value = 1.0  # Turn on buzzer
-        sleep(0.1)
-        buzzer.value = 0    # Turn off buzzer
-        sleep(0.1)
+    alarm_worker.push('motion')
 
 
 
@@ -45,10 +38,33 @@ def on_no_motion():
     Callback function triggered when motion stops.
     This runs asynchronously without blocking the main loop.
     """
-    global last_motion_event
-    last_motion_event = "No Motion"
-    print(f"[INTERRUPT] No motion detected")
-    print(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime())}")
+    alarm_worker.push('no_motion')
+
+
+def handle_alarm(event, outcome):
+    """
+    Runs on the alarm worker thread for every queued PIR event.
+    """
+    global motion_detected_time, motion_count, last_motion_event
+    if outcome == FINISHED:
+        return
+    if event.kind == 'motion':
+        motion_detected_time = event.wall_time
+        motion_count += 1
+        last_motion_event = "Motion"
+        print(f"[INTERRUPT] Motion detected! (Event #{motion_count}, buzzer {outcome})")
+    else:
+        last_motion_event = "No Motion"
+        print(f"[INTERRUPT] No motion detected")
+    print(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime(event.wall_time))}")
+
+
+alarm_worker = AlarmWorker(
+    buzzer,
+    {'motion': beep_pattern(10, on_time=0.1, off_time=0.1, value=1.0)},
+    cooldowns={'motion': INTRUDER_ALERT_COOLDOWN},
+    handler=handle_alarm,
+)
 
 
 
@@ -78,6 +94,7 @@ def main():
         # Attach callback functions to PIR sensor events
         pir.when_motion = on_motion
         pir.when_no_motion = on_no_motion
+        alarm_worker.start()
         
         # Main loop continues here while PIR events are handled in background
         cycle = 0
@@ -101,6 +118,7 @@ def main():
         
     finally:
         # Cleanup GPIO resources
+        alarm_worker.stop()
         pir.close()
         print("PIR sensor cleanup completed")
 
@@ -1,31 +1,13 @@
-from gpiozero.pins.pigpio import PiGPIOFactory
-from gpiozero import DistanceSensor
-import pigpio
+import hardware
 from time import sleep
+from hcsr04_pigpio import open_ultrasonic
+from servo_driver import SG90Servo
 
 SERVO_PIN = 18
-sensor = DistanceSensor(echo=15, trigger=14, max_distance = 4, pin_factory = PiGPIOFactory())
-
-pi = pigpio.pi()
-if not pi.connected:
-  exit()
-
-def set_angle(angle):
-  """
-  convert angle to pulse width and set servo position
-  angle : 0 -180 degrees
-  pulse width: 500 ~2500 microsecs
-  """
-  if not 0 <= angle <= 180:
-    raise ValueError("Angle must be between 0 and 180 degrees")
-
-  # convert angle to pulse width (microseconds)
-  # 500us (0 deg) to 2500us (180 deg)
-  pulse_width = int (500+(angle* 2000/180))
-  pi.set_servo_pulsewidth(SERVO_PIN, pulse_width)
-
-def stop_servo():
-  pi.set_servo_pulse_width(SERVO_PIN,0)
+# Devices are created on first use and share one pigpio connection (hardware.py)
+hw = hardware.get_registry()
+sensor = hw.device('ultrasonic', lambda: open_ultrasonic(hw.pi, trigger=14, echo=15, max_distance = 4))
+servo = hw.device('servo', lambda: SG90Servo(hw.pi, SERVO_PIN))
 
 def get_distance():
     try:
@@ -36,18 +18,22 @@ def get_distance():
 
 
 def main():
+  try:
+    hw.connect()
+  except hardware.HardwareError as e:
+    exit(str(e))
+
   try:
     while True:
       for angle in range(0, 181, 30):
-        set_angle(angle)
+        servo.move_to(angle, wait=True)
         sleep(0.5)
 
   except KeyboardInterrupt:
     print("Program stopped by User")
 
   finally:
-    stop_servo()
-    pi.stop()
+    hw.close()
   
 if __name__ == '__main__':
   main()
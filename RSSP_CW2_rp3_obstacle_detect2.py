@@ -7,50 +7,34 @@ Description = Obstacle detection using SG90 microservo and ultrasonic sensor
             = Obstacle threshold: distance < 20cm
 '''
 
-from gpiozero.pins.pigpio import PiGPIOFactory
-from gpiozero import DistanceSensor
-import pigpio
-from time import sleep
+import hardware
+from robot_clock import sleep
+from hcsr04_pigpio import open_ultrasonic
+from servo_driver import SG90Servo
+from sweep_scan import SweepScanner, sweep_obstacles
+from avoidance_policy import AvoidancePolicy, ACTION_MESSAGES
 
 # Configuration
 SERVO_PIN = 18
 OBSTACLE_THRESHOLD_CM = 20
+AVOIDANCE_POLICY = AvoidancePolicy(n_sectors=3)  # sectors ordered LEFT, CENTER, RIGHT
 
 # Scan angles
 ANGLE_LEFT = 0      # Left direction
 ANGLE_CENTER = 90    # Center direction
 ANGLE_RIGHT = 180    # Right direction
+SWEEP_SCAN = False   # True = continuous servo sweep instead of 3 fixed angles (sweep_scan.py)
+ULTRASONIC_BACKEND = 'pigpio'  # 'pigpio' (hcsr04_pigpio.py) or 'gpiozero' (DistanceSensor)
 
-# Initialize ultrasonic sensor
-sensor = DistanceSensor(echo=15, trigger=14, max_distance=4, pin_factory=PiGPIOFactory())
-
-# Initialize pigpio
-pi = pigpio.pi()
-if not pi.connected:
-    exit("Failed to connect to pigpio daemon. Run 'sudo pigpiod' first.")
-
-
-def set_angle(angle):
-    """
-    Convert angle to pulse width and set servo position.
-    
-    Args:
-        angle: 0-180 degrees
-    
-    Pulse width: 500-2500 microseconds
-    """
-    if not 0 <= angle <= 180:
-        raise ValueError("Angle must be between 0 and 180 degrees")
-    
-    # Convert angle to pulse width (microseconds)
-    # 500µs (0°) to 2500µs (180°)
-    pulse_width = int(500 + (angle * 2000 / 180))
-    pi.set_servo_pulsewidth(SERVO_PIN, pulse_width)
+# Devices are created on first use and share one pigpio connection (hardware.py)
+hw = hardware.get_registry()
 
+# Initialize ultrasonic sensor
+sensor = hw.device('ultrasonic', lambda: open_ultrasonic(
+    hw.pi, trigger=14, echo=15, max_distance=4, backend=ULTRASONIC_BACKEND))
 
-def stop_servo():
-    """Stop sending pulses to servo to save power."""
-    pi.set_servo_pulsewidth(SERVO_PIN, 0)
+servo = hw.device('servo', lambda: SG90Servo(hw.pi, SERVO_PIN))
+sweep_scanner = hw.device('sweep_scanner', lambda: SweepScanner(hw.pi, SERVO_PIN, sensor), close=None)
 
 
 def get_distance_cm():
@@ -93,6 +77,9 @@ def scan_obstacles():
             - 'center_distance': float (distance in cm)
             - 'right_distance': float (distance in cm)
     """
+    if SWEEP_SCAN:
+        return scan_obstacles_sweep()
+
     print("=" * 60)
     print("Scanning for obstacles...")
     print("=" * 60)
@@ -101,8 +88,7 @@ def scan_obstacles():
     
     # Scan LEFT direction (45 degrees)
     print("\n[LEFT] Scanning at 45°...")
-    set_angle(ANGLE_LEFT)
-    sleep(0.5)
+    servo.move_to(ANGLE_LEFT, wait=True)
     left_distance = get_distance_cm()
     left_obstacle = detect_obstacle(left_distance)
     results['left'] = left_obstacle
@@ -111,8 +97,7 @@ def scan_obstacles():
     
     # Scan CENTER direction (90 degrees)
     print("\n[CENTER] Scanning at 90°...")
-    set_angle(ANGLE_CENTER)
-    sleep(0.5)
+    servo.move_to(ANGLE_CENTER, wait=True)
     center_distance = get_distance_cm()
     center_obstacle = detect_obstacle(center_distance)
     results['center'] = center_obstacle
@@ -121,8 +106,7 @@ def scan_obstacles():
     
     # Scan RIGHT direction (135 degrees)
     print("\n[RIGHT] Scanning at 135°...")
-    set_angle(ANGLE_RIGHT)
-    sleep(0.5)
+    servo.move_to(ANGLE_RIGHT, wait=True)
     right_distance = get_distance_cm()
     right_obstacle = detect_obstacle(right_distance)
     results['right'] = right_obstacle
@@ -130,14 +114,34 @@ def scan_obstacles():
     print(f"Distance: {right_distance:.2f} cm | Obstacle: {right_obstacle}")
     
     # Return servo to center
-    set_angle(ANGLE_CENTER)
-    sleep(0.5)
-    stop_servo()
-    sleep(0.5)
+    servo.move_to(ANGLE_CENTER, wait=True)
+    servo.detach()
     
     return results
 
 
+def scan_obstacles_sweep():
+    """
+    Continuous-sweep version of scan_obstacles().
+    The servo is ramped across LEFT..RIGHT while the sensor is read, and each
+    sector reports the closest distance seen inside it.
+
+    Returns:
+        dict: Same keys as scan_obstacles() plus
+            - 'profile': list of (timestamp, angle, distance_cm) readings
+    """
+    results = sweep_obstacles(
+        sweep_scanner,
+        {'left': ANGLE_LEFT, 'center': ANGLE_CENTER, 'right': ANGLE_RIGHT},
+        detect_obstacle,
+    )
+    print(f"[SWEEP] {len(results['profile'])} readings | "
+          f"LEFT {results['left_distance']:.2f} cm | "
+          f"CENTER {results['center_distance']:.2f} cm | "
+          f"RIGHT {results['right_distance']:.2f} cm")
+    return results
+
+
 def report_obstacles(results):
     """
     Print formatted obstacle detection report.
@@ -154,19 +158,18 @@ def report_obstacles(results):
     print("=" * 60)
     
     # Determine best direction to move
-    if not results['center']:
-        print("✓ CENTER is clear - Safe to move forward")
-    elif not results['left']:
-        print("✓ LEFT is clear - Turn left to avoid obstacles")
-    elif not results['right']:
-        print("✓ RIGHT is clear - Turn right to avoid obstacles")
-    else:
-        print("✗ All directions blocked - Reverse and try again")
+    action = AVOIDANCE_POLICY.decide((results['left'], results['center'], results['right']))
+    print(ACTION_MESSAGES[action])
     print()
 
 
 def main():
     """Main program loop for obstacle detection."""
+    try:
+        hw.connect()
+    except hardware.HardwareError as e:
+        exit(str(e))
+
     try:
         print("\n" + "=" * 60)
         print("Obstacle Detection System - SG90 Servo + Ultrasonic Sensor")
@@ -192,10 +195,8 @@ def main():
         
     finally:
         print("Returning servo to center position...")
-        set_angle(ANGLE_CENTER)
-        sleep(0.3)
-        stop_servo()
-        pi.stop()
+        servo.move_to(ANGLE_CENTER, wait=True)
+        hw.close()
         print("Cleanup completed")
 
 
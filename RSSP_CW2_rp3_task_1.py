@@ -1,50 +1,49 @@
-from gpiozero import LED
-from time import sleep
+import hardware
+from robot_clock import sleep
+from led_patterns import LedEngine, blink
 
-# pin setup
-LED_left = LED(17)
-LED_right = LED(27)
+# pin setup: created on first use (hardware.py)
+hw = hardware.get_registry()
+LED_left = hw.led(17)
+LED_right = hw.led(27)
+leds = hw.device('leds', lambda: LedEngine(left = LED_left, right = LED_right), close = 'stop')
 
 def LED_BLINK(count, interval, left = True, right = True):
-  """BLINK LEDs based on flags using toggle."""
-  for _ in range(count):
-    if left :
-      LED_left.toggle()
-    if right :
-      LED_right.toggle()
-    sleep(interval)
+  """BLINK LEDs based on flags: count toggles interval apart, in the background (led_patterns.py)."""
+  names = [name for name, chosen in (('left', left), ('right', right)) if chosen]
+  return leds.play(blink(2 * interval), *names, duration = count * interval)
   
   
 
 def forward():
-  LED_left.on()
-  LED_right.on()
+  leds.steady()
 
 def backward():
   # Both LEDs blink at 100ms for 2 seconds
-  LED_BLINK(count =20, interval = 0.1, left = True, right = True)
+  LED_BLINK(count =20, interval = 0.1, left = True, right = True).wait()
   sleep(1)
-  LED_left.off()
-  LED_right.off()  
+  leds.off()
 
 def right_turn():
-  LED_BLINK(count =20, interval = 0.1, left = False, right = True)
+  LED_BLINK(count =20, interval = 0.1, left = False, right = True).wait()
   sleep(1)
-  LED_left.off()
-  LED_right.off()  
+  leds.off()
   
 
 def left_turn():
-  LED_BLINK(count =20, interval = 0.1, left = True, right = False)
+  LED_BLINK(count =20, interval = 0.1, left = True, right = False).wait()
   sleep(1)
-  LED_left.off()
-  LED_right.off()  
+  leds.off()
 
 def stop():
-  LED_left.off()
-  LED_right.off()  
+  leds.off()
 
 def main():
+  try:
+    hw.connect()
+  except hardware.HardwareError as e:
+    exit(str(e))
+
   try:
     while True:
       forward()
@@ -60,8 +59,7 @@ def main():
   except KeyboardInterrupt:
     print("Program stopped by User")
   finally:
-    LED_left.off()
-    LED_right.off()
+    hw.close()
 
 if __name__ == "__main__":
   main()
\ No newline at end of file
@@ -37,41 +37,157 @@ Description : This is a python code for Raspberry Pi 3B to integrate multiple se
 
 """
 # Import necessary libraries
-from gpiozero import LED, MCP3008, MotionSensor, DistanceSensor,PWMOutputDevice
-from gpiozero.pins.pigpio import PiGPIOFactory
-import pigpio
-from time import sleep
 import time
-
-
-battery_low_threshold = 3.0  # example threshold for low battery
+import hardware
+import robot_clock
+from robot_clock import sleep
+from sweep_scan import SweepScanner, sweep_obstacles
+from distance_sampler import DistanceSampler
+from hcsr04_pigpio import open_ultrasonic
+from avoidance_policy import AvoidancePolicy, ACTION_MESSAGES
+from telemetry import open_writer
+from latency_metrics import LatencyMetrics
+from alarm_worker import AlarmWorker, beep_pattern, STARTED, SUPPRESSED, FINISHED
+from led_patterns import LedEngine, blink
+from pir_events import PirEvents
+from adc_engine import ADCEngine
+from ir_calibration import load_lut
+from range_fusion import RangeFusion
+from robot_params import ParamError, ParamStore
+from battery_monitor import BatteryMonitor, format_duration
+from scan_scheduler import ScanScheduler
+from servo_driver import SG90Servo
+from tone_sequencer import ToneSequencer
+
+
+battery_low_threshold = 3.0  # Per-cell voltage (2S pack) below which the battery is low
 
 # Configuration
 OBSTACLE_THRESHOLD_CM = 16
 MOVEMENT_COUNTER_LIMIT = 5
-INTRUDER_ALERT_COOLDOWN = 30
+INTRUDER_ALERT_COOLDOWN = 30   # Seconds before the intruder alarm pattern can sound again
+LOW_BATTERY_ALERT_COOLDOWN = 60
+
+# Battery monitor (battery_monitor.py): filtered in the background, patrol reads the cached state
+REGULATOR_MIN_VOLTAGE = 3.2
+BATTERY_DIVIDER = 3.0       # Divider ratio into ADC channel 1 (2S LiPo ~7.4V)
+BATTERY_CELLS = 2
+
+# Obstacle avoidance rules (avoidance_policy.py), sectors ordered LEFT, CENTER, RIGHT
+AVOIDANCE_POLICY = AvoidancePolicy(n_sectors=3)
 
 # Scan angles
 ANGLE_LEFT = 180      # Left direction
 ANGLE_CENTER = 90    # Center direction
 ANGLE_RIGHT = 0    # Right direction
-
-# GPIO Initialization 
-pi = pigpio.pi()
-if not pi.connected:
-    exit("Failed to connect to pigpio daemon. Run 'sudo pigpiod' first.")
+SWEEP_SCAN = False  # True = continuous servo sweep instead of 3 fixed angles (sweep_scan.py)
+
+# Adaptive scanning (scan_scheduler.py): read only the center while the way ahead is clearly open
+ADAPTIVE_SCAN = True
+SCAN_CLEAR_MARGIN_CM = 30   # Full scan once the center is within OBSTACLE_THRESHOLD_CM + margin
+SCAN_MAX_SKIPS = 4          # Full scan at least every 5 steps to look at the sides
+
+# Buzzer: True = alarm patterns played as pigpio waveforms (tone_sequencer.py), False = PWMOutputDevice
+BUZZER_WAVES = True
+
+# HC-SR04 backend (hcsr04_pigpio.py): 'pigpio' = daemon-timed echo ticks, 'gpiozero' = DistanceSensor
+ULTRASONIC_BACKEND = 'pigpio'
+ULTRASONIC_RATE_HZ = 25     # Continuous ranging rate of the pigpio backend (20-40 Hz)
+
+# Background distance sampling (distance_sampler.py)
+DISTANCE_SAMPLE_RATE_HZ = 20
+DISTANCE_WINDOW_S = 0.3     # Only use samples from the last 0.3 s (servo already settled)
+DISTANCE_FILTER = 'median'  # 'median', 'hampel' or 'raw'
+NO_READING_CM = 999         # Reported when no fresh sample is available
+
+# Telemetry (telemetry.py) - view with: python telemetry_reader.py robot_telemetry.bin --follow
+TELEMETRY_FILE = 'robot_telemetry.bin'    # None = no telemetry
+CONSOLE_OUTPUT = True      # False = no console output at all, use the telemetry file instead
+
+# PIR rise / fall history (pir_events.py) - report with: python pir_events.py robot_pir_events.bin
+PIR_PIN = 4
+PIR_EVENTS_FILE = 'robot_pir_events.bin'  # None = keep the history in memory only
+PIR_DEBOUNCE_S = 0.05       # A rise and fall closer than this are a glitch
+PIR_RATE_WINDOW_S = 300     # "Triggers in the last 5 minutes" in the alarm message
+
+# Stage latency histograms (latency_metrics.py), ROBOT_METRICS=0 disables the timers
+METRICS_ADDRESS = '127.0.0.1:9105'   # or 'unix:/tmp/robot_metrics.sock', None = no endpoint
+
+# MCP3008 acquisition (adc_engine.py): every channel is oversampled and averaged in the background
+ADC_CHANNELS = (0, 1, 2)
+ADC_RATE_HZ = 10
+ADC_OVERSAMPLE = 16
+
+# Ultrasonic + IR Kalman fusion per servo heading (range_fusion.py)
+RANGE_FUSION = True
+IR_ADC_CHANNEL = 0          # SHARP GP2Y0A21 (GPIO.txt)
+IR_LUT_FILE = 'ir_lut.npz'  # ir_calibration.py output, datasheet curve if missing
+FUSION_MAX_STD_CM = 2.0     # Scan moves on once the estimate is this certain
+
+# Live tuning (robot_params.py): the settings below start from the constants above, PARAMS_FILE
+# overrides them and is re-read when edited, PARAMS_ADDRESS takes changes while the robot runs:
+#   python robot_params.py --address unix:/tmp/robot_params.sock OBSTACLE_THRESHOLD_CM=20
+PARAMS_FILE = 'robot_params.json'             # None = constants and socket only
+PARAMS_ADDRESS = 'unix:/tmp/robot_params.sock'  # None = no socket
+params = ParamStore({
+    'OBSTACLE_THRESHOLD_CM': float(OBSTACLE_THRESHOLD_CM),
+    'MOVEMENT_COUNTER_LIMIT': MOVEMENT_COUNTER_LIMIT,
+    'ANGLE_LEFT': ANGLE_LEFT,
+    'ANGLE_CENTER': ANGLE_CENTER,
+    'ANGLE_RIGHT': ANGLE_RIGHT,
+    'INTRUDER_ALERT_COOLDOWN': float(INTRUDER_ALERT_COOLDOWN),
+    'battery_low_threshold': battery_low_threshold,
+    'REGULATOR_MIN_VOLTAGE': REGULATOR_MIN_VOLTAGE,
+}, PARAMS_FILE, limits={
+    'OBSTACLE_THRESHOLD_CM': (2, 400),      # HC-SR04 range
+    'MOVEMENT_COUNTER_LIMIT': (1, None),
+    'ANGLE_LEFT': (0, 180),
+    'ANGLE_CENTER': (0, 180),
+    'ANGLE_RIGHT': (0, 180),
+    'INTRUDER_ALERT_COOLDOWN': (0, None),
+    'battery_low_threshold': (2.5, 4.2),    # LiPo cell
+    'REGULATOR_MIN_VOLTAGE': (0, 3.3),
+})
+
+# GPIO Initialization
+# Devices are declared here and created on first use (hardware.py); they share one pigpio
+# connection, and ROBOT_HARDWARE=mock runs the script without the robot
+hw = hardware.get_registry()
 # GPIO pin for servo
 SERVO_PIN = 18
-LEDLeft = LED(17)
-LEDRight = LED(27)
-spotlight = LED(5)
-obstacle_alert_led = LED(6)
-pir = MotionSensor(4, queue_len =1, sample_rate = 10, threshold =0.5)    # GPIO4
-v_regulation = MCP3008(0)  # assuming the sensor is connected to channel 0
-buzzer = PWMOutputDevice(22, frequency = 440, initial_value =0)
+LEDLeft = hw.led(17)
+LEDRight = hw.led(27)
+# Motion indicator patterns play in the background (led_patterns.py)
+leds = hw.device('leds', lambda: LedEngine(left=LEDLeft, right=LEDRight), close='stop')
+spotlight = hw.led(5)
+obstacle_alert_led = hw.led(6)
+pir = hw.motion_sensor(PIR_PIN, queue_len =1, sample_rate = 10, threshold =0.5)    # GPIO4
+pir_events = hw.device('pir_events', lambda: PirEvents(PIR_EVENTS_FILE, debounce_s=PIR_DEBOUNCE_S))
+adc = hw.device('adc', lambda: ADCEngine(ADC_CHANNELS, rate_hz=ADC_RATE_HZ, oversample=ADC_OVERSAMPLE))
+battery_level = hw.device('battery_level', lambda: adc.channel(1), close=None)
+voltage_monitor = hw.device('voltage_monitor', lambda: adc.channel(2), close=None)
+battery_monitor = hw.device('battery_monitor', lambda: BatteryMonitor(
+    battery_level, voltage_monitor, cells=BATTERY_CELLS, divider=BATTERY_DIVIDER,
+    cell_low_voltage=params.snapshot.battery_low_threshold,
+    regulator_min_voltage=params.snapshot.REGULATOR_MIN_VOLTAGE), close='stop')
+if BUZZER_WAVES:
+    buzzer = hw.device('buzzer', lambda: ToneSequencer(hw.pi, 22, frequency=440))
+else:
+    buzzer = hw.pwm_output(22, frequency = 440, initial_value =0)
 ultrasonic_echo = 15
 ultrasonic_trigger = 14
-sensor = DistanceSensor(echo=ultrasonic_echo, trigger=ultrasonic_trigger,max_distance=4, pin_factory=PiGPIOFactory())
+sensor = hw.device('ultrasonic', lambda: open_ultrasonic(
+    hw.pi, ultrasonic_trigger, ultrasonic_echo, max_distance=4, backend=ULTRASONIC_BACKEND,
+    rate_hz=ULTRASONIC_RATE_HZ))
+servo = hw.device('servo', lambda: SG90Servo(hw.pi, SERVO_PIN))
+sweep_scanner = hw.device('sweep_scanner', lambda: SweepScanner(hw.pi, SERVO_PIN, sensor), close=None)
+distance_sampler = hw.device('distance_sampler', lambda: DistanceSampler(sensor, rate_hz=DISTANCE_SAMPLE_RATE_HZ),
+                             close='stop')
+range_fusion = hw.device('range_fusion', lambda: RangeFusion(
+    distance_sampler, adc.channel(IR_ADC_CHANNEL), load_lut(IR_LUT_FILE)), close='stop')
+telemetry = hw.device('telemetry', lambda: open_writer(TELEMETRY_FILE))
+metrics = LatencyMetrics()
+scan_scheduler = ScanScheduler(OBSTACLE_THRESHOLD_CM, margin_cm=SCAN_CLEAR_MARGIN_CM, max_skips=SCAN_MAX_SKIPS)
 
 # Global state tracking
 motion_detected_time = 0
@@ -83,30 +199,51 @@ movement_counter = 0
 patrol_active = False
 
 # Functions
+def console(*args, **kwargs):
+    """print() that can be switched off with CONSOLE_OUTPUT."""
+    if CONSOLE_OUTPUT:
+        print(*args, **kwargs)
+
 def set_angle(angle):
     """
-    Convert angle to pulse width and set servo position
-    angle: 0-180 degrees
-    pulse width: 500-2500 microseconds
+    Start a profiled servo move (servo_driver.py) to 0-180 degrees.
+    The range fusion drops readings until the driver's modelled settle time has passed.
     """
-    if not 0 <= angle <= 180:
-        raise ValueError("Angle must be between 0 and 180 degrees")
-    
-    # Convert angle to pulse width (microseconds)
-    # 500µs (0°) to 2500µs (180°)
-    pulse_width = int(500 + (angle * 2000 / 180))
-    pi.set_servo_pulsewidth(SERVO_PIN, pulse_width)
-
-def stop_servo():
-    pi.set_servo_pulsewidth(SERVO_PIN, 0)
+    range_fusion.point(angle, settle=servo.move_to(angle))
 
 def get_distance_cm():
-    try:
-        sleep(0.1)
-        return sensor.distance * 100  # convert to cm and sensor is 
-    except Exception as e:
-        print(f"Error reading distance: {e}")
+    """
+    Get the latest filtered distance from the background sampler (non-blocking).
+    With RANGE_FUSION this is the fused ultrasonic + IR estimate for the current heading.
 
+    Returns:
+        float: Distance in cm, or NO_READING_CM if no fresh sample is available
+    """
+    if not distance_sampler.running:
+        distance_sampler.start()
+    if RANGE_FUSION:
+        fused = range_fusion.estimate()
+        if fused is not None and fused.time >= range_fusion.settle_until:
+            return fused.distance
+    distance = distance_sampler.filtered(DISTANCE_FILTER, max_age=DISTANCE_WINDOW_S)
+    if distance is None:
+        console(f"Error reading distance: no sample in the last {DISTANCE_WINDOW_S}s "
+              f"({distance_sampler.errors} read errors)")
+        return NO_READING_CM
+    return distance
+
+
+
+def wait_for_range(timeout):
+    """
+    Wait for the servo to settle at its new angle.
+    With RANGE_FUSION, returns as soon as the fused estimate has converged (at most timeout).
+    Otherwise waits for the modelled settle time plus one sampler window of settled readings.
+    """
+    if RANGE_FUSION:
+        range_fusion.wait(FUSION_MAX_STD_CM, timeout)
+    else:
+        servo.wait(margin=min(DISTANCE_WINDOW_S, timeout))
 
 
 def detect_obstacle(distance):
@@ -119,7 +256,7 @@ def detect_obstacle(distance):
     Returns:
         bool: True if obstacle detected (distance < 20cm), False otherwise
     """
-    return distance < OBSTACLE_THRESHOLD_CM
+    return distance < params.snapshot.OBSTACLE_THRESHOLD_CM
 
 
 def scan_obstacles():
@@ -135,51 +272,131 @@ def scan_obstacles():
             - 'center_distance': float (distance in cm)
             - 'right_distance': float (distance in cm)
     """
-    print("=" * 60)
-    print("Scanning for obstacles...")
-    print("=" * 60)
+    if SWEEP_SCAN:
+        with metrics.time('sweep_scan'):
+            return scan_obstacles_sweep()
+
+    console("=" * 60)
+    console("Scanning for obstacles...")
+    console("=" * 60)
     
     results = {}
+    p = params.snapshot     # One set of angles for the whole scan
     
     # Scan LEFT direction (45 degrees)
-    print("\n[LEFT] Scanning at 45°...")
-    set_angle(ANGLE_LEFT)
-    sleep(0.8)
-    left_distance = get_distance_cm()
+    console("\n[LEFT] Scanning at 45°...")
+    with metrics.time('servo_settle'):
+        set_angle(p.ANGLE_LEFT)
+        wait_for_range(0.8)
+    with metrics.time('ultrasonic_read'):
+        left_distance = get_distance_cm()
     left_obstacle = detect_obstacle(left_distance)
     results['left'] = left_obstacle
     results['left_distance'] = left_distance
-    print(f"Distance: {left_distance:.2f} cm | Obstacle: {left_obstacle}")
+    console(f"Distance: {left_distance:.2f} cm | Obstacle: {left_obstacle}")
     
     # Scan CENTER direction (90 degrees)
-    print("\n[CENTER] Scanning at 90°...")
-    set_angle(ANGLE_CENTER)
-    sleep(0.8)
-    center_distance = get_distance_cm()
+    console("\n[CENTER] Scanning at 90°...")
+    with metrics.time('servo_settle'):
+        set_angle(p.ANGLE_CENTER)
+        wait_for_range(0.8)
+    with metrics.time('ultrasonic_read'):
+        center_distance = get_distance_cm()
     center_obstacle = detect_obstacle(center_distance)
     results['center'] = center_obstacle
     results['center_distance'] = center_distance
-    print(f"Distance: {center_distance:.2f} cm | Obstacle: {center_obstacle}")
+    console(f"Distance: {center_distance:.2f} cm | Obstacle: {center_obstacle}")
     
     # Scan RIGHT direction (135 degrees)
-    print("\n[RIGHT] Scanning at 135°...")
-    set_angle(ANGLE_RIGHT)
-    sleep(0.8)
-    right_distance = get_distance_cm()
+    console("\n[RIGHT] Scanning at 135°...")
+    with metrics.time('servo_settle'):
+        set_angle(p.ANGLE_RIGHT)
+        wait_for_range(0.8)
+    with metrics.time('ultrasonic_read'):
+        right_distance = get_distance_cm()
     right_obstacle = detect_obstacle(right_distance)
     results['right'] = right_obstacle
     results['right_distance'] = right_distance
-    print(f"Distance: {right_distance:.2f} cm | Obstacle: {right_obstacle}")
+    console(f"Distance: {right_distance:.2f} cm | Obstacle: {right_obstacle}")
+    telemetry.scan(left_distance, center_distance, right_distance,
+                   (left_obstacle, center_obstacle, right_obstacle))
     
     # Return servo to center
-    set_angle(ANGLE_CENTER)
-    sleep(0.5)
-    stop_servo()
-    sleep(0.5)
+    with metrics.time('servo_return'):
+        set_angle(p.ANGLE_CENTER)
+        servo.wait()
+        servo.detach()
     
     return results
 
 
+def scan_center():
+    """
+    Fast path of the adaptive scan: read only the center heading.
+
+    Returns:
+        float: Center distance in cm
+    """
+    with metrics.time('servo_settle'):
+        set_angle(params.snapshot.ANGLE_CENTER)
+        wait_for_range(0.8)
+    with metrics.time('ultrasonic_read'):
+        distance = get_distance_cm()
+    servo.detach()
+    return distance
+
+
+def scheduled_scan():
+    """
+    scan_obstacles(), skipped when the center reading alone shows the way ahead is open.
+
+    Returns:
+        dict: Same keys as scan_obstacles(); a skipped scan has 'fast': True and
+              repeats the side results of the last full scan
+    """
+    if not ADAPTIVE_SCAN:
+        return scan_obstacles()
+    decision = scan_scheduler.check(scan_center())
+    if not decision.full:
+        console(f"[SCAN] Fast path - CENTER {decision.center_cm:.2f} cm clear, full scan skipped")
+        return scan_scheduler.fast_results(decision)
+    console(f"[SCAN] Full scan needed ({decision.reason})")
+    results = scan_obstacles()
+    scan_scheduler.full_scan_done(results)
+    return results
+
+
+def scan_obstacles_sweep():
+    """
+    Continuous-sweep version of scan_obstacles().
+    The servo is ramped across LEFT..RIGHT while the sensor is read, and each
+    sector reports the closest distance seen inside it.
+
+    Returns:
+        dict: Same keys as scan_obstacles() plus
+            - 'profile': list of (timestamp, angle, distance_cm) readings
+    """
+    p = params.snapshot
+    # The sweep writes the GPIO18 pulses itself: stop the driver's profile, start from its
+    # position estimate and hand the end angle back so the next move_to() settles correctly
+    servo.detach()
+    sweep_scanner.last_angle = servo.angle
+    results = sweep_obstacles(
+        sweep_scanner,
+        {'left': p.ANGLE_LEFT, 'center': p.ANGLE_CENTER, 'right': p.ANGLE_RIGHT},
+        detect_obstacle,
+    )
+    servo.set_position(sweep_scanner.last_angle)
+    console(f"[SWEEP] {len(results['profile'])} readings | "
+          f"LEFT {results['left_distance']:.2f} cm | "
+          f"CENTER {results['center_distance']:.2f} cm | "
+          f"RIGHT {results['right_distance']:.2f} cm")
+    telemetry.scan(results['left_distance'], results['center_distance'], results['right_distance'],
+                   (results['left'], results['center'], results['right']),
+                   readings=len(results['profile']), sweep=True)
+    return results
+
+
 def report_obstacles(results):
     """
     Print formatted obstacle detection report.
@@ -187,113 +404,148 @@ def report_obstacles(results):
     Args:
         results: Dictionary returned from scan_obstacles()
     """
-    print("\n" + "=" * 60)
-    print("OBSTACLE DETECTION REPORT")
-    print("=" * 60)
-    print(f"LEFT (45°)    : {results['left']:5} | Distance: {results['left_distance']:6.2f} cm")
-    print(f"CENTER (90°)  : {results['center']:5} | Distance: {results['center_distance']:6.2f} cm")
-    print(f"RIGHT (135°)  : {results['right']:5} | Distance: {results['right_distance']:6.2f} cm")
-    print("=" * 60)
+    console("\n" + "=" * 60)
+    console("OBSTACLE DETECTION REPORT")
+    console("=" * 60)
+    console(f"LEFT (45°)    : {results['left']:5} | Distance: {results['left_distance']:6.2f} cm")
+    console(f"CENTER (90°)  : {results['center']:5} | Distance: {results['center_distance']:6.2f} cm")
+    console(f"RIGHT (135°)  : {results['right']:5} | Distance: {results['right_distance']:6.2f} cm")
+    console("=" * 60)
     
     # Determine best direction to move
-    if not results['center']:
-        print("✓ CENTER is clear - Safe to move forward")
-    elif not results['left']:
-        print("✓ LEFT is clear - Turn left to avoid obstacles")
-    elif not results['right']:
-        print("✓ RIGHT is clear - Turn right to avoid obstacles")
-    else:
-        print("✗ All directions blocked - Reverse and try again")
-    print()
+    action = AVOIDANCE_POLICY.decide((results['left'], results['center'], results['right']))
+    console(ACTION_MESSAGES[action])
+    console()
 
 def stop_all():
-    LEDLeft.off()
-    LEDRight.off()
-    stop_servo()
+    leds.stop()
+    servo.detach()
     buzzer.value = 0
-    pi.stop()
+    hw.close()
 
 def LED_BLINK(count, interval, left=True, right=True):
-    for _ in range(count):
-#        if check_emergency_stop():
-#            return
-        if left:
-            LEDLeft.toggle()            
-        if right:
-            LEDRight.toggle()
-        sleep(interval)
-    
-    if left:
-        LEDLeft.off()
-    if right:
-        LEDRight.off()
+    """
+    Start `count` toggles `interval` apart on the chosen LEDs, then off.
+    Returns at once with the pattern's run (wait() for the end, cancel() to cut it short).
+    """
+    names = [name for name, chosen in (('left', left), ('right', right)) if chosen]
+    return leds.play(blink(2 * interval), *names, duration=count * interval)
 
 def forward():
-  LEDLeft.on()
-  LEDRight.on()
+  telemetry.move('forward', movement_counter=movement_counter)
+  leds.steady()
 
 def backward():
   # Both LEDs blink at 100ms for 2 seconds
-  LED_BLINK(count =20, interval = 0.1, left = True, right = True)
+  telemetry.move('backward', 3, movement_counter)
+  scan_scheduler.heading_changed()
+  LED_BLINK(count =20, interval = 0.1, left = True, right = True).wait()
   sleep(1)
-  LEDLeft.off()
-  LEDRight.off()  
+  leds.off()
 
 def right_turn():
-  LED_BLINK(count =20, interval = 0.1, left = False, right = True)
+  telemetry.move('right', 3, movement_counter)
+  scan_scheduler.heading_changed()
+  LED_BLINK(count =20, interval = 0.1, left = False, right = True).wait()
   sleep(1)
-  LEDLeft.off()
-  LEDRight.off()  
+  leds.off()
   
 
 def left_turn():
-  LED_BLINK(count =20, interval = 0.1, left = True, right = False)
+  telemetry.move('left', 3, movement_counter)
+  scan_scheduler.heading_changed()
+  LED_BLINK(count =20, interval = 0.1, left = True, right = False).wait()
   sleep(1)
-  LEDLeft.off()
-  LEDRight.off()  
+  leds.off()
 
 def stop():
-  LEDLeft.off()
-  LEDRight.off()  
+  telemetry.move('stop', movement_counter=movement_counter)
+  leds.off()
 
+@metrics.timed('alarm')
 def on_motion():
     """
     Callback function triggered when motion is detected.
-    Activates intruder alarm with buzzer and LED flashing.
+    Only queues the event; alarm_worker sounds the alarm (see handle_alarm).
     """
-    global motion_detected_time, motion_count, last_motion_event, alarm_active
-    motion_detected_time = time.time()
-    motion_count += 1
-    last_motion_event = "Motion"
-    alarm_active = True
-    print(f"\n[ALARM] Motion detected! (Event #{motion_count})")
-    print(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime(motion_detected_time))}")
-    spotlight.on()
-    # Sound alarm - buzzer + LED flash
-    for _ in range(5):
-        buzzer.value = 0.7      
-        sleep(0.3)
-        
-        buzzer.value = 0       
-        sleep(0.3)
-    
-    buzzer.value = 0
- 
-    print("[ALARM] Intruder alarm deactivated\n")
+    alarm_worker.push('motion')
 
 
 
+@metrics.timed('alarm_clear')
 def on_no_motion():
     """
     Callback function triggered when motion stops.
     """
-    global last_motion_event, alarm_active
-    last_motion_event = "No Motion"
-    alarm_active = False
-    buzzer.value = 0
-    spotlight.off()
-    print(f"[INTERRUPT] No motion detected")
-    print(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime())}\n")
+    alarm_worker.push('no_motion')
+
+
+def handle_alarm(event, outcome):
+    """
+    Runs on the alarm worker thread for every PIR event.
+    Intruder alarm = buzzer pattern (played by the worker) + spotlight.
+    """
+    global motion_detected_time, motion_count, last_motion_event, alarm_active
+    if event.kind == 'motion':
+        if outcome == FINISHED:
+            console("[ALARM] Intruder alarm deactivated\n")
+            return
+        motion_detected_time = event.wall_time
+        motion_count += 1
+        last_motion_event = "Motion"
+        alarm_active = True
+        telemetry.alarm('motion', motion_count)
+        spotlight.on()
+        if outcome == STARTED:
+            console(f"\n[ALARM] Motion detected! (Event #{motion_count})")
+        elif outcome == SUPPRESSED:
+            console(f"\n[ALARM] Motion detected! (Event #{motion_count}, alarm in cooldown)")
+        else:
+            console(f"\n[ALARM] Motion detected! (Event #{motion_count}, alarm already sounding)")
+        console(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime(motion_detected_time))}")
+        console(f"Triggers in the last {PIR_RATE_WINDOW_S // 60} min: {pir_events.count(PIR_RATE_WINDOW_S)}")
+    elif event.kind == 'no_motion':
+        last_motion_event = "No Motion"
+        alarm_active = False
+        telemetry.alarm('no_motion', motion_count)
+        spotlight.off()
+        console(f"[INTERRUPT] No motion detected")
+        console(f"Timestamp: {time.strftime('%H:%M:%S', time.localtime(event.wall_time))}\n")
+
+
+alarm_worker = hw.register('alarm_worker', AlarmWorker(
+    buzzer,
+    {'motion': beep_pattern(5, on_time=0.3, off_time=0.3, value=0.7),
+     'low_battery': beep_pattern(3, on_time=0.1, off_time=0.1, value=0.4)},
+    cooldowns={'motion': INTRUDER_ALERT_COOLDOWN, 'low_battery': LOW_BATTERY_ALERT_COOLDOWN},
+    handler=handle_alarm,
+    tones=BUZZER_WAVES,
+), close='stop')
+
+
+@params.on_change
+def apply_params(old, new):
+    """Hand changed parameters to the objects that keep their own copy (any thread)."""
+    scan_scheduler.threshold_cm = new.OBSTACLE_THRESHOLD_CM
+    alarm_worker.cooldowns['motion'] = new.INTRUDER_ALERT_COOLDOWN
+    if battery_monitor.created:
+        battery_monitor.cell_low_voltage = new.battery_low_threshold
+        battery_monitor.regulator_min_voltage = new.REGULATOR_MIN_VOLTAGE
+    changed = [f"{name}={value}" for name, value in new._asdict().items()
+               if name != 'version' and value != getattr(old, name)]
+    console(f"[PARAMS] Version {new.version}: {', '.join(changed)}")
+
+
+def start_params():
+    """Apply PARAMS_FILE and re-read it whenever it is edited (a bad file keeps the defaults)."""
+    hw.register('params', params)   # Closed with the devices; a reload replaces it
+    if PARAMS_FILE is None:
+        return
+    try:
+        params.load()
+    except (ParamError, ValueError, OSError) as e:
+        console(f"[PARAMS] {PARAMS_FILE} ignored: {e}")
+    params.watch()
 
 
 
@@ -329,56 +581,42 @@ def obstacle_avoidance_logic(left_obs, center_obs, right_obs):
     Returns:
         str: Action to take ("forward", "left", "right", "backward_left")
     """
-    # Convert to binary values
-    left = 1 if left_obs else 0
-    center = 1 if center_obs else 0
-    right = 1 if right_obs else 0
-    
-    # Apply truth table logic
-    if left == 0 and center == 0 and right == 0:
-        return "forward"  # 0 0 0
-    elif left == 0 and center == 0 and right == 1:
-        return "forward"  # 0 0 1
-    elif left == 0 and center == 1 and right == 0:
-        return "left"     # 0 1 0
-    elif left == 0 and center == 1 and right == 1:
-        return "left"     # 0 1 1
-    elif left == 1 and center == 0 and right == 0:
-        return "forward"  # 1 0 0
-    elif left == 1 and center == 0 and right == 1:
-        return "forward"  # 1 0 1
-    elif left == 1 and center == 1 and right == 0:
-        return "right"    # 1 1 0
-    elif left == 1 and center == 1 and right == 1:
-        return "backward_left"  # 1 1 1
-    
-    return "forward"  # Default action
+    # Truth table is precomputed from avoidance_policy.DEFAULT_RULES
+    return AVOIDANCE_POLICY.decide((left_obs, center_obs, right_obs))
  
 
-def check_voltage_regulation(min_voltage=3.2):
+def check_voltage_regulation(min_voltage=None):
     """
-    Check voltage regulation/battery level from MCP3008 channel 0.
+    Check voltage regulation (MCP3008 channel 2) and battery level (channel 1).
     
-    MCP3008 returns a normalized value (0.0-1.0) representing 0V to 3.3V.
-    If a voltage divider is used, multiply by voltage_divider to get actual battery voltage.
+    Uses the cached battery_monitor state: both voltages are already filtered and the
+    low flags have hysteresis, so one noisy sample cannot stop the patrol.
     
     Args:
-        min_voltage (float): Minimum safe voltage threshold in volts.
-        voltage_divider (float): Voltage divider ratio (default 3.0 for 2S LiPo ~7.4V).
+        min_voltage (float): Minimum safe regulator voltage in volts (None = REGULATOR_MIN_VOLTAGE parameter).
     
     Returns:
-        bool: True if voltage is OK or exceeds min_voltage; False if below threshold.
+        bool: True if regulation is OK and the battery is not low; False otherwise.
     """
+    p = params.snapshot
+    if min_voltage is None:
+        min_voltage = p.REGULATOR_MIN_VOLTAGE
     try:
-        # v_regulation is MCP3008(0) - reads normalized value 0.0-1.0
-        adc_value = v_regulation.value
-        # Convert to actual voltage: ADC reads 0V-3.3V at Pi reference
-        # If voltage divider is used, scale by divider ratio
-        actual_voltage = adc_value * 3.3 
-        print(f"[VOLTAGE] ADC: {adc_value:.3f} → {actual_voltage:.2f}V (min {min_voltage}V)")
-        return actual_voltage >= min_voltage
+        battery_monitor.regulator_min_voltage = min_voltage
+        state = battery_monitor.current()
+        if state is None:
+            raise RuntimeError(f"no battery reading ({battery_monitor.last_error})")
+        regulator = state.regulator_voltage
+        console(f"[VOLTAGE] Regulator: {regulator:.2f}V (min {min_voltage}V) | "
+                f"Battery: {state.pack_voltage:.2f}V ({state.cell_voltage:.2f}V/cell) "
+                f"{state.soc:.0f}% | Time left: {format_duration(state.time_to_empty)}")
+        telemetry.voltage(regulator / 3.3, regulator, min_voltage, state.regulation_ok)
+        if state.low:
+            console(f"[BATTERY] Battery low ({state.cell_voltage:.2f}V/cell < {p.battery_low_threshold}V) - charge it")
+            alarm_worker.push('low_battery')
+        return state.regulation_ok and not state.low
     except Exception as e:
-        print(f"[VOLTAGE] Voltage check error: {e}")
+        console(f"[VOLTAGE] Voltage check error: {e}")
         return True  # Safe default: allow movement on error
 
 
@@ -392,136 +630,196 @@ def patrol_logic():
     """
     global movement_counter, patrol_active
 
-    print("\n" + "=" * 70)
-    print("PATROL LOGIC STARTED - Flowchart-driven with Voltage Check")
-    print("=" * 70)
+    console("\n" + "=" * 70)
+    console("PATROL LOGIC STARTED - Flowchart-driven with Voltage Check")
+    console("=" * 70)
 
+    cycle_start = None
     while patrol_active:
+        # Full loop time, measured from one cycle start to the next
+        now = robot_clock.monotonic()
+        if cycle_start is not None:
+            metrics.observe('cycle', now - cycle_start)
+        cycle_start = now
+        p = params.snapshot     # Live-tuned settings, fixed for this cycle
+
         # Motion interrupt triggers are handled by on_motion(); here we run looped patrol
-        print(f"\n[STATE] Movement counter: {movement_counter} / {MOVEMENT_COUNTER_LIMIT}")
+        console(f"\n[STATE] Movement counter: {movement_counter} / {p.MOVEMENT_COUNTER_LIMIT}")
 
         # Voltage regulation check
-        if not check_voltage_regulation():
-            print("[VOLTAGE] Voltage too low - entering idle/charging mode")
+        with metrics.time('voltage_check'):
+            voltage_ok = check_voltage_regulation()
+        if not voltage_ok:
+            console("[VOLTAGE] Voltage too low - entering idle/charging mode")
+            telemetry.alarm('low_voltage', motion_count)
             stop()
             sleep(2)
             continue
 
-        if movement_counter < MOVEMENT_COUNTER_LIMIT:
+        if movement_counter < p.MOVEMENT_COUNTER_LIMIT:
             # Scan for obstacles and decide
-            print(f"[SCAN] Scanning obstacles BEFORE movement {movement_counter + 1}/{MOVEMENT_COUNTER_LIMIT}...")
-            scan_results = scan_obstacles()
+            console(f"[SCAN] Scanning obstacles BEFORE movement {movement_counter + 1}/{p.MOVEMENT_COUNTER_LIMIT}...")
+            with metrics.time('scan'):
+                scan_results = scheduled_scan()
             left_obstacle = scan_results['left']
             center_obstacle = scan_results['center']
             right_obstacle = scan_results['right']
 
-            action = obstacle_avoidance_logic(left_obstacle, center_obstacle, right_obstacle)
-            print(f"[LOGIC] LEFT:{left_obstacle} CENTER:{center_obstacle} RIGHT:{right_obstacle} → {action}")
-
-            if action == 'forward':
-                print(f"[MOVE] Forward movement {movement_counter + 1}/{MOVEMENT_COUNTER_LIMIT}")
-                forward()
-                sleep(2)
-                stop()
-                movement_counter += 1
-            elif action == 'left':
-                print("[AVOID] Turning LEFT to avoid obstacle")
-                #when obstacle detected ,obstacle_led will blink at 1s interval
-                obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
-                left_turn()
-            elif action == 'right':
-                print("[AVOID] Turning RIGHT to avoid obstacle")
-                #when obstacle detected ,obstacle_led will blink at 1s interval
-                obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
-                right_turn()
-            elif action == 'backward_left':
-                print("[AVOID] All blocked - moving BACKWARD then LEFT")
-                #when obstacle detected ,obstacle_led will blink at 1s interval
-                obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
-                backward()
-                left_turn()
-                movement_counter = 0
+            with metrics.time('decision'):
+                action = obstacle_avoidance_logic(left_obstacle, center_obstacle, right_obstacle)
+            console(f"[LOGIC] LEFT:{left_obstacle} CENTER:{center_obstacle} RIGHT:{right_obstacle} → {action}")
+            telemetry.decision((left_obstacle, center_obstacle, right_obstacle), action, movement_counter)
 
-        else:
-            # movement_counter reached limit; before turning right, check right obstacle
-            print("[CHECK] Reached movement limit - checking RIGHT before turning")
-            scan_results = scan_obstacles()
-            if scan_results['right']:
-                print("[CHECK] RIGHT is blocked - running avoidance logic")
-                # Use full obstacle avoidance based on current scan
-                action = obstacle_avoidance_logic(scan_results['left'], scan_results['center'], scan_results['right'])
+            with metrics.time('movement'):
                 if action == 'forward':
-                    #when obstacle detected ,obstacle_led will blink at 1s interval
-                    obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
-                    forward(); sleep(2); stop(); movement_counter += 1
+                    console(f"[MOVE] Forward movement {movement_counter + 1}/{p.MOVEMENT_COUNTER_LIMIT}")
+                    forward()
+                    sleep(2)
+                    stop()
+                    movement_counter += 1
                 elif action == 'left':
+                    console("[AVOID] Turning LEFT to avoid obstacle")
                     #when obstacle detected ,obstacle_led will blink at 1s interval
                     obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
                     left_turn()
                 elif action == 'right':
+                    console("[AVOID] Turning RIGHT to avoid obstacle")
                     #when obstacle detected ,obstacle_led will blink at 1s interval
                     obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
                     right_turn()
                 elif action == 'backward_left':
-                    backward(); left_turn(); movement_counter = 0
+                    console("[AVOID] All blocked - moving BACKWARD then LEFT")
+                    #when obstacle detected ,obstacle_led will blink at 1s interval
+                    obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
+                    backward()
+                    left_turn()
+                    movement_counter = 0
+
+        else:
+            # movement_counter reached limit; before turning right, check right obstacle
+            console("[CHECK] Reached movement limit - checking RIGHT before turning")
+            with metrics.time('scan'):
+                scan_results = scan_obstacles()
+            scan_scheduler.full_scan_done(scan_results)
+            if scan_results['right']:
+                console("[CHECK] RIGHT is blocked - running avoidance logic")
+                # Use full obstacle avoidance based on current scan
+                with metrics.time('decision'):
+                    action = obstacle_avoidance_logic(scan_results['left'], scan_results['center'], scan_results['right'])
+                telemetry.decision((scan_results['left'], scan_results['center'], scan_results['right']),
+                                   action, movement_counter)
+                with metrics.time('movement'):
+                    if action == 'forward':
+                        #when obstacle detected ,obstacle_led will blink at 1s interval
+                        obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
+                        forward(); sleep(2); stop(); movement_counter += 1
+                    elif action == 'left':
+                        #when obstacle detected ,obstacle_led will blink at 1s interval
+                        obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
+                        left_turn()
+                    elif action == 'right':
+                        #when obstacle detected ,obstacle_led will blink at 1s interval
+                        obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
+                        right_turn()
+                    elif action == 'backward_left':
+                        backward(); left_turn(); movement_counter = 0
             else:
-                print("[TURN] RIGHT is clear - perform corner turn (right)")
+                console("[TURN] RIGHT is clear - perform corner turn (right)")
                 right_turn()
                 movement_counter = 0
 
         sleep(0.5)
 
 
-def main():
-    """Main program loop for surveillance robot patrol."""
-    global motion_count, patrol_active
-
+def start_services():
+    """
+    Attach the PIR callbacks and start the background workers.
+    Safe to call again (robot_daemon calls it after every reload).
+    """
     # Attach callback functions to PIR sensor events
     pir.when_motion = on_motion
     pir.when_no_motion = on_no_motion
+    # Edge history timed by the pigpio daemon, next to gpiozero's smoothed callbacks
+    pir_events.attach(hw.pi, PIR_PIN)
+    start_params()
+    alarm_worker.start()
+    distance_sampler.start()
+    adc.start()
+    battery_monitor.start()
+    range_fusion.start()
+
+
+def main():
+    """Main program loop for surveillance robot patrol."""
+    global motion_count, patrol_active
+    metrics_server = None
+    try:
+        hw.connect()
+    except hardware.HardwareError as e:
+        exit(str(e))
 
     try:
-        print("\n" + "=" * 70)
-        print("SURVEILLANCE ROBOT - Simple Square Patrol")
-        print("=" * 70)
-        print("\nFEATURES:")
-        print("  • Forward movement with counter (5 iterations)")
-        print("  • 2 seconds per forward movement")
-        print("  • Right turn after every 5 movements")
-        print("  • LED indicators for movement")
-        print("  • PIR motion sensor with intruder alarm")
-        print("\nLED INDICATORS:")
-        print("  • Forward: Both LEDs ON")
-        print("  • Turn Right: Right LED blinks")
-        print("  • Stop: Both LEDs OFF")
-        print("\nPress Ctrl+C to stop\n")
+        console("\n" + "=" * 70)
+        console("SURVEILLANCE ROBOT - Simple Square Patrol")
+        console("=" * 70)
+        console("\nFEATURES:")
+        console("  • Forward movement with counter (5 iterations)")
+        console("  • 2 seconds per forward movement")
+        console("  • Right turn after every 5 movements")
+        console("  • LED indicators for movement")
+        console("  • PIR motion sensor with intruder alarm")
+        console("\nLED INDICATORS:")
+        console("  • Forward: Both LEDs ON")
+        console("  • Turn Right: Right LED blinks")
+        console("  • Stop: Both LEDs OFF")
+        console("\nPress Ctrl+C to stop\n")
         
         patrol_active = True
+        start_services()
+        if METRICS_ADDRESS:
+            try:
+                metrics_server = metrics.serve(METRICS_ADDRESS)
+                console(f"Latency metrics on {METRICS_ADDRESS}")
+            except OSError as e:
+                console(f"[METRICS] Cannot serve metrics on {METRICS_ADDRESS}: {e}")
+        if PARAMS_ADDRESS:
+            try:
+                params.serve(PARAMS_ADDRESS)
+                console(f"Parameters on {PARAMS_ADDRESS}")
+            except OSError as e:
+                console(f"[PARAMS] Cannot take parameters on {PARAMS_ADDRESS}: {e}")
         
         # Start patrol
         patrol_logic()
         
     except KeyboardInterrupt:
-        print("\n" + "=" * 70)
-        print("Program stopped by user")
-        print(f"Total motion events: {motion_count}")
-        print("=" * 70)
+        console("\n" + "=" * 70)
+        console("Program stopped by user")
+        console(f"Total motion events: {motion_count}")
+        console("=" * 70)
         
     except Exception as e:
-        print(f"Error: {e}")
+        console(f"Error: {e}")
         
     finally:
         # Cleanup
-        print("\nCleaning up...")
+        console("\nCleaning up...")
         patrol_active = False
+        alarm_worker.stop()
         stop()
         buzzer.value = 0
         set_angle(90)
-        time.sleep(0.3)
-        stop_servo()
-        pir.close()
-        pi.stop()
-        print("Cleanup completed")
+        servo.wait()
+        # Background workers, devices, then the pigpio connection
+        hw.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        if metrics.enabled:
+            console(metrics.summary())
+        if ADAPTIVE_SCAN:
+            console(scan_scheduler.summary())
+        console("Cleanup completed")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,332 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Cooperative asyncio version of the surveillance robot patrol (RSSP_CW2_surveillance_robot.py)
+            = Scanning, movement, LED patterns, voltage check and alarm handling run as separate
+            = asyncio tasks on one event loop instead of one long chain of sleep() calls:
+            = - scan_task    : sweeps LEFT / CENTER / RIGHT continuously and publishes every reading
+            = - patrol_task  : decides on the latest full scan (same truth table + movement counter)
+            = - led_task     : drives the motion LEDs from the current movement mode
+            = - voltage_task : checks the regulator voltage in the background
+            = - alarm_task   : plays the intruder alarm when the PIR callback fires
+            = A forward move is cut short as soon as the scanner sees an obstacle in the centre,
+            = so the robot no longer reacts 2 s late. Each patrol iteration is timed and reported.
+'''
+
+import asyncio
+
+import hardware
+import robot_clock
+import RSSP_CW2_surveillance_robot as robot
+from alarm_worker import beep_pattern
+from tone_sequencer import from_steps
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SERVO_SETTLE_S = 0.8          # Same settle time as scan_obstacles()
+FORWARD_DURATION_S = 2.0      # Time per forward movement
+TURN_DURATION_S = 3.0         # LED_BLINK(20 x 0.1 s) + sleep(1) in the blocking version
+BACKWARD_DURATION_S = 3.0
+LOW_VOLTAGE_IDLE_S = 2.0
+VOLTAGE_CHECK_INTERVAL_S = 1.0
+LOOP_PAUSE_S = 0.5            # Pause between patrol iterations (sleep(0.5) in patrol_logic)
+LOOP_REPORT_EVERY = 10        # Print cycles/minute summary every N iterations
+ALARM_TONE = from_steps(beep_pattern(5, on_time=0.3, off_time=0.3, value=0.7))
+
+SCAN_ANGLES = (
+    ('left', robot.ANGLE_LEFT),
+    ('center', robot.ANGLE_CENTER),
+    ('right', robot.ANGLE_RIGHT),
+)
+
+
+class PatrolState:
+    """Shared state between the patrol tasks (all access happens on the event loop thread)."""
+
+    def __init__(self):
+        self.distances = {'left': None, 'center': None, 'right': None}
+        self.scan_id = 0                    # Incremented after every complete sweep
+        self.scan_ready = asyncio.Event()   # Set when a new complete sweep is available
+        self.center_blocked = asyncio.Event()
+        self.alarm = asyncio.Event()
+        self.voltage_ok = True
+        self.led_mode = 'stop'
+        self.movement_counter = 0
+        self.iterations = 0
+        self.iteration_times = []
+        self.motion_count = 0
+
+    def scan_results(self):
+        """Return the latest readings in the same format as scan_obstacles()."""
+        results = {}
+        for name, distance in self.distances.items():
+            results[name] = distance is not None and robot.detect_obstacle(distance)
+            results[f'{name}_distance'] = distance
+        return results
+
+
+# ============================================================================
+# TASKS
+# ============================================================================
+
+async def scan_task(state):
+    """Sweep the servo continuously and publish each reading as soon as it is taken."""
+    while robot.patrol_active:
+        for name, angle in SCAN_ANGLES:
+            robot.set_angle(angle)
+            await asyncio.sleep(SERVO_SETTLE_S)
+            # Non-blocking: reads the background sampler's buffer
+            distance = robot.get_distance_cm()
+            state.distances[name] = distance
+            if name == 'center':
+                if robot.detect_obstacle(distance):
+                    state.center_blocked.set()
+                else:
+                    state.center_blocked.clear()
+        state.scan_id += 1
+        state.scan_ready.set()
+
+
+async def led_task(state, interval=0.1):
+    """Drive the motion LEDs from state.led_mode without blocking the other tasks."""
+    while robot.patrol_active:
+        mode = state.led_mode
+        if mode == 'forward':
+            robot.LEDLeft.on()
+            robot.LEDRight.on()
+        elif mode == 'left':
+            robot.LEDRight.off()
+            robot.LEDLeft.toggle()
+        elif mode == 'right':
+            robot.LEDLeft.off()
+            robot.LEDRight.toggle()
+        elif mode == 'backward':
+            robot.LEDLeft.toggle()
+            robot.LEDRight.value = robot.LEDLeft.value
+        else:
+            robot.LEDLeft.off()
+            robot.LEDRight.off()
+        await asyncio.sleep(interval)
+
+
+async def voltage_task(state):
+    """Check the regulator voltage periodically in the background."""
+    while robot.patrol_active:
+        state.voltage_ok = await asyncio.to_thread(robot.check_voltage_regulation)
+        await asyncio.sleep(VOLTAGE_CHECK_INTERVAL_S)
+
+
+async def alarm_task(state):
+    """Play the intruder alarm whenever the PIR callback signals motion."""
+    while robot.patrol_active:
+        await state.alarm.wait()
+        state.alarm.clear()
+        print(f"\n[ALARM] Motion detected! (Event #{state.motion_count})")
+        robot.spotlight.on()
+        if robot.BUZZER_WAVES:
+            # Beeps timed by the pigpio daemon (tone_sequencer.py); the task only waits for the end
+            await asyncio.sleep(robot.buzzer.play(ALARM_TONE))
+        else:
+            for _ in range(5):
+                robot.buzzer.value = 0.7
+                await asyncio.sleep(0.3)
+                robot.buzzer.value = 0
+                await asyncio.sleep(0.3)
+        print("[ALARM] Intruder alarm deactivated\n")
+
+
+# ============================================================================
+# MOVEMENT
+# ============================================================================
+
+async def move(state, mode, duration, interruptible=False):
+    """
+    Show a movement on the LEDs for the given duration.
+
+    Args:
+        state: PatrolState
+        mode: 'forward', 'left', 'right', 'backward' or 'stop'
+        duration: Movement time in seconds
+        interruptible: Stop early when the scanner reports a centre obstacle
+
+    Returns:
+        bool: True if the movement ran for the full duration
+    """
+    state.led_mode = mode
+    completed = True
+    try:
+        if interruptible:
+            try:
+                await asyncio.wait_for(state.center_blocked.wait(), duration)
+                completed = False
+                print("[MOVE] Centre obstacle detected - forward movement interrupted")
+            except asyncio.TimeoutError:
+                pass
+        else:
+            await asyncio.sleep(duration)
+    finally:
+        state.led_mode = 'stop'
+    return completed
+
+
+async def perform_action(state, action):
+    """Execute an obstacle_avoidance_logic() action."""
+    if action == 'forward':
+        print(f"[MOVE] Forward movement {state.movement_counter + 1}/{robot.MOVEMENT_COUNTER_LIMIT}")
+        if await move(state, 'forward', FORWARD_DURATION_S, interruptible=True):
+            state.movement_counter += 1
+        return
+    # when obstacle detected ,obstacle_led will blink at 1s interval (gpiozero background thread)
+    robot.obstacle_alert_led.blink(on_time=1, off_time=1, n=5)
+    if action == 'left':
+        print("[AVOID] Turning LEFT to avoid obstacle")
+        await move(state, 'left', TURN_DURATION_S)
+    elif action == 'right':
+        print("[AVOID] Turning RIGHT to avoid obstacle")
+        await move(state, 'right', TURN_DURATION_S)
+    elif action == 'backward_left':
+        print("[AVOID] All blocked - moving BACKWARD then LEFT")
+        await move(state, 'backward', BACKWARD_DURATION_S)
+        await move(state, 'left', TURN_DURATION_S)
+        state.movement_counter = 0
+
+
+async def wait_for_scan(state, last_scan_id):
+    """Wait until a complete sweep newer than last_scan_id is available."""
+    while state.scan_id <= last_scan_id:
+        state.scan_ready.clear()
+        await state.scan_ready.wait()
+    return state.scan_id
+
+
+def report_iteration(state, elapsed):
+    """Print the duration of one patrol iteration and a periodic throughput summary."""
+    state.iterations += 1
+    state.iteration_times.append(elapsed)
+    print(f"[LOOP] Iteration {state.iterations}: {elapsed:.3f} s")
+    if state.iterations % LOOP_REPORT_EVERY == 0:
+        recent = state.iteration_times[-LOOP_REPORT_EVERY:]
+        average = sum(recent) / len(recent)
+        print(f"[LOOP] Last {len(recent)} iterations: avg {average:.3f} s | "
+              f"max {max(recent):.3f} s | {60.0 / average:.1f} cycles/min")
+
+
+async def patrol_task(state):
+    """Decision loop following the same flowchart as patrol_logic()."""
+    print("\n" + "=" * 70)
+    print("PATROL LOGIC STARTED - asyncio event loop")
+    print("=" * 70)
+
+    last_scan_id = 0
+    while robot.patrol_active:
+        started = robot_clock.monotonic()
+
+        if not state.voltage_ok:
+            print("[VOLTAGE] Voltage too low - entering idle/charging mode")
+            await move(state, 'stop', LOW_VOLTAGE_IDLE_S)
+            report_iteration(state, robot_clock.monotonic() - started)
+            continue
+
+        last_scan_id = await wait_for_scan(state, last_scan_id)
+        results = state.scan_results()
+
+        if state.movement_counter < robot.MOVEMENT_COUNTER_LIMIT:
+            action = robot.obstacle_avoidance_logic(results['left'], results['center'], results['right'])
+            print(f"[LOGIC] LEFT:{results['left']} CENTER:{results['center']} RIGHT:{results['right']} → {action}")
+            await perform_action(state, action)
+        elif results['right']:
+            print("[CHECK] RIGHT is blocked - running avoidance logic")
+            action = robot.obstacle_avoidance_logic(results['left'], results['center'], results['right'])
+            await perform_action(state, action)
+        else:
+            print("[TURN] RIGHT is clear - perform corner turn (right)")
+            await move(state, 'right', TURN_DURATION_S)
+            state.movement_counter = 0
+
+        await asyncio.sleep(LOOP_PAUSE_S)
+        report_iteration(state, robot_clock.monotonic() - started)
+
+
+# ============================================================================
+# MAIN PROGRAM
+# ============================================================================
+
+async def run_patrol():
+    """Start all patrol tasks and run until one of them stops or fails."""
+    state = PatrolState()
+    loop = asyncio.get_running_loop()
+
+    def on_motion():
+        # gpiozero calls this from its own thread - hand the event to the loop and return
+        state.motion_count += 1
+        loop.call_soon_threadsafe(state.alarm.set)
+
+    def on_no_motion():
+        loop.call_soon_threadsafe(robot.spotlight.off)
+
+    robot.pir.when_motion = on_motion
+    robot.pir.when_no_motion = on_no_motion
+
+    tasks = [
+        asyncio.create_task(scan_task(state), name='scan'),
+        asyncio.create_task(led_task(state), name='led'),
+        asyncio.create_task(voltage_task(state), name='voltage'),
+        asyncio.create_task(alarm_task(state), name='alarm'),
+        asyncio.create_task(patrol_task(state), name='patrol'),
+    ]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()  # Re-raise a task failure
+    finally:
+        # A PIR edge after asyncio.run() returns must not reach the closed loop
+        robot.pir.when_motion = None
+        robot.pir.when_no_motion = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return state
+
+
+def main():
+    """Main program for the asyncio surveillance robot patrol."""
+    try:
+        robot.hw.connect()
+    except hardware.HardwareError as e:
+        exit(str(e))
+
+    try:
+        print("\n" + "=" * 70)
+        print("SURVEILLANCE ROBOT - asyncio Patrol")
+        print("=" * 70)
+        print("Press Ctrl+C to stop\n")
+
+        robot.patrol_active = True
+        # Sampler, ADC, battery monitor, range fusion and the params watch, as in the patrol script
+        robot.start_services()
+        asyncio.run(run_patrol())
+
+    except KeyboardInterrupt:
+        print("\n" + "=" * 70)
+        print("Program stopped by user")
+        print("=" * 70)
+
+    except Exception as e:
+        print(f"Error: {e}")
+
+    finally:
+        print("\nCleaning up...")
+        robot.patrol_active = False
+        robot.stop()
+        robot.buzzer.value = 0
+        robot.set_angle(robot.ANGLE_CENTER)
+        robot_clock.sleep(0.3)
+        robot.servo.detach()
+        # Background workers, devices, then the pigpio connection
+        robot.hw.close()
+        print("Cleanup completed")
+
+
+if __name__ == '__main__':
+    main()
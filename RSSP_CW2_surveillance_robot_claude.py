@@ -8,7 +8,7 @@ Description : Corrected Raspberry Pi 3B surveillance robot with multiple sensors
             : - Implemented proper battery voltage scaling
             : - Added alert debouncing
             : - Completed obstacle avoidance logic
-            : - Added emergency stop
+            : - Added emergency stop (button interrupt that cancels every output at once)
             : - Better state management
 
 Pin Assignments:
@@ -24,10 +24,14 @@ Pin Assignments:
         * Channel 2: Voltage monitor (optional - for additional monitoring)
 """
 
-from gpiozero import LED, MCP3008, MotionSensor, DistanceSensor, PWMOutputDevice, Button
-import pigpio
-from time import sleep
-import time
+import hardware
+import robot_clock
+from avoidance_policy import AvoidancePolicy
+from emergency_stop import Cancelled, EmergencyStop
+from hcsr04_pigpio import open_ultrasonic
+from led_patterns import LedEngine, blink
+from servo_driver import SETTLE_MARGIN_S, SG90Servo
+from tone_sequencer import ToneSequencer, tone, rest
 
 # ============================================================================
 # CONFIGURATION
@@ -39,11 +43,18 @@ BATTERY_REFERENCE_VOLTAGE = 3.3  # MCP3008 reference voltage
 
 # Obstacle detection
 OBSTACLE_DISTANCE_CM = 20
+AVOIDANCE_POLICY = AvoidancePolicy(n_sectors=3)  # sectors ordered LEFT, CENTER, RIGHT
+# Policy action -> best_direction returned by scan_surroundings()
+BEST_DIRECTION = {'forward': 'center', 'left': 'left', 'right': 'right', 'backward_left': 'reverse'}
 
 # Alert debounce times (seconds)
 INTRUDER_ALERT_COOLDOWN = 30
 LOW_BATTERY_ALERT_COOLDOWN = 60
 
+# Alert tones (tone_sequencer.py), one beep per LED blink, played by the pigpio daemon
+INTRUDER_TONE = (tone(440, 0.5, 0.5), rest(0.5))
+LOW_BATTERY_TONE = (tone(440, 0.5, 0.3), rest(0.5))
+
 # Servo scan angles
 SERVO_CENTER = 90
 SERVO_SCAN_RANGE = range(0, 181, 30)
@@ -51,25 +62,31 @@ SERVO_SCAN_RANGE = range(0, 181, 30)
 # Emergency stop button
 EMERGENCY_STOP_PIN = 27  # GPIO 27 for emergency stop button
 
+# Ultrasonic backend: 'pigpio' (hcsr04_pigpio.py, daemon-timed echo) or 'gpiozero' (DistanceSensor)
+ULTRASONIC_BACKEND = 'pigpio'
+
 # ============================================================================
 # GPIO INITIALIZATION
 # ============================================================================
-pi = pigpio.pi()
-if not pi.connected:
-    exit("Failed to connect to pigpio daemon. Run 'sudo pigpiod' first.")
+# Devices are created on first use and share one pigpio connection (hardware.py)
+hw = hardware.get_registry()
 
 # GPIO assignments
 SERVO_PIN = 18
-led_left = LED(17)
-led_right = LED(23)
-pir = MotionSensor(4)
-battery_sensor = MCP3008(1)  # Battery voltage monitoring
-voltage_monitor = MCP3008(2)  # Optional: additional voltage monitoring
-buzzer = PWMOutputDevice(22, frequency=440, initial_value=0)
-ultrasonic = DistanceSensor(echo=15, trigger=14)  # Primary distance sensor
-
-# Emergency stop button
-emergency_stop = Button(EMERGENCY_STOP_PIN, pull_up=True, bounce_time=0.1)
+servo = hw.device('servo', lambda: SG90Servo(hw.pi, SERVO_PIN))
+led_left = hw.led(17)
+led_right = hw.led(23)
+leds = hw.device('leds', lambda: LedEngine(left=led_left, right=led_right), close='stop')  # led_patterns.py
+pir = hw.motion_sensor(4)
+battery_sensor = hw.mcp3008(1)  # Battery voltage monitoring
+voltage_monitor = hw.mcp3008(2)  # Optional: additional voltage monitoring
+buzzer = hw.device('buzzer', lambda: ToneSequencer(hw.pi, 22, frequency=440))
+ultrasonic = hw.device('ultrasonic', lambda: open_ultrasonic(
+    hw.pi, trigger=14, echo=15, max_distance=4, backend=ULTRASONIC_BACKEND))  # Primary distance sensor
+
+# Emergency stop button: its falling edge stops every output at once (emergency_stop.py)
+emergency_stop = hw.device('emergency_stop', lambda: EmergencyStop(
+    EMERGENCY_STOP_PIN, stops=(leds.stop, servo.detach, buzzer.stop)))
 system_active = True
 
 # ============================================================================
@@ -77,7 +94,6 @@ system_active = True
 # ============================================================================
 last_intruder_alert = 0
 last_battery_alert = 0
-servo_angle = SERVO_CENTER
 
 # Obstacle detection zones
 left_obstacle = 0
@@ -88,22 +104,6 @@ right_obstacle = 0
 # UTILITY FUNCTIONS
 # ============================================================================
 
-def set_angle(angle):
-    """Convert angle to pulse width and set servo position"""
-    global servo_angle
-    if not 0 <= angle <= 180:
-        raise ValueError("Angle must be between 0 and 180 degrees")
-    
-    pulse_width = int(500 + (angle * 2000 / 180))
-    pi.set_servo_pulsewidth(SERVO_PIN, pulse_width)
-    servo_angle = angle
-
-
-def stop_servo():
-    """Stop sending pulses to servo to save power"""
-    pi.set_servo_pulsewidth(SERVO_PIN, 0)
-
-
 def get_distance_cm():
     """Get distance from ultrasonic sensor in centimeters"""
     try:
@@ -120,41 +120,42 @@ def get_battery_voltage():
 
 
 def check_emergency_stop():
-    """Check if emergency stop is activated"""
+    """Check if emergency stop is activated (the button interrupt has already stopped the outputs)"""
     global system_active
-    if emergency_stop.is_pressed:
-        system_active = False
-        stop_all()
-        print("=" * 50)
-        print("!!! EMERGENCY STOP ACTIVATED !!!")
-        print("System halted. Press Ctrl+C to exit.")
-        print("=" * 50)
+    if emergency_stop.tripped:
+        if system_active:
+            system_active = False
+            print("=" * 50)
+            print("!!! EMERGENCY STOP ACTIVATED !!!")
+            print(f"Outputs stopped {emergency_stop.last_latency * 1000:.1f} ms after the button edge")
+            print("System halted.")
+            print("=" * 50)
         return True
     return False
 
 
 def stop_all():
     """Stop all movement and turn off LEDs"""
-    led_left.off()
-    led_right.off()
+    leds.stop()
     buzzer.value = 0
 
 
+def wait_leds(run):
+    """Wait for an LED pattern to finish (raises Cancelled if the emergency stop trips)"""
+    emergency_stop.token.wait(run)
+
+
 def blink_leds(count, interval, left=True, right=True):
-    """Non-blocking LED blink with specified count and interval"""
-    for _ in range(count):
-        if check_emergency_stop():
-            return
-        if left:
-            led_left.toggle()
-        if right:
-            led_right.toggle()
-        sleep(interval)
-    # Ensure LEDs are off after blinking
-    if left:
-        led_left.off()
-    if right:
-        led_right.off()
+    """LED blink with specified count and interval, played in the background (led_patterns.py)"""
+    names = [name for name, chosen in (('left', left), ('right', right)) if chosen]
+    # Same timing as `count` toggles `interval` apart, then off
+    wait_leds(emergency_stop.token.run(leds.play, blink(2 * interval), *names, duration=count * interval))
+
+
+def move_servo(angle):
+    """Move the servo and wait until it has settled (raises Cancelled if the emergency stop trips)"""
+    token = emergency_stop.token
+    token.sleep(token.run(servo.move_to, angle) + SETTLE_MARGIN_S)
 
 # ============================================================================
 # MOVEMENT FUNCTIONS
@@ -162,9 +163,8 @@ def blink_leds(count, interval, left=True, right=True):
 
 def move_forward():
     """Forward movement - both LEDs on"""
-    led_left.on()
-    led_right.on()
-    sleep(1)
+    emergency_stop.token.run(leds.steady)
+    emergency_stop.token.sleep(1)
 
 
 def move_backward():
@@ -173,48 +173,29 @@ def move_backward():
 
 
 def turn_right():
-    """Right turn - right LED blinks at 10ms"""
-    led_left.off()
-    led_right.off()
+    """Right turn - right LED blinks at 10ms (the left LED goes off)"""
     blink_leds(50, 0.01, left=False, right=True)
 
 
 def turn_left():
-    """Left turn - left LED blinks at 10ms"""
-    led_left.off()
-    led_right.off()
+    """Left turn - left LED blinks at 10ms (the right LED goes off)"""
     blink_leds(50, 0.01, left=True, right=False)
 
 
 def stop_movement():
     """Stop - both LEDs off"""
     stop_all()
-    sleep(1)
+    emergency_stop.token.sleep(1)
 
 # ============================================================================
 # MAIN LOGIC FUNCTIONS
 # ============================================================================
 
 def patrol_logic():
-    """Execute basic patrol movements"""
-    if check_emergency_stop():
-        return
-    
+    """Execute basic patrol movements (an emergency stop ends it with Cancelled)"""
     move_forward()
-    
-    if check_emergency_stop():
-        return
-    
     move_backward()
-    
-    if check_emergency_stop():
-        return
-    
     turn_right()
-    
-    if check_emergency_stop():
-        return
-    
     turn_left()
     
     stop_movement()
@@ -233,32 +214,23 @@ def scan_surroundings():
     
     # Scan left zone (0-60 degrees)
     print("Scanning LEFT zone...")
-    set_angle(30)
-    sleep(0.3)
+    move_servo(30)
     distance = get_distance_cm()
     print(f"  Left: {distance:.1f} cm")
     if distance < OBSTACLE_DISTANCE_CM:
         left_obstacle = 1
     
-    if check_emergency_stop():
-        return "center"
-    
     # Scan center zone (60-120 degrees)
     print("Scanning CENTER zone...")
-    set_angle(90)
-    sleep(0.3)
+    move_servo(90)
     distance = get_distance_cm()
     print(f"  Center: {distance:.1f} cm")
     if distance < OBSTACLE_DISTANCE_CM:
         center_obstacle = 1
     
-    if check_emergency_stop():
-        return "center"
-    
     # Scan right zone (120-180 degrees)
     print("Scanning RIGHT zone...")
-    set_angle(150)
-    sleep(0.3)
+    move_servo(150)
     distance = get_distance_cm()
     print(f"  Right: {distance:.1f} cm")
     if distance < OBSTACLE_DISTANCE_CM:
@@ -268,20 +240,13 @@ def scan_surroundings():
     print(f"Obstacle Status: Left={left_obstacle}, Center={center_obstacle}, Right={right_obstacle}")
     
     # Determine best direction based on obstacle detection
-    if center_obstacle == 0:
-        best_direction = "center"
-    elif left_obstacle == 0:
-        best_direction = "left"
-    elif right_obstacle == 0:
-        best_direction = "right"
-    else:
-        best_direction = "reverse"  # All zones blocked
+    action = AVOIDANCE_POLICY.decide((left_obstacle, center_obstacle, right_obstacle))
+    best_direction = BEST_DIRECTION[action]
     
     print(f"Best direction: {best_direction}")
     
-    # Return servo to center
-    set_angle(SERVO_CENTER)
-    stop_servo()
+    # Return servo to center (pulses stop once it is idle)
+    emergency_stop.token.run(servo.move_to, SERVO_CENTER)
     
     return best_direction
 
@@ -298,9 +263,6 @@ def obstacle_avoidance():
     # Scan for obstacles in all zones
     best_direction = scan_surroundings()
     
-    if check_emergency_stop():
-        return
-    
     # Alert with blinking LEDs (1 second intervals)
     print("Obstacle avoidance alert...")
     blink_leds(3, 1.0, left=True, right=True)
@@ -313,25 +275,22 @@ def obstacle_avoidance():
     elif best_direction == "left":
         print("Turning LEFT to avoid obstacles")
         move_backward()
-        if not check_emergency_stop():
-            turn_left()
-            turn_left()  # Double turn for sharper angle
+        turn_left()
+        turn_left()  # Double turn for sharper angle
         
     elif best_direction == "right":
         print("Turning RIGHT to avoid obstacles")
         move_backward()
-        if not check_emergency_stop():
-            turn_right()
-            turn_right()  # Double turn for sharper angle
+        turn_right()
+        turn_right()  # Double turn for sharper angle
         
     else:  # best_direction == "reverse" (all zones blocked)
         print("All directions blocked! Reversing and turning around...")
         move_backward()
         move_backward()  # Reverse more
-        if not check_emergency_stop():
-            turn_right()
-            turn_right()
-            turn_right()  # Turn around ~135-180 degrees
+        turn_right()
+        turn_right()
+        turn_right()  # Turn around ~135-180 degrees
     
     print(f"Avoidance complete. Obstacle flags: L={left_obstacle}, C={center_obstacle}, R={right_obstacle}")
 
@@ -340,27 +299,16 @@ def intruder_alert():
     """Activate intruder alert with buzzer and LEDs"""
     global last_intruder_alert
     
-    current_time = time.time()
+    current_time = robot_clock.time()
     if current_time - last_intruder_alert < INTRUDER_ALERT_COOLDOWN:
         return  # Debounce - don't alert too frequently
     
     last_intruder_alert = current_time
     print("INTRUDER DETECTED! Activating alarm...")
     
-    # Turn on spotlight (represented by both LEDs)
-    led_left.on()
-    led_right.on()
-    
-    # Sound alarm with buzzer and blink LEDs
-    for _ in range(5):
-        if check_emergency_stop():
-            return
-        buzzer.value = 0.5
-        sleep(0.5)
-        buzzer.value = 0
-        led_left.toggle()
-        led_right.toggle()
-        sleep(0.5)
+    # Spotlight (represented by both LEDs) flashing with the alarm, one flash per beep
+    emergency_stop.token.run(buzzer.play, INTRUDER_TONE, repeat=5)
+    wait_leds(emergency_stop.token.run(leds.play, blink(1.0), duration=5.0))
     
     # Turn off LEDs after alert
     stop_all()
@@ -370,7 +318,7 @@ def low_battery_alert():
     """Alert user of low battery condition"""
     global last_battery_alert
     
-    current_time = time.time()
+    current_time = robot_clock.time()
     if current_time - last_battery_alert < LOW_BATTERY_ALERT_COOLDOWN:
         return  # Debounce - don't alert too frequently
     
@@ -379,15 +327,8 @@ def low_battery_alert():
     print(f"LOW BATTERY! Current voltage: {voltage:.2f}V - Please charge!")
     
     # Alert with buzzer and blinking LEDs
-    for _ in range(5):
-        if check_emergency_stop():
-            return
-        buzzer.value = 0.3
-        led_left.toggle()
-        led_right.toggle()
-        sleep(0.5)
-        buzzer.value = 0
-        sleep(0.5)
+    emergency_stop.token.run(buzzer.play, LOW_BATTERY_TONE, repeat=5)
+    wait_leds(emergency_stop.token.run(leds.play, blink(2.0), duration=5.0))
     
     stop_all()
 
@@ -398,18 +339,24 @@ def low_battery_alert():
 def main():
     """Main program loop"""
     global system_active
+    try:
+        hw.connect()
+    except hardware.HardwareError as e:
+        exit(str(e))
     
     print("=== Surveillance Robot Starting ===")
     print(f"Battery voltage threshold: {BATTERY_LOW_THRESHOLD}V")
     print(f"Obstacle detection distance: {OBSTACLE_DISTANCE_CM}cm")
     
-    # Initialize servo to center position
-    print("Initializing servo to center position...")
-    set_angle(SERVO_CENTER)
-    sleep(0.5)
-    stop_servo()
+    # Button edges stop the outputs from now on, whatever the loop is doing
+    emergency_stop.attach(hw.pi)
     
     try:
+        # Initialize servo to center position
+        print("Initializing servo to center position...")
+        move_servo(SERVO_CENTER)
+        servo.detach()
+        
         while system_active:
             # Check emergency stop
             if check_emergency_stop():
@@ -434,7 +381,10 @@ def main():
                 low_battery_alert()
             
             # Small delay between patrol cycles
-            sleep(0.5)
+            emergency_stop.token.sleep(0.5)
+    
+    except Cancelled:
+        check_emergency_stop()
     
     except KeyboardInterrupt:
         print("\nProgram stopped by user")
@@ -445,11 +395,10 @@ def main():
     finally:
         # Cleanup
         print("Shutting down...")
-        set_angle(SERVO_CENTER)
-        sleep(0.3)
-        stop_servo()
+        if not emergency_stop.tripped:  # After an emergency stop nothing moves again
+            servo.move_to(SERVO_CENTER, wait=True)
         stop_all()
-        pi.stop()
+        hw.close()
         print("Cleanup completed. System stopped.")
 
 
@@ -0,0 +1,263 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Multi-channel oversampled MCP3008 acquisition engine
+            = One scan reads every configured channel `oversample` times in back-to-back SPI
+            = transfers (precomputed 3-byte frames straight to spidev, no per-reading device
+            = objects), then decimates each channel to one averaged value. Averaging 4^n noisy
+            = samples adds n bits of effective resolution on top of the 10-bit converter.
+            = Scans run on a robot_clock timer at a fixed rate. After each scan:
+            = - the latest values are published as one immutable ADCSnapshot. Readers just take
+            =   the current reference, so they never wait on the acquisition thread
+            = - subscribers receive blocks of consecutive scans (NumPy arrays) through a queue
+            = engine.channel(n) gives a drop-in for gpiozero's MCP3008(n): .value, .raw_value, .voltage
+            = Channels (GPIO.txt): 0 = IR sensor, 1 = battery level, 2 = voltage monitor
+            = Without spidev (or /dev/spidev0.0), the engine reads through gpiozero MCP3008 objects.
+'''
+
+import math
+import queue
+from collections import namedtuple
+
+import numpy as np
+
+import robot_clock
+
+try:
+    import spidev
+except ImportError:
+    spidev = None
+
+REFERENCE_VOLTAGE = 3.3
+MAX_RAW = 1023
+DEFAULT_CHANNELS = (0, 1, 2)
+DEFAULT_RATE_HZ = 20            # Scans per second
+DEFAULT_OVERSAMPLE = 16         # Conversions averaged per channel per scan (+2 bits)
+DEFAULT_BLOCK_SCANS = 20        # Scans per subscriber block (1 s at 20 Hz)
+SPI_SPEED_HZ = 1_350_000        # MCP3008 maximum at 3.3 V
+
+ADCSnapshot = namedtuple('ADCSnapshot', 'seq time channels raw volts')
+ADCBlock = namedtuple('ADCBlock', 'first_seq times channels raw')
+
+
+class SpidevTransport:
+    """MCP3008 on the hardware SPI bus through spidev."""
+
+    def __init__(self, bus=0, device=0, speed_hz=SPI_SPEED_HZ):
+        if spidev is None:
+            raise OSError("spidev is not installed")
+        self.spi = spidev.SpiDev()
+        self.spi.open(bus, device)
+        self.spi.max_speed_hz = speed_hz
+        self.spi.mode = 0
+        self._frames = {}
+
+    def read(self, channel, count):
+        """`count` single-ended conversions of one channel, as raw counts."""
+        frame = self._frames.get(channel)
+        if frame is None:
+            # Start bit, single-ended + channel, then 8 clocks for the low result bits
+            frame = self._frames[channel] = (1, (8 + channel) << 4, 0)
+        xfer = self.spi.xfer2
+        total = 0
+        for _ in range(count):
+            reply = xfer(list(frame))
+            total += ((reply[1] & 3) << 8) | reply[2]
+        return total
+
+    def close(self):
+        self.spi.close()
+
+
+class GpiozeroTransport:
+    """Fallback through gpiozero MCP3008 devices (also used by robot_sim)."""
+
+    def __init__(self, channels):
+        import gpiozero
+        self.devices = {channel: gpiozero.MCP3008(channel) for channel in channels}
+
+    def read(self, channel, count):
+        device = self.devices[channel]
+        return sum(round(device.value * MAX_RAW) for _ in range(count))
+
+    def close(self):
+        for device in self.devices.values():
+            device.close()
+
+
+def open_transport(channels):
+    """spidev if the SPI device can be opened, otherwise gpiozero."""
+    try:
+        return SpidevTransport()
+    except OSError:
+        return GpiozeroTransport(channels)
+
+
+class ADCChannel:
+    """Read-only view of one engine channel with the gpiozero MCP3008 attributes."""
+
+    def __init__(self, engine, channel):
+        self.engine = engine
+        self.channel = channel
+        self.index = engine.channels.index(channel)
+
+    @property
+    def raw_value(self):
+        """Decimated reading in counts (fractional, 0-1023)."""
+        return self.engine.snapshot().raw[self.index]
+
+    @property
+    def value(self):
+        """Normalised reading 0.0-1.0, like MCP3008.value."""
+        return self.raw_value / MAX_RAW
+
+    @property
+    def voltage(self):
+        return self.engine.snapshot().volts[self.index]
+
+    def close(self):
+        pass
+
+
+class ADCEngine:
+    """
+    Scan several MCP3008 channels at a fixed rate with oversampling.
+
+    Args:
+        channels: MCP3008 channels to scan
+        rate_hz: Scans per second
+        oversample: Conversions averaged per channel in each scan
+        block_scans: Scans collected into one subscriber block
+        transport: Object with read(channel, count) -> summed raw counts (default: open_transport)
+        vref: ADC reference voltage
+    """
+
+    def __init__(self, channels=DEFAULT_CHANNELS, rate_hz=DEFAULT_RATE_HZ, oversample=DEFAULT_OVERSAMPLE,
+                 block_scans=DEFAULT_BLOCK_SCANS, transport=None, vref=REFERENCE_VOLTAGE):
+        self.channels = tuple(channels)
+        self.interval = 1.0 / rate_hz
+        self.oversample = oversample
+        self.block_scans = block_scans
+        self.vref = vref
+        self.transport = transport if transport is not None else open_transport(self.channels)
+        self.effective_bits = 10 + math.log2(oversample) / 2
+        self.scans = 0
+        self.errors = 0
+        self.last_error = None
+        self.dropped_blocks = 0
+        self._snapshot = None
+        self._subscribers = []
+        self._block_times = np.zeros(block_scans)
+        self._block_raw = np.zeros((block_scans, len(self.channels)), dtype=np.float32)
+        self._block_fill = 0
+        self._timer = None
+
+    @property
+    def running(self):
+        return self._timer is not None and self._timer.active
+
+    def start(self):
+        if not self.running:
+            self._timer = robot_clock.call_every(self.interval, self.scan, name='adc-engine')
+        return self
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def close(self):
+        self.stop()
+        self.transport.close()
+
+    def scan(self):
+        """Read and decimate every channel once, then publish (called by the clock timer)."""
+        try:
+            raw = tuple(self.transport.read(channel, self.oversample) / self.oversample
+                        for channel in self.channels)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            return None
+        now = robot_clock.monotonic()
+        scale = self.vref / MAX_RAW
+        snapshot = ADCSnapshot(self.scans, now, self.channels, raw, tuple(r * scale for r in raw))
+        # Publishing is a single reference assignment; readers never see a half-built scan
+        self._snapshot = snapshot
+        self.scans += 1
+        if self._subscribers:
+            self._add_to_block(snapshot)
+        return snapshot
+
+    def snapshot(self):
+        """Latest ADCSnapshot (takes one scan now if the engine has not produced any yet)."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.scan()
+            if snapshot is None:
+                raise OSError(f"MCP3008 read failed: {self.last_error}")
+        return snapshot
+
+    def latest(self):
+        """Latest ADCSnapshot, or None before the first scan (never reads the ADC)."""
+        return self._snapshot
+
+    def channel(self, channel):
+        """ADCChannel for one of the scanned channels."""
+        return ADCChannel(self, channel)
+
+    # --- streaming -----------------------------------------------------------
+
+    def subscribe(self, maxsize=8):
+        """
+        Receive ADCBlocks of `block_scans` consecutive scans.
+
+        Returns:
+            queue.Queue: Blocks are dropped (and counted) if the subscriber falls behind
+        """
+        subscriber = queue.Queue(maxsize)
+        self._subscribers = self._subscribers + [subscriber]
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self._subscribers = [s for s in self._subscribers if s is not subscriber]
+
+    def _add_to_block(self, snapshot):
+        self._block_times[self._block_fill] = snapshot.time
+        self._block_raw[self._block_fill] = snapshot.raw
+        self._block_fill += 1
+        if self._block_fill < self.block_scans:
+            return
+        block = ADCBlock(snapshot.seq - self.block_scans + 1, self._block_times.copy(),
+                         self.channels, self._block_raw.copy())
+        self._block_fill = 0
+        for subscriber in self._subscribers:
+            try:
+                subscriber.put_nowait(block)
+            except queue.Full:
+                self.dropped_blocks += 1
+
+
+def main():
+    """Read channels 0-2 for a few seconds and print the decimated values."""
+    engine = ADCEngine()
+    print(f"Transport: {type(engine.transport).__name__} | {len(engine.channels)} channels x "
+          f"{engine.oversample} samples @ {1 / engine.interval:.0f} Hz "
+          f"(~{engine.effective_bits:.1f} effective bits)")
+    blocks = engine.subscribe()
+    engine.start()
+    try:
+        for _ in range(5):
+            block = blocks.get()
+            means = block.raw.mean(axis=0) * engine.vref / MAX_RAW
+            text = " | ".join(f"CH{ch}: {v:.4f}V" for ch, v in zip(block.channels, means))
+            print(f"Block from scan {block.first_seq}: {text}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+        print(f"Scans: {engine.scans} | Errors: {engine.errors} | Dropped blocks: {engine.dropped_blocks}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Non-blocking alarm subsystem for the PIR callbacks
+            = gpiozero runs when_motion / when_no_motion on its own thread. If the callback plays
+            = the buzzer pattern itself, every edge that arrives during the 2-3 s of sleeps is delayed
+            = or merged. Here the callback only appends a timestamped event to a queue (about a
+            = microsecond) and a dedicated worker thread:
+            = - plays the buzzer pattern registered for the event kind
+            = - coalesces events that arrive while that pattern is still playing
+            = - suppresses a new pattern until the kind's cooldown has passed
+            = - calls the script's handler for prints, LEDs and state, off the callback thread
+            = With a tone_sequencer.ToneSequencer as the buzzer, a pattern is submitted once and
+            = the pigpio daemon times every beep; the worker only waits for the end of the pattern.
+            = Under robot_sim (VirtualClock) the worker is driven by a clock timer instead of a thread.
+            = Run this file to measure callback latency while an alarm is playing.
+'''
+
+import collections
+import threading
+from collections import namedtuple
+
+import robot_clock
+
+MAX_PENDING = 256           # Oldest events are dropped if the worker falls this far behind
+VIRTUAL_POLL_S = 0.05       # Worker period under VirtualClock
+
+AlarmEvent = namedtuple('AlarmEvent', 'kind time wall_time info')
+
+# Handler outcomes
+STARTED = 'started'         # Event started its pattern
+COALESCED = 'coalesced'     # Pattern for this kind was already playing
+SUPPRESSED = 'suppressed'   # Inside the kind's cooldown
+FINISHED = 'finished'       # Pattern done (event = the one that started it)
+NOTIFIED = 'notified'       # Kind has no pattern, handler only
+
+
+def beep_pattern(count, on_time, off_time, value=1.0):
+    """Buzzer steps for `count` beeps: tuple of (buzzer value, seconds)."""
+    return ((value, on_time), (0, off_time)) * count
+
+
+class AlarmWorker:
+    """
+    Play alarm patterns for queued events on a worker thread.
+
+    Args:
+        buzzer: Output device with a writable .value (gpiozero PWMOutputDevice / Buzzer),
+                or a ToneSequencer that plays whole patterns
+        patterns: dict of event kind -> steps from beep_pattern()
+        cooldowns: dict of event kind -> seconds before its pattern may start again
+        handler: function(event, outcome) run on the worker for every event and finished pattern
+        tones: True if the buzzer is a ToneSequencer (None = check when the first pattern starts,
+               so a hardware.LazyDevice buzzer is not created by the constructor)
+    """
+
+    def __init__(self, buzzer, patterns, cooldowns=None, handler=None, tones=None):
+        self.buzzer = buzzer
+        self.patterns = dict(patterns)
+        self.tones = tones
+        self._tones = None
+        self.cooldowns = dict(cooldowns or {})
+        self.handler = handler
+        self.stats = collections.Counter()
+        self.max_dispatch_delay = 0.0   # Longest time an event waited in the queue (s)
+        self._events = collections.deque(maxlen=MAX_PENDING)
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._timer = None
+        self._last_start = {}
+        self._playing = None            # (kind, event, steps)
+        self._step = 0
+        self._step_end = 0.0
+
+    # --- callback side -------------------------------------------------------
+
+    def push(self, kind, **info):
+        """Queue an event. Safe to call from any thread; never blocks."""
+        self._events.append(AlarmEvent(kind, robot_clock.monotonic(), robot_clock.time(), info))
+        self._wake.set()
+
+    def silence(self):
+        """Stop the pattern that is playing (queued like any other event)."""
+        self.push(None)
+
+    # --- worker side ---------------------------------------------------------
+
+    @property
+    def playing(self):
+        return None if self._playing is None else self._playing[0]
+
+    def _notify(self, event, outcome):
+        self.stats[outcome] += 1
+        if self.handler is not None:
+            try:
+                self.handler(event, outcome)
+            except Exception as e:
+                print(f"[ALARM] Handler error: {e}")
+
+    def _compiled_tones(self):
+        """ToneSequencer notes per kind (compiled once, played by the pigpio daemon), or None."""
+        if self.tones is None:
+            self.tones = hasattr(self.buzzer, 'play')
+        if self.tones and self._tones is None:
+            import tone_sequencer
+            self._tones = {kind: tone_sequencer.from_steps(steps) for kind, steps in self.patterns.items()}
+        return self._tones
+
+    def _start_pattern(self, event, now):
+        steps = self.patterns[event.kind]
+        if self._compiled_tones() is not None:
+            # One step lasting the whole pattern: nothing to switch until it ends
+            steps = ((None, self.buzzer.play(self._tones[event.kind])),)
+        else:
+            self.buzzer.value = steps[0][0]
+        self._playing = (event.kind, event, steps)
+        self._last_start[event.kind] = now
+        self._step = 0
+        self._step_end = now + steps[0][1]
+        self._notify(event, STARTED)
+
+    def _finish_pattern(self):
+        _, event, _ = self._playing
+        self._playing = None
+        self.buzzer.value = 0
+        self._notify(event, FINISHED)
+
+    def _handle(self, event, now):
+        self.max_dispatch_delay = max(self.max_dispatch_delay, now - event.time)
+        if event.kind is None:
+            if self._playing is not None:
+                self._finish_pattern()
+            return
+        if event.kind not in self.patterns:
+            self._notify(event, NOTIFIED)
+        elif self.playing == event.kind:
+            self._notify(event, COALESCED)
+        elif now - self._last_start.get(event.kind, float('-inf')) < self.cooldowns.get(event.kind, 0):
+            self._notify(event, SUPPRESSED)
+        else:
+            # A different pattern is cut short by the new alarm
+            if self._playing is not None:
+                self._finish_pattern()
+            self._start_pattern(event, now)
+
+    def service(self):
+        """
+        Handle queued events and advance the pattern.
+
+        Returns:
+            float: Seconds until the next pattern step, or None when idle
+        """
+        now = robot_clock.monotonic()
+        while self._events:
+            self._handle(self._events.popleft(), now)
+        while self._playing is not None and now >= self._step_end:
+            self._step += 1
+            steps = self._playing[2]
+            if self._step >= len(steps):
+                self._finish_pattern()
+                break
+            value, duration = steps[self._step]
+            self.buzzer.value = value
+            self._step_end += duration
+        if self._playing is None:
+            return None
+        return max(self._step_end - now, 0.0)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            delay = self.service()
+            robot_clock.wait(self._wake, delay)
+
+    def start(self):
+        """Start the worker (a thread, or a clock timer on a VirtualClock)."""
+        self._stopping = False
+        if isinstance(robot_clock.get_clock(), robot_clock.VirtualClock):
+            self._timer = robot_clock.call_every(VIRTUAL_POLL_S, self.service, name='alarm-worker')
+        elif self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='alarm-worker', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stop the worker and switch the buzzer off."""
+        self._stopping = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._thread is not None:
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self._playing = None
+        self.buzzer.value = 0
+
+
+def main():
+    """Push events while a 3 s alarm is playing and report the callback latency."""
+    import time
+
+    class Buzzer:
+        value = 0
+
+    worker = AlarmWorker(Buzzer(), {'motion': beep_pattern(5, 0.3, 0.3, 0.7)},
+                         cooldowns={'motion': 30}).start()
+    worker.push('motion')
+    time.sleep(0.05)
+    samples = []
+    for _ in range(2000):
+        t0 = time.perf_counter()
+        worker.push('motion')
+        samples.append(time.perf_counter() - t0)
+        time.sleep(0.0005)
+    samples.sort()
+    print(f"alarm playing during test : {worker.playing}")
+    print(f"callback latency p50      : {samples[len(samples) // 2] * 1e6:.1f} us")
+    print(f"callback latency p99      : {samples[int(len(samples) * 0.99)] * 1e6:.1f} us")
+    print(f"callback latency max      : {samples[-1] * 1e6:.1f} us")
+    time.sleep(0.05)
+    print(f"worker dispatch delay max : {worker.max_dispatch_delay * 1e3:.2f} ms")
+    print(f"outcomes                  : {dict(worker.stats)}")
+    worker.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = N-sector obstacle avoidance policy with a precomputed action lookup table
+            = The hand-written 3-sector truth table (obstacle_avoidance_logic) becomes a declarative
+            = rule list that works for any number of sectors (3, 7, 13 ...). Sectors are ordered
+            = left to right and grouped into 'left', 'center' and 'right'.
+            = At start-up every obstacle combination (2^N) is evaluated once into a table, so a
+            = decision is one table lookup and a batch of scans is one vectorized NumPy lookup.
+'''
+
+import argparse
+import time
+
+import numpy as np
+
+ACTIONS = ('forward', 'left', 'right', 'backward_left')
+
+# First matching rule wins. Conditions apply to a sector group:
+#   'clear'       - every sector in the group is clear
+#   'blocked'     - every sector in the group has an obstacle
+#   'any_clear'   - at least one sector in the group is clear
+#   'any_blocked' - at least one sector in the group has an obstacle
+# A rule without conditions always matches.
+DEFAULT_RULES = (
+    {'when': {'center': 'clear'}, 'action': 'forward'},
+    {'when': {'left': 'any_clear'}, 'action': 'left'},
+    {'when': {'right': 'any_clear'}, 'action': 'right'},
+    {'when': {}, 'action': 'backward_left'},
+)
+
+# Report line printed for each action by report_obstacles()
+ACTION_MESSAGES = {
+    'forward': "✓ CENTER is clear - Safe to move forward",
+    'left': "✓ LEFT is clear - Turn left to avoid obstacles",
+    'right': "✓ RIGHT is clear - Turn right to avoid obstacles",
+    'backward_left': "✗ All directions blocked - Reverse and try again",
+}
+
+MAX_SECTORS = 24  # 2^24 entries = 16 MB table, built one sector bit at a time in ~100 MB
+
+
+def sector_groups(n_sectors, center_sectors=None):
+    """
+    Split sector indices (0 = leftmost) into left / center / right groups.
+
+    Args:
+        n_sectors: Number of sectors in a scan
+        center_sectors: Width of the centre group (default: about a third, odd)
+
+    Returns:
+        dict: group name -> tuple of sector indices
+    """
+    if center_sectors is None:
+        center_sectors = (n_sectors // 3) | 1
+    if not 0 < center_sectors <= n_sectors:
+        raise ValueError("center_sectors must be between 1 and n_sectors")
+    side = (n_sectors - center_sectors) // 2
+    left = tuple(range(side))
+    center = tuple(range(side, n_sectors - side))
+    right = tuple(range(n_sectors - side, n_sectors))
+    return {'left': left, 'center': center, 'right': right}
+
+
+class AvoidancePolicy:
+    """
+    Obstacle avoidance decisions for N-sector scans.
+
+    Args:
+        n_sectors: Number of sectors per scan, ordered left to right
+        rules: Rule list in the DEFAULT_RULES format
+        center_sectors: Width of the centre group (see sector_groups)
+        actions: Action names used by the rules
+    """
+
+    def __init__(self, n_sectors=3, rules=DEFAULT_RULES, center_sectors=None, actions=ACTIONS):
+        if not 1 <= n_sectors <= MAX_SECTORS:
+            raise ValueError(f"n_sectors must be between 1 and {MAX_SECTORS}")
+        self.n_sectors = n_sectors
+        self.rules = tuple(rules)
+        self.actions = tuple(actions)
+        self.groups = sector_groups(n_sectors, center_sectors)
+        self._action_names = np.array(self.actions)
+        self._weights = (1 << np.arange(n_sectors, dtype=np.uint32)).astype(np.uint32)
+        self.table = self._build_table()
+
+    def _sector_bits(self, sector):
+        """Blocked flag of one sector for every table row (row = code, bit `sector` of it)."""
+        bits = np.zeros((1 << (self.n_sectors - 1 - sector), 2, 1 << sector), dtype=bool)
+        bits[:, 1, :] = True
+        return bits.reshape(-1)
+
+    def _condition_mask(self, group, condition):
+        """Evaluate one condition for every table row at once."""
+        rows = 1 << self.n_sectors
+        indices = self.groups[group]
+        if not indices:
+            # An empty group is never clear or blocked
+            return np.zeros(rows, dtype=bool)
+        # One sector at a time: a 2^N x N bit matrix would not fit in a Pi's memory at N = 24
+        any_blocked = np.zeros(rows, dtype=bool)
+        all_blocked = np.ones(rows, dtype=bool)
+        for sector in indices:
+            bit = self._sector_bits(sector)
+            any_blocked |= bit
+            all_blocked &= bit
+        if condition == 'clear':
+            return ~any_blocked
+        if condition == 'blocked':
+            return all_blocked
+        if condition == 'any_clear':
+            return ~all_blocked
+        if condition == 'any_blocked':
+            return any_blocked
+        raise ValueError(f"Unknown condition: {condition}")
+
+    def _build_table(self):
+        unset = len(self.actions)
+        table = np.full(1 << self.n_sectors, unset, dtype=np.uint8)
+        for rule in self.rules:
+            action = self.actions.index(rule['action'])
+            match = table == unset
+            for group, condition in rule['when'].items():
+                match &= self._condition_mask(group, condition)
+            table[match] = action
+        if (table == unset).any():
+            raise ValueError("Rules do not cover every obstacle combination - add a default rule")
+        return table
+
+    def encode(self, obstacles):
+        """Pack a sequence of N obstacle flags (left to right) into a table index."""
+        if len(obstacles) != self.n_sectors:
+            raise ValueError(f"Expected {self.n_sectors} sectors, got {len(obstacles)}")
+        code = 0
+        for i, blocked in enumerate(obstacles):
+            if blocked:
+                code |= 1 << i
+        return code
+
+    def decide(self, obstacles):
+        """
+        Decide the action for one scan.
+
+        Args:
+            obstacles: N booleans, left to right (True = obstacle)
+
+        Returns:
+            str: Action name
+        """
+        return self.actions[self.table[self.encode(obstacles)]]
+
+    def decide_batch(self, obstacles, names=True):
+        """
+        Decide the action for a whole batch of scans in one vectorized lookup.
+
+        Args:
+            obstacles: Array-like of shape (scans, N), truthy = obstacle
+            names: Return action names (True) or action indices (False)
+
+        Returns:
+            numpy.ndarray: One action per scan
+        """
+        flags = np.asarray(obstacles, dtype=bool)
+        if flags.ndim != 2 or flags.shape[1] != self.n_sectors:
+            raise ValueError(f"Expected shape (scans, {self.n_sectors}), got {flags.shape}")
+        codes = flags.astype(np.uint32) @ self._weights
+        indices = self.table[codes]
+        return self._action_names[indices] if names else indices
+
+    def decide_distances(self, distances, threshold_cm):
+        """Decide for a batch of distance scans (cm) using an obstacle threshold."""
+        return self.decide_batch(np.asarray(distances) < threshold_cm)
+
+
+def main():
+    """Print the 3-sector truth table and benchmark batch decisions."""
+    parser = argparse.ArgumentParser(description="N-sector avoidance policy demo")
+    parser.add_argument('--sectors', type=int, default=13, help="sectors for the batch benchmark")
+    parser.add_argument('--scans', type=int, default=1_000_000, help="random scans to evaluate")
+    args = parser.parse_args()
+
+    policy = AvoidancePolicy(3)
+    print("=" * 40)
+    print("Left | Center | Right | Action")
+    print("=" * 40)
+    for code in range(8):
+        flags = [(code >> (2 - i)) & 1 for i in range(3)]
+        print(f"  {flags[0]}  |   {flags[1]}    |   {flags[2]}   | {policy.decide(flags)}")
+
+    policy = AvoidancePolicy(args.sectors)
+    print(f"\n{args.sectors} sectors, groups: {policy.groups}")
+    scans = np.random.default_rng(0).random((args.scans, args.sectors)) < 0.3
+    started = time.perf_counter()
+    decisions = policy.decide_batch(scans, names=False)
+    elapsed = time.perf_counter() - started
+    counts = np.bincount(decisions, minlength=len(policy.actions))
+    print(f"{args.scans} scans decided in {elapsed * 1000:.1f} ms")
+    for action, count in zip(policy.actions, counts):
+        print(f"  {action:14}: {count}")
+
+
+if __name__ == '__main__':
+    main()
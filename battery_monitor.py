@@ -0,0 +1,200 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Battery monitor: filtered voltages, state of charge and time-to-empty
+            = Runs on its own robot_clock timer and reads the ADC engine's cached channels
+            = (1 = battery level through a divider, 2 = regulator output). Each voltage goes
+            = through a scalar Kalman filter, so a single noisy sample cannot flip any state.
+            = - state of charge: per-cell voltage looked up on a Li-ion discharge curve
+            = - time to empty  : least-squares slope of SoC over the last few minutes
+            = - low battery / regulation fault use hysteresis: they set below the threshold and
+            =   only clear once the voltage is back above threshold + hysteresis
+            = The patrol loop only reads monitor.state, a tuple replaced after every update,
+            = so it never waits on the ADC.
+'''
+
+from collections import deque, namedtuple
+
+import numpy as np
+
+import robot_clock
+
+UPDATE_INTERVAL_S = 1.0
+HISTORY_S = 300.0               # SoC history used for the discharge rate
+MIN_HISTORY_S = 30.0            # No time-to-empty forecast before this much history
+DIVIDER_RATIO = 3.0             # Battery divider into ADC channel 1 (2S pack ~7.4 V)
+CELLS = 2
+CELL_LOW_V = 3.0
+REGULATOR_MIN_V = 3.2
+HYSTERESIS_V = 0.05             # Per cell for the battery, absolute for the regulator
+
+# Li-ion rest voltage per cell -> state of charge (%)
+DISCHARGE_CURVE = (
+    (3.00, 0), (3.30, 5), (3.50, 10), (3.60, 20), (3.70, 40), (3.75, 50),
+    (3.80, 60), (3.90, 75), (4.00, 85), (4.10, 95), (4.20, 100),
+)
+
+BatteryState = namedtuple('BatteryState', 'time pack_voltage cell_voltage soc time_to_empty low '
+                                          'regulator_voltage regulation_ok samples')
+
+
+class ScalarKalman:
+    """
+    Random-walk Kalman filter for a slowly changing voltage.
+
+    Args:
+        process_noise: Drift in volts per sqrt(second)
+        measurement_noise: Standard deviation of one sample in volts
+    """
+
+    def __init__(self, process_noise=0.002, measurement_noise=0.05):
+        self.q = process_noise * process_noise
+        self.r = measurement_noise * measurement_noise
+        self.x = None
+        self.p = 0.0
+        self.t = None
+
+    def update(self, value, timestamp):
+        if self.x is None:
+            self.x, self.p, self.t = value, self.r, timestamp
+            return self.x
+        self.p += self.q * max(timestamp - self.t, 0.0)
+        gain = self.p / (self.p + self.r)
+        self.x += gain * (value - self.x)
+        self.p *= 1.0 - gain
+        self.t = timestamp
+        return self.x
+
+
+class Hysteresis:
+    """Low flag that sets below `threshold` and clears above `threshold + band`."""
+
+    def __init__(self, threshold, band):
+        self.threshold = threshold
+        self.band = band
+        self.low = False
+
+    def update(self, value):
+        if self.low:
+            if value > self.threshold + self.band:
+                self.low = False
+        elif value < self.threshold:
+            self.low = True
+        return self.low
+
+
+def state_of_charge(cell_voltage, curve=DISCHARGE_CURVE):
+    """SoC (%) for a per-cell voltage by linear interpolation on the discharge curve."""
+    volts, percent = zip(*curve)
+    return float(np.interp(cell_voltage, volts, percent))
+
+
+class BatteryMonitor:
+    """
+    Background battery state estimator.
+
+    Args:
+        battery_channel: ADC channel (anything with .voltage) on the battery divider
+        regulator_channel: ADC channel on the regulator output (optional)
+        cells: Series cell count
+        divider: Battery divider ratio
+        cell_low_voltage: Per-cell low battery threshold
+        regulator_min_voltage: Regulator low threshold
+    """
+
+    def __init__(self, battery_channel, regulator_channel=None, cells=CELLS, divider=DIVIDER_RATIO,
+                 cell_low_voltage=CELL_LOW_V, regulator_min_voltage=REGULATOR_MIN_V,
+                 hysteresis=HYSTERESIS_V, interval=UPDATE_INTERVAL_S):
+        self.battery_channel = battery_channel
+        self.regulator_channel = regulator_channel
+        self.cells = cells
+        self.divider = divider
+        self.interval = interval
+        self.battery_filter = ScalarKalman()
+        self.regulator_filter = ScalarKalman(process_noise=0.02)   # Regulator faults must show quickly
+        self.battery_low = Hysteresis(cell_low_voltage, hysteresis)
+        self.regulator_low = Hysteresis(regulator_min_voltage, hysteresis)
+        self.history = deque()          # (time, soc)
+        self.samples = 0
+        self.errors = 0
+        self.last_error = None
+        self.state = None
+        self._timer = None
+
+    @property
+    def cell_low_voltage(self):
+        return self.battery_low.threshold
+
+    @cell_low_voltage.setter
+    def cell_low_voltage(self, value):
+        self.battery_low.threshold = value
+
+    @property
+    def regulator_min_voltage(self):
+        return self.regulator_low.threshold
+
+    @regulator_min_voltage.setter
+    def regulator_min_voltage(self, value):
+        self.regulator_low.threshold = value
+
+    def update(self):
+        """Read both channels once and publish a new BatteryState (called by the clock timer)."""
+        now = robot_clock.monotonic()
+        try:
+            pack_raw = self.battery_channel.voltage * self.divider
+            regulator_raw = self.regulator_channel.voltage if self.regulator_channel is not None else None
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            return self.state
+        self.samples += 1
+
+        pack = self.battery_filter.update(pack_raw, now)
+        cell = pack / self.cells
+        soc = state_of_charge(cell)
+        low = self.battery_low.update(cell)
+        if regulator_raw is not None:
+            regulator = self.regulator_filter.update(regulator_raw, now)
+            regulation_ok = not self.regulator_low.update(regulator)
+        else:
+            regulator, regulation_ok = None, True
+
+        self.history.append((now, soc))
+        while self.history and now - self.history[0][0] > HISTORY_S:
+            self.history.popleft()
+
+        self.state = BatteryState(now, pack, cell, soc, self.time_to_empty(), low,
+                                  regulator, regulation_ok, self.samples)
+        return self.state
+
+    def time_to_empty(self):
+        """Seconds until 0% at the current discharge rate (inf if not discharging or unknown)."""
+        if len(self.history) < 3 or self.history[-1][0] - self.history[0][0] < MIN_HISTORY_S:
+            return float('inf')
+        times, socs = np.array(self.history).T
+        slope = np.polyfit(times - times[-1], socs, 1)[0]      # % per second
+        if slope >= 0:
+            return float('inf')
+        return float(self.history[-1][1] / -slope)
+
+    def current(self):
+        """Latest state; takes one reading now if the timer has not produced any yet."""
+        return self.state if self.state is not None else self.update()
+
+    def start(self):
+        if self._timer is None or not self._timer.active:
+            self.update()
+            self._timer = robot_clock.call_every(self.interval, self.update, name='battery-monitor')
+        return self
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+
+def format_duration(seconds):
+    if seconds == float('inf'):
+        return "--:--"
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}:{minutes % 60:02d}"
@@ -1,62 +1,52 @@
 '''
 Author      = KOH KHENG CHOONG
 Date        = 2025-11-02
-Description = Control buzzer frequency using gpiozero TonalBuzzer
+Description = Control buzzer frequency using pigpio waveforms (tone_sequencer.py)
+            = The scale, siren and notes are compiled once and played by the pigpio daemon;
+            = Python only submits each pattern and waits for it to end.
 '''
 
-from gpiozero import TonalBuzzer
-from gpiozero.tones import Tone
-from time import sleep
+import hardware
+import robot_clock
+from tone_sequencer import ToneSequencer, melody, siren
 
-# Create a TonalBuzzer on GPIO pin (change to your pin number)
-buzzer = TonalBuzzer(17)  # Use your GPIO pin number here
+BUZZER_PIN = 17  # Use your GPIO pin number here
 
-def play_frequency(freq, duration):
-    """Play a specific frequency for given duration"""
-    buzzer.play(Tone.from_frequency(freq))
-    sleep(duration)
-    buzzer.stop()
-    sleep(0.1)  # Brief pause between tones
+# Created on first use, on the shared pigpio connection (hardware.py)
+hw = hardware.get_registry()
+buzzer = hw.device('buzzer', lambda: ToneSequencer(hw.pi, BUZZER_PIN))
+
+def play(notes, repeat=1):
+    """Play a pattern in the pigpio daemon and wait until it has finished"""
+    robot_clock.sleep(buzzer.play(notes, repeat))
 
 def main():
+    try:
+        hw.connect()
+    except hardware.HardwareError as e:
+        exit(str(e))
+
     try:
         # Example 1: Play different frequencies
-        frequencies = [262, 294, 330, 349, 392, 440, 494, 523]  # C4 to C5 scale
-        for freq in frequencies:
-            print(f"Playing {freq}Hz")
-            play_frequency(freq, 0.5)
+        print("Playing C4 to C5 scale")
+        play(melody(['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4', 'C5'], duration=0.5, gap=0.1))
         
-        # Example 2: Siren effect (sliding frequency)
+        # Example 2: Siren effect (sliding frequency 500-2000 Hz, 50 ms per step)
         print("Playing siren effect")
-        for _ in range(3):
-            for freq in range(500, 2000, 100):
-                buzzer.play(Tone.from_frequency(freq))
-                sleep(0.05)
-            for freq in range(2000, 500, -100):
-                buzzer.play(Tone.from_frequency(freq))
-                sleep(0.05)
+        play(siren(500, 2000, step_hz=100, step_s=0.05), repeat=3)
         
         # Example 3: Play some common musical notes
-        notes = {
-            'C4': 262,
-            'D4': 294,
-            'E4': 330,
-            'F4': 349,
-            'G4': 392,
-            'A4': 440,
-            'B4': 494,
-            'C5': 523
-        }
+        notes = ['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4', 'C5']
         
         print("Playing musical notes")
-        for note, freq in notes.items():
-            print(f"Playing {note} ({freq}Hz)")
-            play_frequency(freq, 0.3)
+        for note in notes:
+            print(f"Playing {note}")
+            play(melody([note], duration=0.3, gap=0.1))
 
     except KeyboardInterrupt:
         print("\nProgram stopped by user")
     finally:
-        buzzer.stop()
+        hw.close()
         print("Buzzer stopped")
 
 if __name__ == '__main__':
@@ -0,0 +1,158 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Background sampler for the HC-SR04 ultrasonic DistanceSensor
+            = A daemon thread reads sensor.distance at a fixed rate into a fixed-size,
+            = timestamped ring buffer. Callers get the latest filtered value straight from
+            = the buffer without waiting for the sensor:
+            = - median : median of the samples inside the requested time window
+            = - hampel : latest sample, replaced by the window median if it is an outlier
+            = Read errors are counted and skipped instead of returning None to the caller.
+            = Sampling runs on a robot_clock timer, so it also works on accelerated/virtual clocks.
+'''
+
+import threading
+
+import robot_clock
+
+DEFAULT_RATE_HZ = 20
+DEFAULT_BUFFER_SIZE = 64
+HAMPEL_K = 3.0          # Outlier threshold in scaled MADs
+MAD_SCALE = 1.4826      # MAD -> standard deviation for normally distributed noise
+
+
+def median(values):
+    """Median of a non-empty sequence."""
+    ordered = sorted(values)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[middle]
+    return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def hampel(values, k=HAMPEL_K):
+    """
+    Hampel identifier for the last value of a window.
+
+    Args:
+        values: Window of samples, oldest first
+        k: Threshold in scaled median absolute deviations
+
+    Returns:
+        float: The last value, or the window median if the last value is an outlier
+    """
+    centre = median(values)
+    mad = median([abs(v - centre) for v in values]) * MAD_SCALE
+    latest = values[-1]
+    if mad == 0:
+        return latest if latest == centre else centre
+    if abs(latest - centre) > k * mad:
+        return centre
+    return latest
+
+
+class DistanceSampler:
+    """
+    Read a DistanceSensor in the background into a timestamped ring buffer.
+
+    Args:
+        sensor: gpiozero DistanceSensor (anything with a .distance in metres)
+        rate_hz: Sampling rate
+        size: Number of samples kept in the ring buffer
+    """
+
+    def __init__(self, sensor, rate_hz=DEFAULT_RATE_HZ, size=DEFAULT_BUFFER_SIZE):
+        self.sensor = sensor
+        self.interval = 1.0 / rate_hz
+        self.size = size
+        self._times = [0.0] * size
+        self._values = [0.0] * size
+        self._index = 0         # Next slot to write
+        self._count = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self.errors = 0
+        self.last_error = None
+
+    @property
+    def running(self):
+        return self._timer is not None and self._timer.active
+
+    def start(self):
+        """Start periodic sampling (no-op if already running)."""
+        if not self.running:
+            self._timer = robot_clock.call_every(self.interval, self.sample, name='distance-sampler')
+        return self
+
+    def stop(self):
+        """Stop sampling and wait for the sampling thread to exit."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def sample(self):
+        """Take one reading (called by the clock timer)."""
+        try:
+            value = self.sensor.distance * 100  # convert to cm
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+        else:
+            self.add(robot_clock.monotonic(), value)
+
+    def add(self, timestamp, value):
+        """Append one sample to the ring buffer (used by the sampling thread)."""
+        with self._lock:
+            self._times[self._index] = timestamp
+            self._values[self._index] = value
+            self._index = (self._index + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+
+    def samples(self, max_age=None):
+        """
+        Return buffered samples, oldest first.
+
+        Args:
+            max_age: Only return samples taken within the last max_age seconds
+
+        Returns:
+            list: (timestamp, distance_cm) tuples
+        """
+        with self._lock:
+            start = (self._index - self._count) % self.size
+            ordered = [(self._times[(start + i) % self.size], self._values[(start + i) % self.size])
+                       for i in range(self._count)]
+        if max_age is not None:
+            cutoff = robot_clock.monotonic() - max_age
+            ordered = [s for s in ordered if s[0] >= cutoff]
+        return ordered
+
+    def latest(self):
+        """Return the newest raw (timestamp, distance_cm) sample, or None."""
+        with self._lock:
+            if not self._count:
+                return None
+            last = (self._index - 1) % self.size
+            return self._times[last], self._values[last]
+
+    def filtered(self, method='median', max_age=None):
+        """
+        Return the latest filtered distance without touching the sensor.
+
+        Args:
+            method: 'median', 'hampel' or 'raw'
+            max_age: Window length in seconds (None = whole buffer)
+
+        Returns:
+            float: Distance in cm, or None if there are no samples in the window
+        """
+        values = [value for _, value in self.samples(max_age)]
+        if not values:
+            return None
+        if method == 'median':
+            return median(values)
+        if method == 'hampel':
+            return hampel(values)
+        if method == 'raw':
+            return values[-1]
+        raise ValueError(f"Unknown filter method: {method}")
@@ -0,0 +1,374 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Interrupt-driven emergency stop with cancellation tokens
+            = RSSP_CW2_surveillance_robot_claude.py used to poll the button between movements,
+            = so a press could wait out a whole sleep(1) or a servo scan. Here:
+            = - a pigpio callback on the button's falling edge trips the stop on the daemon's
+            =   callback thread, timed from the edge tick
+            = - the trip first cancels the current CancelToken (waking every token.sleep() /
+            =   token.wait() at once), then runs the stop functions (LEDs, servo, buzzer)
+            = - output commands go through token.run(), so a command racing the trip either
+            =   finishes before the stop functions run or is refused with Cancelled
+            = - the patrol code unwinds on Cancelled instead of checking a flag between steps
+            = Every trip records edge -> outputs stopped under the 'stop' latency stage.
+            =
+            = Stop latency harness (p50 / p99 / max):
+            =   python emergency_stop.py --sim --runs 100        presses at random times in robot_sim
+            =   python emergency_stop.py --hardware --presses 20 press the button while it patrols
+            =   python emergency_stop.py --hardware --loopback 24  GPIO24 wired to the button pin
+'''
+
+import threading
+
+import robot_clock
+from latency_metrics import LatencyMetrics
+
+TICK_WRAP = 1 << 32         # pigpio ticks are u32 microseconds
+
+
+class Cancelled(Exception):
+    """Raised by a CancelToken wait or command once the token is cancelled."""
+
+
+class CancelToken:
+    """
+    One-shot cancellation shared by everything a patrol run starts.
+    cancel() may come from any thread; waiting code sees it at once.
+    """
+
+    def __init__(self):
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.RLock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason='cancelled'):
+        """
+        Cancel the token and run its on_cancel() callbacks.
+
+        Returns:
+            bool: True for the first call, False if it was already cancelled
+        """
+        with self._lock:        # Waits for a command in token.run() to finish
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        return True
+
+    def on_cancel(self, callback):
+        """Call callback() on cancel (at once if already cancelled); returns callback."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return callback
+        callback()
+        return callback
+
+    def discard(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def check(self):
+        """Raise Cancelled if the token is cancelled."""
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    def run(self, action, *args, **kwargs):
+        """Start an output command unless cancelled (raises Cancelled); returns its result."""
+        with self._lock:
+            self.check()
+            return action(*args, **kwargs)
+
+    def sleep(self, seconds):
+        """robot_clock.sleep() that ends early with Cancelled."""
+        if robot_clock.wait(self._event, seconds):
+            raise Cancelled(self.reason)
+
+    def wait(self, run, timeout=None):
+        """
+        Wait for a handle with wait() and cancel() (a led_patterns.PatternRun); a cancel
+        cancels it and raises Cancelled.
+
+        Returns:
+            bool: run.wait() result
+        """
+        self.on_cancel(run.cancel)
+        try:
+            finished = run.wait(timeout)
+        finally:
+            self.discard(run.cancel)
+        self.check()
+        return finished
+
+
+class EmergencyStop:
+    """
+    Emergency stop button on a pigpio edge callback.
+
+    Args:
+        pin: Button GPIO (pressed = pulled to ground when pull_up)
+        stops: Functions that stop an output, run in order on every trip
+        pull_up: Pull the input up and trip on the falling edge (False: down / rising)
+        metrics: LatencyMetrics for the 'stop' stage (default: a new one)
+    """
+
+    def __init__(self, pin, stops=(), pull_up=True, metrics=None):
+        self.pin = pin
+        self.stops = list(stops)
+        self.pull_up = pull_up
+        self.active_level = 0 if pull_up else 1
+        self.metrics = metrics if metrics is not None else LatencyMetrics('robot_estop_latency', enabled=True)
+        self.token = CancelToken()
+        self.edge_time = None       # robot_clock.monotonic() of the tripping edge
+        self.last_latency = None    # Edge -> every stop function done (seconds)
+        self.trips = 0
+        self.pi = None
+        self._callback = None
+        self._lock = threading.Lock()
+
+    @property
+    def tripped(self):
+        return self.token.cancelled
+
+    def on_trip(self, stop):
+        """Add a stop function; returns it."""
+        self.stops.append(stop)
+        return stop
+
+    # --- pigpio --------------------------------------------------------------
+
+    def attach(self, pi):
+        """Configure the pin and trip on its active edge (at once if already pressed)."""
+        import pigpio
+        self.detach()
+        self.pi = pi
+        pi.set_mode(self.pin, pigpio.INPUT)
+        pi.set_pull_up_down(self.pin, pigpio.PUD_UP if self.pull_up else pigpio.PUD_DOWN)
+        edge = pigpio.FALLING_EDGE if self.pull_up else pigpio.RISING_EDGE
+        self._callback = pi.callback(self.pin, edge, self._on_edge)
+        if pi.read(self.pin) == self.active_level:
+            self.trip('held at start')
+        return self
+
+    def _on_edge(self, gpio, level, tick):
+        if level == self.active_level:
+            self.trip(tick=tick)
+
+    def detach(self):
+        if self._callback is not None:
+            self._callback.cancel()
+            self._callback = None
+
+    # --- stopping ------------------------------------------------------------
+
+    def trip(self, reason='emergency stop', tick=None):
+        """
+        Cancel the current token and stop every output (any thread).
+
+        Args:
+            tick: pigpio tick of the edge, so the latency includes callback dispatch
+
+        Returns:
+            bool: False if already tripped
+        """
+        now = robot_clock.monotonic()
+        edge_time = now
+        if tick is not None and self.pi is not None:
+            edge_time -= ((self.pi.get_current_tick() - tick) % TICK_WRAP) / 1e6
+        with self._lock:
+            if self.token.cancelled:
+                return False
+            self.edge_time = edge_time
+            self.trips += 1
+            self.token.cancel(reason)
+        for stop in self.stops:
+            try:
+                stop()
+            except Exception as e:      # One failed output must not keep the others running
+                print(f"[ESTOP] {getattr(stop, '__qualname__', stop)} failed: {e}")
+        self.last_latency = robot_clock.monotonic() - edge_time
+        self.metrics.observe('stop', self.last_latency)
+        return True
+
+    def reset(self):
+        """
+        Re-arm with a fresh token once the button is released.
+
+        Returns:
+            CancelToken, or None while the button is still pressed
+        """
+        if self.pi is not None and self.pi.read(self.pin) == self.active_level:
+            return None
+        with self._lock:
+            if self.token.cancelled:
+                self.token = CancelToken()
+                self.edge_time = None
+            return self.token
+
+    def close(self):
+        self.detach()
+
+
+# ============================================================================
+# STOP LATENCY HARNESS
+# ============================================================================
+
+DEFAULT_SCRIPT = 'RSSP_CW2_surveillance_robot_claude'
+SIM_STEP_S = 0.001                 # Clock resolution while the stop is measured
+SIM_FINE_BEFORE_S = 0.1            # Switch to SIM_STEP_S this long before the press
+SIM_WINDOW_S = 5.0                 # Simulated time allowed after the press
+SIM_DISPATCH_S = 0.001             # Press -> pigpio callback thread sees the edge (daemon poll + pipe)
+
+
+class _OutputWatch:
+    """Last time the simulated LEDs, servo or buzzer were active or changed."""
+
+    def __init__(self, sim, led_pins):
+        self.sim = sim
+        self.pins = [sim.factory.pin(number) for number in led_pins]
+        self.previous = None
+        self.quiet_since = None
+        sim.clock.add_advance_hook(self._check)
+
+    def _state(self):
+        return (tuple(pin.state for pin in self.pins), tuple(sorted(self.sim.pi.pulsewidths.items())),
+                self.sim.pi.wave_tx_busy())
+
+    def _check(self, dt):
+        state = self._state()
+        leds, _, busy = state
+        quiet = not any(leds) and not busy and state[1] == (self.previous or state)[1]
+        self.previous = state
+        if not quiet:
+            self.quiet_since = None
+        elif self.quiet_since is None:
+            # Hooks run before the clock moves on: the state seen began at clock.now
+            self.quiet_since = self.sim.clock.now
+
+
+def _press(sim, pin):
+    """Button press: the pigpio edge, plus the gpiozero mock pin for scripts that poll it."""
+    sim.pi.input_edge(pin, 0)
+    for info, mock_pin in sim.factory.pins.items():
+        if pin in info.names:
+            mock_pin.drive_low()
+
+
+def sim_harness(script, runs, seed, pin, led_pins):
+    """Press the button once per simulated run, at a random time; returns LatencyMetrics."""
+    import random
+    import robot_sim
+
+    rng = random.Random(seed)
+    metrics = LatencyMetrics('robot_estop_harness', enabled=True)
+    missed = 0
+    for run in range(runs):
+        press_at = rng.uniform(5.0, 60.0)
+        sim = robot_sim.Simulation(duration=press_at + SIM_WINDOW_S, seed=rng.randrange(1 << 30))
+        watch = []
+
+        def fine_steps(sim=sim):
+            # Sleeps already running keep their step, so switch well before the press
+            sim.clock.step = SIM_STEP_S
+
+        def press(sim=sim):
+            # Watch from the press itself; the edge reaches the script one callback dispatch later
+            watch.append(_OutputWatch(sim, led_pins))
+            watch[0]._check(0)
+            sim.clock.call_later(SIM_DISPATCH_S, lambda: _press(sim, pin))
+
+        sim.clock.call_later(press_at - SIM_FINE_BEFORE_S, fine_steps)
+        sim.clock.call_later(press_at, press)
+        sim, _ = robot_sim.run(script, sim=sim, quiet=True)
+        if not watch:
+            missed += 1         # The script ended before the press
+            continue
+        quiet_since = watch[0].quiet_since
+        # Outputs that were already idle only count as stopped once the edge is delivered
+        metrics.observe('outputs', SIM_WINDOW_S if quiet_since is None
+                        else max(quiet_since - press_at, SIM_DISPATCH_S))
+        metrics.observe('exit', min(sim.clock.now, press_at + SIM_WINDOW_S) - press_at)
+    if missed:
+        print(f"{missed} runs ended before their press")
+    return metrics
+
+
+def hardware_harness(script, presses, loopback=None):
+    """Patrol-like workload on the robot; each press is measured, then re-armed on release."""
+    import importlib
+    import random
+    import pigpio
+
+    robot = importlib.import_module(script)
+    robot.hw.connect()
+    estop = robot.emergency_stop
+    estop.attach(robot.hw.pi)
+    pi = robot.hw.pi
+    if loopback is not None:
+        pi.set_mode(loopback, pigpio.OUTPUT)
+        pi.write(loopback, 1)
+    try:
+        for press in range(presses):
+            while estop.reset() is None:
+                robot_clock.sleep(0.05)
+            timer = None
+            if loopback is not None:
+                timer = robot_clock.call_later(random.uniform(0.5, 3.0), lambda: pi.write(loopback, 0))
+            else:
+                print(f"Press the emergency stop ({press + 1}/{presses})")
+            try:
+                while True:
+                    robot.move_forward()
+                    robot.move_servo(0)
+                    robot.turn_left()
+                    robot.move_servo(180)
+                    robot.move_backward()
+            except Cancelled:
+                estop.metrics.observe('unwind', robot_clock.monotonic() - estop.edge_time)
+            print(f"  stopped {estop.last_latency * 1000:.3f} ms after the edge")
+            if timer is not None:
+                robot_clock.sleep(0.1)
+                pi.write(loopback, 1)
+        return estop.metrics
+    finally:
+        robot.stop_all()
+        robot.hw.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Emergency stop latency (p50 / p99 / max)")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--sim', action='store_true', help="random presses in robot_sim runs")
+    mode.add_argument('--hardware', action='store_true', help="presses on the real robot")
+    parser.add_argument('--script', default=DEFAULT_SCRIPT)
+    parser.add_argument('--runs', type=int, default=100, help="simulated runs (one press each)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--presses', type=int, default=20, help="presses on hardware")
+    parser.add_argument('--loopback', type=int, help="output GPIO wired to the button pin (automatic presses)")
+    parser.add_argument('--pin', type=int, default=27, help="button GPIO")
+    args = parser.parse_args()
+
+    if args.sim:
+        metrics = sim_harness(args.script, args.runs, args.seed, args.pin, led_pins=(17, 23))
+        print(f"outputs = press -> LEDs, servo and buzzer idle (edge delivered after {SIM_DISPATCH_S * 1000:g} ms, "
+              f"the trip itself takes no simulated time); exit = press -> main() returned")
+    else:
+        metrics = hardware_harness(args.script, args.presses, args.loopback)
+        print("stop = edge tick -> every output stopped; unwind = edge -> patrol code unwound")
+    print(metrics.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Lazy hardware registry shared by the robot scripts
+            = The scripts used to build every device at import time (pigpio.pi(), LED(17),
+            = MCP3008(0) ...) and exit when the pigpio daemon was missing, so even importing one
+            = for a helper function needed the robot. Here a script only declares its devices:
+            = - hw.led(17), hw.motion_sensor(4), hw.device('adc', lambda: ADCEngine(...)) return
+            =   a LazyDevice that builds the real object on first use and then forwards to it
+            = - one pigpio connection: PiGPIOFactory's own, shared by gpiozero devices, the servo
+            =   driver and the ultrasonic driver (hw.pi)
+            = - backend from the ROBOT_HARDWARE environment variable: real (default) | mock
+            =   (gpiozero MockFactory + MockPi, runs on any PC)
+            = - hw.close() closes whatever was created, newest declaration first, then the pin
+            =   factory and the pigpio connection
+            = Importing a script is now side-effect free; call hw.connect() at the start of main()
+            = to fail fast when the daemon is not running.
+'''
+
+import os
+import threading
+import time
+
+import robot_clock
+
+BACKENDS = ('real', 'mock')
+CONNECT_HINT = "Failed to connect to pigpio daemon. Run 'sudo pigpiod' first."
+
+
+class HardwareError(OSError):
+    """A device or the pigpio connection could not be opened."""
+
+
+class MockPi:
+    """pigpio.pi stand-in for the mock backend: accepts every call, never produces an echo."""
+
+    connected = True
+
+    def __init__(self):
+        self.pulsewidths = {}
+        self.levels = {}
+        self.waves = 0
+
+    def set_servo_pulsewidth(self, gpio, pulsewidth):
+        self.pulsewidths[gpio] = pulsewidth
+
+    def get_servo_pulsewidth(self, gpio):
+        return self.pulsewidths.get(gpio, 0)
+
+    def set_mode(self, gpio, mode):
+        pass
+
+    def write(self, gpio, level):
+        self.levels[gpio] = level
+
+    def read(self, gpio):
+        return self.levels.get(gpio, 0)
+
+    def set_pull_up_down(self, gpio, pud):
+        self.levels[gpio] = int(pud == 2)      # pigpio.PUD_UP: the input idles high
+
+    def gpio_trigger(self, gpio, pulse_len=10, level=1):
+        pass
+
+    def get_current_tick(self):
+        return int(robot_clock.monotonic() * 1e6) & 0xFFFFFFFF
+
+    def callback(self, gpio, edge=0, func=None):
+        return _MockCallback()
+
+    def wave_add_generic(self, pulses):
+        return len(pulses)
+
+    def wave_create(self):
+        self.waves += 1
+        return self.waves - 1
+
+    def wave_chain(self, data):
+        pass
+
+    def wave_tx_busy(self):
+        return 0
+
+    def wave_tx_stop(self):
+        pass
+
+    def wave_delete(self, wave_id):
+        pass
+
+    def wave_clear(self):
+        self.waves = 0
+
+    def stop(self):
+        self.connected = False
+
+
+class _MockCallback:
+    def cancel(self):
+        pass
+
+
+class LazyDevice:
+    """
+    Placeholder for a registry device; builds it on first attribute access.
+    Attribute reads and writes (led.on(), pir.when_motion = f) go to the real object.
+    """
+
+    def __init__(self, registry, name):
+        object.__setattr__(self, '_registry', registry)
+        object.__setattr__(self, '_name', name)
+
+    def __getattr__(self, attribute):
+        return getattr(self._registry.get(self._name), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._registry.get(self._name), attribute, value)
+
+    @property
+    def created(self):
+        return self._registry.created(self._name)
+
+    def __repr__(self):
+        state = 'created' if self.created else 'not created'
+        return f"<LazyDevice {self._name} ({state})>"
+
+
+class Registry:
+    """
+    Device registry with one shared pigpio connection.
+
+    Args:
+        backend: 'real' or 'mock' (default: ROBOT_HARDWARE environment variable, 'real')
+        pi: Use this pigpio connection instead of opening one (robot_sim)
+        pin_factory: Use this gpiozero pin factory instead of creating one (robot_sim)
+    """
+
+    def __init__(self, backend=None, pi=None, pin_factory=None):
+        self.backend = backend or os.environ.get('ROBOT_HARDWARE', 'real')
+        if self.backend not in BACKENDS and (pi is None or pin_factory is None):
+            raise ValueError(f"Unknown hardware backend: {self.backend}")
+        self._pi = pi
+        self._pin_factory = pin_factory
+        self._owns_pi = False
+        self._owns_factory = pin_factory is None   # Injected connections belong to the caller
+        self._declared = {}         # name -> (create, close), in declaration order
+        self._devices = {}          # name -> object
+        self._lock = threading.RLock()
+        self.startup_times = {}     # name -> seconds spent creating it (wall clock, also in robot_sim)
+
+    # --- connection ----------------------------------------------------------
+
+    @property
+    def pin_factory(self):
+        """gpiozero pin factory of the backend (also made the gpiozero default)."""
+        with self._lock:
+            if self._pin_factory is None:
+                started = time.perf_counter()
+                if self.backend == 'mock':
+                    from gpiozero.pins.mock import MockFactory, MockPWMPin
+                    self._pin_factory = MockFactory(pin_class=MockPWMPin)
+                else:
+                    from gpiozero.pins.pigpio import PiGPIOFactory
+                    try:
+                        self._pin_factory = PiGPIOFactory()
+                    except OSError as e:
+                        raise HardwareError(f"{CONNECT_HINT} ({e})") from e
+                self.startup_times['pin_factory'] = time.perf_counter() - started
+            import gpiozero
+            gpiozero.Device.pin_factory = self._pin_factory
+            return self._pin_factory
+
+    @property
+    def pi(self):
+        """The shared pigpio connection."""
+        with self._lock:
+            if self._pi is None:
+                if self.backend == 'mock':
+                    self._pi = MockPi()
+                else:
+                    # PiGPIOFactory already holds a connection: reuse it instead of opening a second
+                    self._pi = getattr(self.pin_factory, 'connection', None)
+                    if self._pi is None:
+                        import pigpio
+                        self._pi = pigpio.pi()
+                        self._owns_pi = True
+                if not self._pi.connected:
+                    raise HardwareError(CONNECT_HINT)
+            return self._pi
+
+    def connect(self):
+        """Open the pin factory and the pigpio connection now (raises HardwareError)."""
+        self.pin_factory
+        self.pi
+        return self
+
+    # --- devices -------------------------------------------------------------
+
+    def device(self, name, create, close='close'):
+        """
+        Declare a device. Declaring a name again returns the existing device
+        (two modules naming the same pin share it).
+
+        Args:
+            name: Unique device name
+            create: function() -> device, run on first use
+            close: Method name called by close(), a function(device), or None
+
+        Returns:
+            LazyDevice
+        """
+        with self._lock:
+            self._declared.setdefault(name, (create, close))
+        return LazyDevice(self, name)
+
+    def register(self, name, device, close='close'):
+        """
+        Add an object that already exists so close() handles it in order. Registering a name
+        again (a script reloaded by robot_daemon) closes the object it replaces.
+
+        Returns:
+            The object
+        """
+        with self._lock:
+            previous = self._devices.get(name)
+            if previous is not None and previous is not device:
+                self._close(name, previous)
+            self._declared[name] = (None, close)
+            self._devices[name] = device
+        return device
+
+    def get(self, name):
+        """The device itself, creating it if needed."""
+        device = self._devices.get(name)
+        if device is not None:
+            return device
+        with self._lock:
+            if name not in self._devices:
+                create, _ = self._declared[name]
+                started = time.perf_counter()
+                self._devices[name] = create()
+                self.startup_times[name] = time.perf_counter() - started
+            return self._devices[name]
+
+    def declared(self, name):
+        return name in self._declared
+
+    def names(self):
+        """Declared device names, in declaration order."""
+        with self._lock:
+            return list(self._declared)
+
+    def create_all(self):
+        """Create every declared device now (warm start for robot_daemon and startup_profile)."""
+        for name in self.names():
+            self.get(name)
+        return self
+
+    def created(self, name):
+        return name in self._devices
+
+    def _gpiozero(self, class_name, name, *args, **kwargs):
+        def create():
+            self.pin_factory
+            import gpiozero
+            # Looked up at creation so robot_sim's replacement classes are used
+            return getattr(gpiozero, class_name)(*args, **kwargs)
+        return self.device(name, create)
+
+    def led(self, pin, name=None, **kwargs):
+        return self._gpiozero('LED', name or f'led{pin}', pin, **kwargs)
+
+    def pwm_output(self, pin, name=None, **kwargs):
+        return self._gpiozero('PWMOutputDevice', name or f'pwm{pin}', pin, **kwargs)
+
+    def motion_sensor(self, pin, name=None, **kwargs):
+        return self._gpiozero('MotionSensor', name or f'pir{pin}', pin, **kwargs)
+
+    def button(self, pin, name=None, **kwargs):
+        return self._gpiozero('Button', name or f'button{pin}', pin, **kwargs)
+
+    def mcp3008(self, channel, name=None, **kwargs):
+        return self._gpiozero('MCP3008', name or f'mcp3008_ch{channel}', channel, **kwargs)
+
+    # --- shutdown ------------------------------------------------------------
+
+    def close(self):
+        """Close created devices, newest declaration first, then the pin factory and pigpio."""
+        with self._lock:
+            for name in reversed(list(self._declared)):
+                device = self._devices.pop(name, None)
+                if device is not None:
+                    self._close(name, device)
+            if self._pin_factory is not None and self._owns_factory:
+                self._pin_factory.close()
+                self._pin_factory = None
+            if self._pi is not None:
+                if self._owns_pi:
+                    self._pi.stop()
+                self._pi = None
+                self._owns_pi = False
+
+
+    def _close(self, name, device):
+        _, close = self._declared[name]
+        if close is None:
+            return
+        try:
+            close(device) if callable(close) else getattr(device, close)()
+        except Exception as e:
+            print(f"[HARDWARE] Error closing {name}: {e}")
+
+
+_registry = None
+
+
+def get_registry():
+    """The registry shared by the robot scripts (created on first call)."""
+    global _registry
+    if _registry is None:
+        _registry = Registry()
+    return _registry
+
+
+def set_registry(registry):
+    """Replace the shared registry (before the scripts are imported)."""
+    global _registry
+    _registry = registry
+    return registry
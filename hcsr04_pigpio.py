@@ -0,0 +1,247 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = HC-SR04 driver on pigpio trigger pulses and echo edge callbacks
+            = gpiozero's DistanceSensor times the echo in Python and averages a queue of readings.
+            = Here the pigpio daemon does the timing: gpio_trigger() sends the 10 us pulse and a
+            = callback on the echo pin receives both edges with the daemon's microsecond tick, so
+            = the time of flight is tick(falling) - tick(rising), unaffected by Python scheduling.
+            = - continuous ranging at 20-40 Hz on a robot_clock timer
+            = - a ping with no falling edge before the next one is counted as a lost echo; it has no
+            =   distance, and .distance raises EchoLost until the next echo (an echo beyond
+            =   max_distance still reads max_distance, as with DistanceSensor)
+            = - every reading keeps the raw echo width (us) for diagnostics
+            = - speed of sound corrected for air temperature
+            = PigpioRanger has the .distance (metres) of DistanceSensor, so it is a drop-in for
+            = get_distance_cm(), DistanceSampler and SweepScanner. open_ultrasonic() picks the backend.
+'''
+
+import threading
+from collections import namedtuple
+
+import robot_clock
+
+TRIGGER_PULSE_US = 10
+DEFAULT_RATE_HZ = 25
+MIN_RATE_HZ = 1
+MAX_RATE_HZ = 40                # HC-SR04 needs ~25 ms between pings
+DEFAULT_MAX_DISTANCE_M = 4.0
+TIMEOUT_MARGIN_S = 0.002        # Added to the round trip at max_distance
+TICK_MASK = 0xFFFFFFFF          # pigpio ticks wrap every ~72 minutes
+FIRST_READING_TIMEOUT_S = 0.1
+
+RangeReading = namedtuple('RangeReading', 'time tick width_us distance_cm lost')   # distance_cm None if lost
+
+
+class EchoLost(RuntimeError):
+    """The latest ping got no echo back, so there is no current distance."""
+
+
+def speed_of_sound(temperature_c=20.0):
+    """Speed of sound in air (m/s)."""
+    return 331.3 + 0.606 * temperature_c
+
+
+def tick_diff(start, end):
+    """Microseconds from tick `start` to tick `end`, across the 32-bit wrap."""
+    return (end - start) & TICK_MASK
+
+
+class PigpioRanger:
+    """
+    Continuous HC-SR04 ranging timed by the pigpio daemon.
+
+    Args:
+        pi: pigpio.pi connection
+        trigger: GPIO of the trigger pin
+        echo: GPIO of the echo pin (through a 5 V -> 3.3 V divider)
+        rate_hz: Pings per second while running (clamped to 1-40)
+        max_distance: Readings are clamped to this many metres, like DistanceSensor
+        timeout_s: Time after a ping before its echo counts as lost
+                   (default: round trip at max_distance + a small margin)
+        temperature_c: Air temperature for the speed of sound
+    """
+
+    def __init__(self, pi, trigger, echo, rate_hz=DEFAULT_RATE_HZ, max_distance=DEFAULT_MAX_DISTANCE_M,
+                 timeout_s=None, temperature_c=20.0):
+        import pigpio
+
+        self.pi = pi
+        self.trigger = trigger
+        self.echo = echo
+        self.max_distance = max_distance
+        self.temperature_c = temperature_c
+        self.timeout_s = (timeout_s if timeout_s is not None
+                          else 2 * max_distance / speed_of_sound(temperature_c) + TIMEOUT_MARGIN_S)
+        # The next ping must not start before the previous echo has timed out
+        self.interval = max(1.0 / min(max(rate_hz, MIN_RATE_HZ), MAX_RATE_HZ), self.timeout_s)
+        self.stats = {'pings': 0, 'echoes': 0, 'lost': 0, 'out_of_range': 0}
+        self.reading = None
+        self._rise_tick = None
+        self._ping_time = None      # robot_clock time of the ping still waiting for its echo
+        self._new_reading = threading.Event()
+        self._timer = None
+
+        pi.set_mode(trigger, pigpio.OUTPUT)
+        pi.write(trigger, 0)
+        pi.set_mode(echo, pigpio.INPUT)
+        self._callback = pi.callback(echo, pigpio.EITHER_EDGE, self._edge)
+
+    # --- edges ---------------------------------------------------------------
+
+    def _edge(self, gpio, level, tick):
+        """pigpio callback: level 1 = echo started, 0 = echo ended."""
+        if level == 1:
+            self._rise_tick = tick
+        elif level == 0 and self._rise_tick is not None:
+            width = tick_diff(self._rise_tick, tick)
+            self._rise_tick = None
+            self._ping_time = None
+            self._publish(tick, width, False)
+
+    def _publish(self, tick, width_us, lost):
+        if lost:
+            # No echo is not "nothing in range": a wall can swallow the echo too
+            self.stats['lost'] += 1
+            distance_cm = None
+        else:
+            self.stats['echoes'] += 1
+            distance = width_us * 1e-6 * speed_of_sound(self.temperature_c) / 2
+            if distance > self.max_distance:
+                self.stats['out_of_range'] += 1
+                distance = self.max_distance
+            distance_cm = distance * 100
+        # One reference assignment; readers never see a half-built reading
+        self.reading = RangeReading(robot_clock.monotonic(), tick, width_us, distance_cm, lost)
+        self._new_reading.set()
+
+    # --- pinging -------------------------------------------------------------
+
+    def ping(self):
+        """Send one trigger pulse (called by the clock timer)."""
+        # The last ping never saw its falling edge
+        self.ping_lost()
+        self._ping_time = robot_clock.monotonic()
+        self.stats['pings'] += 1
+        self.pi.gpio_trigger(self.trigger, TRIGGER_PULSE_US, 1)
+
+    @property
+    def running(self):
+        return self._timer is not None and self._timer.active
+
+    def start(self):
+        """Start continuous ranging (no-op if already running)."""
+        if not self.running:
+            self.ping()
+            self._timer = robot_clock.call_every(self.interval, self.ping, name='hcsr04-ranger')
+        return self
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def measure(self, timeout=None):
+        """
+        Single blocking measurement (for use without continuous ranging).
+
+        Returns:
+            RangeReading: The new reading, or a lost one if no echo ended within the timeout
+        """
+        self.ping_lost()
+        self._new_reading.clear()
+        self.ping()
+        if not robot_clock.wait(self._new_reading, self.timeout_s if timeout is None else timeout):
+            self.ping_lost()
+        return self.reading
+
+    def ping_lost(self):
+        """Record the outstanding ping, if any, as lost."""
+        if self._ping_time is not None:
+            self._ping_time = None
+            self._rise_tick = None
+            self._publish(self.pi.get_current_tick(), 0, True)
+
+    # --- DistanceSensor interface ------------------------------------------
+
+    @property
+    def distance(self):
+        """
+        Latest distance in metres (waits for the first reading if there is none yet).
+        Raises EchoLost if the latest ping got no echo (DistanceSampler counts it as an error).
+        """
+        reading = self.reading
+        if reading is None and self.running:
+            # A ping is in flight; another one now would only make it count as lost
+            robot_clock.wait(self._new_reading, FIRST_READING_TIMEOUT_S)
+            reading = self.reading
+        if reading is None:
+            reading = self.measure(FIRST_READING_TIMEOUT_S)
+        if reading.lost:
+            raise EchoLost(f"No echo on GPIO{self.echo} ({self.stats['lost']} lost so far)")
+        return reading.distance_cm / 100
+
+    @property
+    def echo_width_us(self):
+        """Raw echo pulse width of the latest reading in microseconds (0 if it was lost)."""
+        reading = self.reading
+        return None if reading is None else reading.width_us
+
+    def close(self):
+        self.stop()
+        self._callback.cancel()
+        self.pi.write(self.trigger, 0)
+
+
+def open_ultrasonic(pi, trigger, echo, max_distance=DEFAULT_MAX_DISTANCE_M, backend='pigpio',
+                    rate_hz=DEFAULT_RATE_HZ):
+    """
+    Ultrasonic sensor with a .distance in metres.
+
+    Args:
+        backend: 'pigpio' (PigpioRanger, started) or 'gpiozero' (DistanceSensor on PiGPIOFactory)
+    """
+    if backend == 'pigpio':
+        return PigpioRanger(pi, trigger, echo, rate_hz=rate_hz, max_distance=max_distance).start()
+    if backend == 'gpiozero':
+        from gpiozero import DistanceSensor
+        from gpiozero.pins.pigpio import PiGPIOFactory
+        return DistanceSensor(echo=echo, trigger=trigger, max_distance=max_distance,
+                              pin_factory=PiGPIOFactory())
+    raise ValueError(f"Unknown ultrasonic backend: {backend}")
+
+
+def main():
+    """Range continuously and print distance, echo width and lost-echo statistics."""
+    import argparse
+    import pigpio
+
+    parser = argparse.ArgumentParser(description="pigpio HC-SR04 ranging")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE_HZ, help="pings per second (1-40)")
+    parser.add_argument('--trigger', type=int, default=14)
+    parser.add_argument('--echo', type=int, default=15)
+    parser.add_argument('--temperature', type=float, default=20.0, help="air temperature (C)")
+    args = parser.parse_args()
+
+    pi = pigpio.pi()
+    if not pi.connected:
+        exit("Failed to connect to pigpio daemon. Run 'sudo pigpiod' first.")
+    ranger = PigpioRanger(pi, args.trigger, args.echo, rate_hz=args.rate,
+                          temperature_c=args.temperature).start()
+    print(f"Ranging at {1 / ranger.interval:.1f} Hz, echo timeout {ranger.timeout_s * 1e3:.1f} ms")
+    try:
+        while True:
+            robot_clock.sleep(0.5)
+            reading = ranger.reading
+            if reading is not None:
+                distance = ' lost ' if reading.lost else f"{reading.distance_cm:6.1f}"
+                print(f"{distance} cm | echo {reading.width_us:6d} us | {ranger.stats}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ranger.close()
+        pi.stop()
+
+
+if __name__ == '__main__':
+    main()
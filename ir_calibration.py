@@ -0,0 +1,242 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Calibration tool and lookup table for the SHARP GP2Y0A21 IR distance sensor
+            = The single formula 27.86 / (V - 0.42) drifts badly across the sensor's range.
+            = This tool fits the curve to recorded (ADC code, true distance) pairs and compiles
+            = it into a 1024-entry table indexed by the 10-bit MCP3008 code, so converting a
+            = reading (or a whole NumPy block of readings) is a single array lookup.
+            =
+            = Model: 1 / (distance + k) = m * code + q   (k found by search, m and q by least squares)
+            =        or piecewise-linear through the points in 1/distance space (--method interp)
+            = Codes below the farthest calibrated point read inf (out of range), codes above the
+            = nearest calibrated point are clamped to it (the sensor folds back below ~10 cm).
+            =
+            = Usage: python ir_calibration.py record ir_points.csv   (hold a target, type its distance)
+            =        python ir_calibration.py fit ir_points.csv -o ir_lut.npz
+            =        python ir_calibration.py show ir_lut.npz
+'''
+
+import argparse
+import csv
+import os
+
+import numpy as np
+
+N_CODES = 1024
+REFERENCE_VOLTAGE = 3.3
+DEFAULT_LUT_FILE = 'ir_lut.npz'
+RECORD_SAMPLES = 32             # Engine readings averaged per calibration point
+OFFSET_SEARCH_CM = np.linspace(-5.0, 15.0, 201)
+
+# Datasheet formula used before calibration (MCP3008_irred_sensor.calculate_distance)
+DATASHEET_GAIN = 27.86
+DATASHEET_OFFSET_V = 0.42
+
+
+def code_to_voltage(codes, vref=REFERENCE_VOLTAGE):
+    return np.asarray(codes, dtype=np.float64) * vref / (N_CODES - 1)
+
+
+def datasheet_table(vref=REFERENCE_VOLTAGE):
+    """1024-entry table from the original hyperbolic formula."""
+    volts = code_to_voltage(np.arange(N_CODES), vref)
+    with np.errstate(divide='ignore'):
+        table = np.where(volts > DATASHEET_OFFSET_V, DATASHEET_GAIN / (volts - DATASHEET_OFFSET_V), np.inf)
+    return table.astype(np.float32)
+
+
+def load_points(path):
+    """Read (code, distance_cm) pairs from a CSV file with a 'code,distance_cm' header."""
+    codes, distances = [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            codes.append(float(row['code']))
+            distances.append(float(row['distance_cm']))
+    if len(codes) < 3:
+        raise ValueError(f"{path}: need at least 3 calibration points, got {len(codes)}")
+    return np.array(codes), np.array(distances)
+
+
+def fit_inverse(codes, distances):
+    """
+    Fit 1 / (d + k) = m * code + q.
+
+    Returns:
+        tuple: (k, m, q) with the lowest RMS error in distance
+    """
+    best = None
+    design = np.stack([codes, np.ones_like(codes)], axis=1)
+    for k in OFFSET_SEARCH_CM:
+        if np.any(distances + k <= 0):
+            continue
+        (m, q), *_ = np.linalg.lstsq(design, 1.0 / (distances + k), rcond=None)
+        inverse = m * codes + q
+        if np.any(inverse <= 0):
+            continue
+        error = np.sqrt(np.mean((1.0 / inverse - k - distances) ** 2))
+        if best is None or error < best[0]:
+            best = (error, k, m, q)
+    if best is None:
+        raise ValueError("Calibration points do not follow an inverse curve")
+    return best[1:]
+
+
+def compile_table(codes, distances, method='model'):
+    """
+    Build the 1024-entry code -> distance table.
+
+    Args:
+        codes: ADC codes of the calibration points (fractional codes are fine)
+        distances: True distances in cm
+        method: 'model' (fitted inverse curve) or 'interp' (piecewise linear in 1/distance)
+
+    Returns:
+        tuple: (float32 table, dict of fit parameters)
+    """
+    order = np.argsort(codes)
+    codes, distances = np.asarray(codes, float)[order], np.asarray(distances, float)[order]
+    all_codes = np.arange(N_CODES, dtype=np.float64)
+    if method == 'model':
+        k, m, q = fit_inverse(codes, distances)
+        with np.errstate(divide='ignore'):
+            table = 1.0 / (m * all_codes + q) - k
+        params = {'k': float(k), 'm': float(m), 'q': float(q)}
+    elif method == 'interp':
+        table = 1.0 / np.interp(all_codes, codes, 1.0 / distances)
+        params = {}
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    # Far side: no reliable reading below the farthest calibrated code
+    table[all_codes < np.floor(codes[0])] = np.inf
+    # Near side: the output voltage peaks and folds back, clamp to the nearest point
+    near = all_codes > np.ceil(codes[-1])
+    table[near] = distances[-1]
+    params.update(method=method, min_code=float(codes[0]), max_code=float(codes[-1]),
+                  min_distance=float(distances.min()), max_distance=float(distances.max()))
+    return table.astype(np.float32), params
+
+
+class IRDistanceLUT:
+    """
+    Code -> distance lookup table.
+
+    Args:
+        table: 1024 float32 distances in cm (inf = out of range)
+        params: Fit description stored with the table
+    """
+
+    def __init__(self, table, params=None, vref=REFERENCE_VOLTAGE):
+        table = np.asarray(table, dtype=np.float32)
+        if table.shape != (N_CODES,):
+            raise ValueError(f"Lookup table must have {N_CODES} entries, got {table.shape}")
+        self.table = table
+        self.params = dict(params or {})
+        self.vref = vref
+
+    @classmethod
+    def datasheet(cls, vref=REFERENCE_VOLTAGE):
+        return cls(datasheet_table(vref), {'method': 'datasheet'}, vref)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        params = {key[len('param_'):]: data[key].item() for key in data.files if key.startswith('param_')}
+        return cls(data['table'], params, float(data['vref']))
+
+    def save(self, path):
+        np.savez(path, table=self.table, vref=self.vref,
+                 **{f'param_{key}': value for key, value in self.params.items()})
+
+    def convert(self, codes):
+        """
+        Distances in cm for ADC codes: one code or an array block of any shape.
+        Fractional (oversampled) codes are rounded to the nearest entry.
+        """
+        index = np.clip(np.rint(codes), 0, N_CODES - 1).astype(np.intp)
+        result = self.table[index]
+        return float(result) if result.ndim == 0 else result
+
+    def convert_voltage(self, volts):
+        return self.convert(np.asarray(volts) * (N_CODES - 1) / self.vref)
+
+
+def load_lut(path=DEFAULT_LUT_FILE):
+    """Calibrated table if `path` exists, otherwise the datasheet formula."""
+    if path and os.path.exists(path):
+        return IRDistanceLUT.load(path)
+    return IRDistanceLUT.datasheet()
+
+
+def fit_report(lut, codes, distances):
+    """Per-point table comparing the LUT and the datasheet formula against the true distances."""
+    datasheet = IRDistanceLUT.datasheet(lut.vref)
+    rows = [f"{'code':>7} {'true cm':>8} {'lut cm':>8} {'err %':>7} {'formula cm':>11} {'err %':>7}"]
+    for code, true in sorted(zip(codes, distances)):
+        fitted, formula = lut.convert(code), datasheet.convert(code)
+        rows.append(f"{code:7.1f} {true:8.1f} {fitted:8.1f} {(fitted - true) / true * 100:7.1f} "
+                    f"{formula:11.1f} {(formula - true) / true * 100:7.1f}")
+    return "\n".join(rows)
+
+
+def record(path, samples=RECORD_SAMPLES):
+    """Interactive: average ADC channel 0 for each target distance and append to the CSV."""
+    from adc_engine import ADCEngine
+    import robot_clock
+
+    engine = ADCEngine(channels=(0,), rate_hz=50, oversample=16)
+    new_file = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(['code', 'distance_cm'])
+        print("Place a target, type its distance in cm and press Enter (empty line = finish)")
+        try:
+            while True:
+                text = input("distance cm> ").strip()
+                if not text:
+                    break
+                codes = []
+                for _ in range(samples):
+                    codes.append(engine.scan().raw[0])
+                    robot_clock.sleep(engine.interval)
+                code = float(np.median(codes))
+                writer.writerow([f"{code:.2f}", text])
+                f.flush()
+                print(f"  code {code:.2f} ({code_to_voltage(code):.3f} V) -> {text} cm")
+        finally:
+            engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GP2Y0A21 calibration and lookup table compiler")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('record', help="record calibration points from MCP3008 channel 0")
+    p.add_argument('points', help="CSV file to append (code,distance_cm)")
+    p.add_argument('--samples', type=int, default=RECORD_SAMPLES)
+    p = sub.add_parser('fit', help="fit the points and write the lookup table")
+    p.add_argument('points')
+    p.add_argument('-o', '--output', default=DEFAULT_LUT_FILE)
+    p.add_argument('--method', choices=('model', 'interp'), default='model')
+    p = sub.add_parser('show', help="print a lookup table")
+    p.add_argument('lut', nargs='?', default=DEFAULT_LUT_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        record(args.points, args.samples)
+    elif args.command == 'fit':
+        codes, distances = load_points(args.points)
+        table, params = compile_table(codes, distances, args.method)
+        lut = IRDistanceLUT(table, params)
+        lut.save(args.output)
+        print(fit_report(lut, codes, distances))
+        print(f"\nSaved {args.output}: {params}")
+    elif args.command == 'show':
+        lut = load_lut(args.lut)
+        print(f"Parameters: {lut.params}")
+        for code in range(0, N_CODES, 32):
+            print(f"code {code:4d} ({code_to_voltage(code):.2f} V) -> {lut.table[code]:7.1f} cm")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Per-stage latency histograms for the patrol loop, exported in Prometheus text format
+            = Each stage (servo settle, ultrasonic read, decision, movement, voltage read, alarm ...)
+            = gets an HDR-style histogram: exact counts below 32 us, then 32 linear sub-buckets per
+            = power of two, so every recorded value keeps ~3% precision from microseconds to hours
+            = in a fixed ~1000-slot table. Recording is one integer bucket increment.
+            = The histograms are served on localhost HTTP or a Unix socket:
+            =   curl http://127.0.0.1:9105/metrics
+            =   curl --unix-socket /tmp/robot_metrics.sock http://robot/metrics
+            = ROBOT_METRICS=0 (or LatencyMetrics(enabled=False)) turns every timer into a no-op.
+            = Run this file to measure the instrumentation overhead with and without it.
+'''
+
+import functools
+import http.server
+import os
+import socketserver
+import threading
+import timeit
+
+import robot_clock
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS      # 32 sub-buckets per power of two
+MAX_SHIFT = 32                          # Largest value ~ 2^37 us (38 hours)
+N_BUCKETS = SUB_BUCKETS * (MAX_SHIFT + 2)
+
+# Bucket bounds (seconds) exported as Prometheus `le` labels
+EXPORT_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+EXPORT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+DEFAULT_ADDRESS = '127.0.0.1:9105'
+
+
+def bucket_index(micros):
+    """HDR bucket for a latency in whole microseconds."""
+    if micros < SUB_BUCKETS:
+        return max(micros, 0)
+    shift = min(micros.bit_length() - SUB_BUCKET_BITS - 1, MAX_SHIFT)
+    return SUB_BUCKETS * (shift + 1) + min((micros >> shift) - SUB_BUCKETS, SUB_BUCKETS - 1)
+
+
+def bucket_upper(index):
+    """Largest value (microseconds) that falls into bucket `index`."""
+    if index < SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """HDR-style histogram of latencies, recorded in seconds and stored in microseconds."""
+
+    def __init__(self):
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        index = bucket_index(int(seconds * 1_000_000))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q):
+        """Latency (seconds) below which a fraction q of the recorded values fall."""
+        if not self.count:
+            return 0.0
+        target = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(bucket_upper(index) / 1_000_000, self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """Number of values <= each bound (seconds), for Prometheus buckets."""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            limit = int(bound * 1_000_000)
+            while index < N_BUCKETS and bucket_upper(index) <= limit:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * N_BUCKETS
+            self.count = 0
+            self.total = 0.0
+            self.min = None
+            self.max = 0.0
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = robot_clock.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(robot_clock.monotonic() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class LatencyMetrics:
+    """
+    Named latency histograms, one per patrol stage.
+
+    Times are taken from robot_clock, so under robot_sim they are simulated latencies.
+
+    Args:
+        prefix: Metric name prefix
+        enabled: False = timers do nothing (default: ROBOT_METRICS environment variable, on)
+    """
+
+    def __init__(self, prefix='robot_stage_latency', enabled=None):
+        if enabled is None:
+            enabled = os.environ.get('ROBOT_METRICS', '1') != '0'
+        self.prefix = prefix
+        self.enabled = enabled
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def time(self, stage):
+        """Context manager that records the time spent inside it under `stage`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage))
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def timed(self, stage):
+        """Decorator version of time()."""
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.time(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def prometheus(self):
+        """All histograms in Prometheus text exposition format."""
+        name = f"{self.prefix}_seconds"
+        lines = [f"# HELP {name} Patrol loop stage latency.", f"# TYPE {name} histogram"]
+        quantiles = [f"# HELP {self.prefix}_quantile_seconds Patrol loop stage latency quantiles.",
+                     f"# TYPE {self.prefix}_quantile_seconds gauge"]
+        for stage in sorted(self.stages):
+            histogram = self.stages[stage]
+            with histogram._lock:
+                for bound, seen in zip(EXPORT_BOUNDS, histogram.cumulative(EXPORT_BOUNDS)):
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {seen}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+                for q in EXPORT_QUANTILES:
+                    quantiles.append(f'{self.prefix}_quantile_seconds{{stage="{stage}",quantile="{q:g}"}} '
+                                     f'{histogram.quantile(q):.6f}')
+                quantiles.append(f'{self.prefix}_quantile_seconds{{stage="{stage}",quantile="1"}} '
+                                 f'{histogram.max:.6f}')
+        lines.append(f"# HELP {self.prefix}_enabled 1 if instrumentation is on.")
+        lines.append(f"# TYPE {self.prefix}_enabled gauge")
+        lines.append(f"{self.prefix}_enabled {int(self.enabled)}")
+        return "\n".join(lines + quantiles) + "\n"
+
+    def summary(self):
+        """Text table of count / p50 / p99 / max per stage (milliseconds)."""
+        rows = [f"{'stage':18} {'count':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        for stage in sorted(self.stages):
+            h = self.stages[stage]
+            rows.append(f"{stage:18} {h.count:8d} {h.quantile(0.5) * 1000:9.3f} "
+                        f"{h.quantile(0.99) * 1000:9.3f} {h.max * 1000:9.3f}")
+        return "\n".join(rows)
+
+    def serve(self, address=DEFAULT_ADDRESS):
+        """
+        Serve /metrics on a daemon thread.
+
+        Args:
+            address: 'host:port' (HTTP on that interface) or 'unix:/path/to/socket'
+
+        Returns:
+            Server with shutdown() / server_close()
+        """
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def address_string(self):
+                return address
+
+            def log_message(self, format, *args):
+                pass
+
+        if address.startswith('unix:'):
+            path = address[len('unix:'):]
+            if os.path.exists(path):
+                os.unlink(path)
+            server = _UnixHTTPServer(path, Handler)
+        else:
+            host, _, port = address.rpartition(':')
+            server = http.server.ThreadingHTTPServer((host or '127.0.0.1', int(port)), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def main():
+    """Measure the cost of one timed stage with instrumentation on and off."""
+    n = 200_000
+    for enabled in (True, False):
+        metrics = LatencyMetrics(enabled=enabled)
+
+        def stage():
+            with metrics.time('decision'):
+                pass
+
+        per_call = timeit.timeit(stage, number=n) / n
+        print(f"instrumentation {'on ' if enabled else 'off'}: {per_call * 1e6:.2f} us per timed stage")
+    baseline = timeit.timeit(lambda: None, number=n) / n
+    print(f"empty call      : {baseline * 1e6:.2f} us")
+
+    metrics = LatencyMetrics(enabled=True)
+    for i in range(1, 10001):
+        metrics.observe('example', i / 1_000_000)
+    print()
+    print(metrics.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Background LED patterns for the motion indicator LEDs
+            = LED_BLINK / blink_leds / turn_right / turn_left toggled the LEDs from the caller's
+            = loop (toggle, sleep(0.01), toggle...), so a turn blocked the patrol loop and every
+            = late wake-up stretched the blink. A pattern here is declared once:
+            =   steady()                   on until replaced        off()
+            =   blink(0.2)                 period 0.2 s, 50 % on    blink(1.0, duty=0.2, count=3)
+            =   burst(3)                   3 quick flashes, pause, repeat
+            =   alternate(0.5)             second LED in antiphase (wig-wag)
+            =   parse('blink 0.2 x10')     the same from a string (config files, robot_daemon)
+            = LedEngine.play(pattern, 'left', ...) starts it in the background and returns at once.
+            = A new pattern on an LED preempts the one running there. Edges are scheduled on
+            = robot_clock timers against absolute deadlines (start + n * period), so a late edge
+            = does not delay the next one and patterns also run on the simulator's clock.
+            = backend='gpiozero' hands plain blinks to gpiozero's own blink thread instead.
+            = (pigpio waves are left to the buzzer: the daemon transmits one wave at a time, and
+            = GPIO17 / 23 / 27 have no hardware PWM.)
+            =   python led_patterns.py --load      (benchmark: requested vs achieved blink period)
+'''
+
+import re
+import threading
+from collections import namedtuple
+
+import robot_clock
+
+BACKENDS = ('clock', 'gpiozero')
+FOREVER = float('inf')
+
+# steps: one cycle of (state, seconds); repeat: cycles (None = until replaced);
+# alternate: every second LED shows the opposite state
+Pattern = namedtuple('Pattern', 'steps repeat alternate')
+
+PATTERN_SYNTAX = re.compile(r'(steady|on|off|blink|burst|alternate)((?:\s+[\d.]+)*)(?:\s+x(\d+))?')
+
+
+def steady():
+    return Pattern(((1, FOREVER),), None, False)
+
+
+def off():
+    return Pattern(((0, FOREVER),), None, False)
+
+
+def blink(period, duty=0.5, count=None):
+    """On for period * duty, off for the rest; `count` flashes (None = until replaced)."""
+    if period <= 0 or not 0 < duty < 1:
+        raise ValueError(f"Bad blink: period {period} s, duty {duty}")
+    return Pattern(((1, period * duty), (0, period * (1 - duty))), count, False)
+
+
+def burst(n, on=0.05, gap=0.05, pause=0.5, count=None):
+    """`n` quick flashes, then `pause` seconds dark; `count` bursts."""
+    steps = ((1, on), (0, gap)) * (n - 1) + ((1, on), (0, pause))
+    return Pattern(steps, count, False)
+
+
+def alternate(period, count=None):
+    """Blink with the LEDs in antiphase: left on while right is off."""
+    return blink(period, count=count)._replace(alternate=True)
+
+
+def parse(text):
+    """
+    Pattern from text: 'steady', 'off', 'blink 0.2', 'blink 1.0 0.2 x3', 'burst 3', 'alternate 0.5 x4'.
+    Numbers are the helper's positional arguments, 'xN' the count.
+    """
+    match = PATTERN_SYNTAX.fullmatch(text.strip().lower())
+    if match is None:
+        raise ValueError(f"Bad LED pattern: {text!r}")
+    kind, numbers, count = match.groups()
+    args = [float(number) for number in numbers.split()]
+    if kind in ('steady', 'on'):
+        return steady()
+    if kind == 'off':
+        return off()
+    if kind == 'burst' and args:
+        args[0] = int(args[0])
+    helper = {'blink': blink, 'burst': burst, 'alternate': alternate}[kind]
+    return helper(*args, count=int(count) if count else None)
+
+
+def cycle_length(pattern):
+    return sum(seconds for _, seconds in pattern.steps)
+
+
+class PatternRun:
+    """
+    One pattern playing on a set of LEDs (returned by LedEngine.play()).
+
+    Attributes:
+        edges: LED writes made so far
+        max_late_s: Worst delay between an edge's deadline and its write
+    """
+
+    def __init__(self, engine, pattern, names, duration):
+        self.engine = engine
+        self.pattern = pattern
+        self.names = names
+        self.started = robot_clock.monotonic()
+        self.ends = self.started + (FOREVER if duration is None else duration)
+        if pattern.repeat is not None:
+            self.ends = min(self.ends, self.started + pattern.repeat * cycle_length(pattern))
+        self.edges = 0
+        self.max_late_s = 0.0
+        self._offsets = [0.0]
+        for _, seconds in pattern.steps:
+            self._offsets.append(self._offsets[-1] + seconds)
+        self._step = 0
+        self._timer = None
+        self._cancelled = False
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the pattern to end (True) or the timeout to pass (False)."""
+        return robot_clock.wait(self._done, timeout)
+
+    def cancel(self):
+        """Stop scheduling edges (the LEDs keep their current state)."""
+        with self.engine._lock:
+            self._cancelled = True
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._done.set()
+
+    def _deadline(self, step):
+        cycle, index = divmod(step, len(self.pattern.steps))
+        # `if cycle`: steady() cycles last forever, and 0 * inf is nan
+        return self.started + (cycle * self._offsets[-1] if cycle else 0.0) + self._offsets[index]
+
+    def _schedule(self, due):
+        if due == FOREVER:
+            return
+        self._timer = robot_clock.call_later(due - robot_clock.monotonic(), self._fire)
+
+    def _fire(self):
+        with self.engine._lock:
+            if self._cancelled:
+                return
+            due = self._deadline(self._step)
+            if due >= self.ends:
+                self.engine._finish(self)
+                return
+            self.max_late_s = max(self.max_late_s, robot_clock.monotonic() - due)
+            state = self.pattern.steps[self._step % len(self.pattern.steps)][0]
+            self.engine._write(self.names, state, self.pattern.alternate)
+            self.edges += 1
+            self._step += 1
+            self._schedule(min(self._deadline(self._step), self.ends))
+
+
+class _GpiozeroRun(PatternRun):
+    """A plain blink run by gpiozero's LED.blink(background=True) thread on each LED."""
+
+    def _fire(self):
+        with self.engine._lock:
+            if self._cancelled:
+                return
+            if self.edges:
+                self.engine._finish(self)
+                return
+            (_, on_time), (_, off_time) = self.pattern.steps
+            n = None if self.ends == FOREVER else round((self.ends - self.started) / (on_time + off_time))
+            for name in self.names:
+                self.engine.leds[name].blink(on_time, off_time, n=n, background=True)
+            self.edges += 1
+            self._schedule(self.ends)
+
+    def cancel(self):
+        super().cancel()
+        for name in self.names:
+            self.engine.leds[name].off()    # Also ends gpiozero's blink thread
+
+
+class LedEngine:
+    """
+    Plays patterns on named LEDs in the background.
+
+    Args:
+        backend: 'clock' (robot_clock timers) or 'gpiozero' (LED.blink threads for plain
+                 blinks on real hardware; other patterns still use the clock)
+        **leds: name -> gpiozero LED, e.g. left=LED(17), right=LED(27)
+    """
+
+    def __init__(self, backend='clock', **leds):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown LED backend: {backend} ({', '.join(BACKENDS)})")
+        self.backend = backend
+        self.leds = leds
+        self.stats = {'plays': 0, 'preempted': 0}
+        self._runs = {}             # LED name -> PatternRun playing on it
+        self._lock = threading.RLock()
+
+    def play(self, pattern, *names, duration=None):
+        """
+        Start a pattern and return at once, preempting whatever plays on those LEDs.
+
+        Args:
+            pattern: Pattern, or pattern text for parse()
+            names: LEDs to play it on (default: all, in declaration order)
+            duration: Seconds before the LEDs go off (None = the pattern's own count)
+
+        Returns:
+            PatternRun: Handle with wait() and cancel()
+        """
+        if isinstance(pattern, str):
+            pattern = parse(pattern)
+        names = names or tuple(self.leds)
+        unknown = set(names) - set(self.leds)
+        if unknown:
+            raise ValueError(f"Unknown LED: {', '.join(sorted(unknown))}")
+        with self._lock:
+            for run in {self._runs[name] for name in names if name in self._runs}:
+                run.cancel()
+                self.stats['preempted'] += 1
+                left_over = [name for name in run.names if name not in names]
+                self._write(left_over, 0, False)
+                for name in run.names:
+                    self._runs.pop(name, None)
+            run_class = _GpiozeroRun if self._gpiozero_blink(pattern) else PatternRun
+            run = run_class(self, pattern, names, duration)
+            for name in names:
+                self._runs[name] = run
+            self.stats['plays'] += 1
+            run._fire()             # First edge now, in the caller's thread
+            return run
+
+    def _gpiozero_blink(self, pattern):
+        return (self.backend == 'gpiozero' and not pattern.alternate and len(pattern.steps) == 2
+                and pattern.steps[0][0] == 1 and pattern.steps[1][0] == 0)
+
+    def _write(self, names, state, alternate):
+        for index, name in enumerate(names):
+            lit = state if not (alternate and index % 2) else 1 - state
+            led = self.leds[name]
+            led.on() if lit else led.off()
+
+    def _finish(self, run):
+        self._write(run.names, 0, False)
+        for name in run.names:
+            if self._runs.get(name) is run:
+                del self._runs[name]
+        run._done.set()
+
+    def steady(self, *names):
+        return self.play(steady(), *names)
+
+    def off(self, *names):
+        return self.play(off(), *names)
+
+    def stop(self):
+        """Cancel every pattern and turn all LEDs off."""
+        with self._lock:
+            for run in set(self._runs.values()):
+                run.cancel()
+            self._runs.clear()
+            self._write(tuple(self.leds), 0, False)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def legacy_blink(led, period, seconds):
+    """The old script loop: toggle, sleep half a period (blocks the caller)."""
+    for _ in range(int(seconds / (period / 2))):
+        led.toggle()
+        robot_clock.sleep(period / 2)
+    led.off()
+
+
+def achieved_periods(pin):
+    """Full periods (on + off) from a MockPin's state history."""
+    durations = [state.timestamp for state in pin.states[1:]]
+    # states[i].timestamp is how long the pin held its previous state
+    return [durations[i] + durations[i + 1] for i in range(1, len(durations) - 1, 2)]
+
+
+def busy_loop(stop):
+    """CPU-bound thread standing in for a busy patrol loop (fights for the GIL)."""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def main():
+    """Compare requested and achieved blink periods: legacy loop, gpiozero blink, LedEngine."""
+    import argparse
+    import statistics
+    import time
+    from gpiozero import LED, Device
+    from gpiozero.pins.mock import MockFactory
+
+    parser = argparse.ArgumentParser(description="LED pattern timing benchmark (mock pins)")
+    parser.add_argument('--periods', type=float, nargs='+', default=[0.02, 0.05, 0.2])
+    parser.add_argument('--seconds', type=float, default=2.0, help="length of each blink")
+    parser.add_argument('--load', action='store_true', help="run a CPU-bound thread alongside")
+    args = parser.parse_args()
+
+    Device.pin_factory = MockFactory()
+    stop_load = threading.Event()
+    if args.load:
+        threading.Thread(target=busy_loop, args=(stop_load,), daemon=True).start()
+
+    print(f"{'method':9s} {'period':>7s} {'achieved':>9s} {'error':>7s} {'jitter':>7s} {'drift':>8s} "
+          f"{'caller blocked':>15s}  (ms{', CPU load' if args.load else ''})")
+    pin_number = 2
+    try:
+        for period in args.periods:
+            for method in ('legacy', 'gpiozero', 'engine'):
+                led = LED(pin_number)
+                pin_number += 1
+                engine = LedEngine(backend='gpiozero' if method == 'gpiozero' else 'clock', led=led)
+                started = time.perf_counter()
+                if method == 'legacy':
+                    legacy_blink(led, period, args.seconds)
+                    blocked = time.perf_counter() - started
+                else:
+                    run = engine.play(blink(period), duration=args.seconds)
+                    blocked = time.perf_counter() - started
+                    run.wait()
+                    time.sleep(period)      # Let gpiozero's thread write its last edge
+                periods = achieved_periods(led.pin)
+                if len(periods) < 2:
+                    print(f"{method:9s} {period * 1e3:7.1f} too few edges")
+                    continue
+                mean = statistics.mean(periods)
+                drift = sum(periods) - len(periods) * period
+                print(f"{method:9s} {period * 1e3:7.1f} {mean * 1e3:9.2f} {(mean / period - 1) * 100:6.1f}% "
+                      f"{statistics.stdev(periods) * 1e3:7.2f} {drift * 1e3:8.1f} {blocked * 1e3:15.2f}")
+                engine.stop()
+                led.close()
+    finally:
+        stop_load.set()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Incremental log-odds occupancy grid built from servo scans
+            = The map is split into square NumPy tiles that are created only where beams land.
+            = Each ultrasonic reading is ray-cast from the robot pose in one vectorized step:
+            = cells the beam passes through become more "free", the cell it ends in becomes more
+            = "occupied". Only those cells are touched, so an update costs the same on a long patrol
+            = as on a short one. A fixed memory budget caps the number of tiles; the least recently
+            = updated tile is dropped when a new one is needed.
+            = Feeds: scan_obstacles() result dicts, sweep_scan profiles, or raw (bearing, range) beams.
+'''
+
+from collections import OrderedDict
+
+import numpy as np
+
+TILE_CELLS = 64               # Tile edge in cells
+RESOLUTION_M = 0.05           # Cell edge in metres
+MEMORY_BUDGET_BYTES = 4 * 1024 * 1024
+L_OCC = 0.85                  # Log-odds added to the hit cell
+L_FREE = -0.4                 # Log-odds added to cells the beam passes through
+L_MIN = -5.0
+L_MAX = 5.0
+
+
+def _cell_keys(cells):
+    """Pack (x, y) cell indices into one int64 per cell."""
+    return (cells[:, 0] << 32) + (cells[:, 1] & 0xFFFFFFFF)
+
+
+def _unique_cells(cells):
+    """Unique (x, y) rows; 1-D unique on packed keys is much faster than unique(axis=0)."""
+    keys = np.unique(_cell_keys(cells))
+    low = keys & 0xFFFFFFFF
+    return np.stack([keys >> 32, (low ^ 0x80000000) - 0x80000000], axis=1)
+
+
+class OccupancyGrid:
+    """
+    Tiled log-odds occupancy grid.
+
+    Args:
+        resolution: Cell size in metres
+        tile_cells: Tile edge length in cells
+        memory_budget: Maximum bytes used by tile arrays
+    """
+
+    def __init__(self, resolution=RESOLUTION_M, tile_cells=TILE_CELLS, memory_budget=MEMORY_BUDGET_BYTES):
+        self.resolution = resolution
+        self.tile_cells = tile_cells
+        self.tile_bytes = tile_cells * tile_cells * np.dtype(np.float32).itemsize
+        self.max_tiles = max(1, memory_budget // self.tile_bytes)
+        self.tiles = OrderedDict()    # (tx, ty) -> float32 array [row=y, col=x], LRU order
+        self.evicted_tiles = 0
+        self.updates = 0
+
+    @property
+    def memory_bytes(self):
+        return len(self.tiles) * self.tile_bytes
+
+    def _tile(self, key):
+        tile = self.tiles.get(key)
+        if tile is None:
+            if len(self.tiles) >= self.max_tiles:
+                self.tiles.popitem(last=False)
+                self.evicted_tiles += 1
+            tile = np.zeros((self.tile_cells, self.tile_cells), dtype=np.float32)
+            self.tiles[key] = tile
+        else:
+            self.tiles.move_to_end(key)
+        return tile
+
+    def _apply(self, cells, delta):
+        """Add delta to a set of unique (x, y) cell indices, tile by tile."""
+        if not len(cells):
+            return
+        tile_keys = cells // self.tile_cells
+        local = cells - tile_keys * self.tile_cells
+        packed, first, inverse = np.unique(_cell_keys(tile_keys), return_index=True, return_inverse=True)
+        for i, (tx, ty) in enumerate(tile_keys[first]):
+            mask = inverse == i
+            tile = self._tile((int(tx), int(ty)))
+            rows, cols = local[mask, 1], local[mask, 0]
+            tile[rows, cols] = np.clip(tile[rows, cols] + delta, L_MIN, L_MAX)
+
+    def update_beams(self, pose, bearings, ranges, max_range):
+        """
+        Ray-cast a batch of range readings taken from one pose.
+
+        Args:
+            pose: (x, y, heading) in metres / radians
+            bearings: Beam directions relative to the heading (radians, left positive)
+            ranges: Measured ranges in metres
+            max_range: Sensor maximum; readings at or beyond it only clear cells
+        """
+        x, y, heading = pose
+        bearings = np.atleast_1d(np.asarray(bearings, dtype=np.float64))
+        ranges = np.minimum(np.atleast_1d(np.asarray(ranges, dtype=np.float64)), max_range)
+        if not bearings.size:
+            return
+        angles = heading + bearings
+        directions = np.stack([np.cos(angles), np.sin(angles)], axis=1)
+
+        # Sample every beam at half-cell steps up to (but not including) its end point
+        step = self.resolution / 2
+        steps = np.arange(int(np.ceil(ranges.max() / step)) + 1) * step
+        along = steps[None, :] < ranges[:, None]
+        points = np.array([x, y]) + directions[:, None, :] * steps[None, :, None]
+        free = np.floor(points[along] / self.resolution).astype(np.int64)
+
+        hit_mask = ranges < max_range
+        ends = np.array([x, y]) + directions[hit_mask] * ranges[hit_mask, None]
+        hits = _unique_cells(np.floor(ends / self.resolution).astype(np.int64))
+
+        free = _unique_cells(free)
+        if len(hits) and len(free):
+            # A cell holding an echo is never cleared by the same batch
+            free = free[~np.isin(_cell_keys(free), _cell_keys(hits))]
+        self._apply(free, L_FREE)
+        self._apply(hits, L_OCC)
+        self.updates += 1
+
+    def update_profile(self, pose, profile, max_range_cm=400, forward_angle=90):
+        """
+        Add a sweep_scan profile: list of (timestamp, servo_angle, distance_cm).
+
+        Args:
+            pose: (x, y, heading) robot pose for the sweep
+            profile: SweepScanner.sweep() result
+            max_range_cm: DistanceSensor max_distance in cm
+            forward_angle: Servo angle that points straight ahead
+        """
+        if not profile:
+            return
+        data = np.asarray([(angle, distance) for _, angle, distance in profile], dtype=np.float64)
+        bearings = np.radians(data[:, 0] - forward_angle)
+        self.update_beams(pose, bearings, data[:, 1] / 100, max_range_cm / 100)
+
+    def update_scan_results(self, pose, results, sector_angles, max_range_cm=400, forward_angle=90):
+        """
+        Add a scan_obstacles() result dict.
+
+        Args:
+            pose: (x, y, heading) robot pose for the scan
+            results: dict with '<sector>_distance' entries in cm
+            sector_angles: dict of sector name -> servo angle, e.g. {'left': 180, 'center': 90, 'right': 0}
+        """
+        if 'profile' in results:
+            self.update_profile(pose, results['profile'], max_range_cm, forward_angle)
+            return
+        angles, distances = [], []
+        for name, angle in sector_angles.items():
+            distance = results.get(f'{name}_distance')
+            if distance is not None:
+                angles.append(angle)
+                distances.append(distance)
+        self.update_beams(pose, np.radians(np.asarray(angles, dtype=np.float64) - forward_angle),
+                          np.asarray(distances, dtype=np.float64) / 100, max_range_cm / 100)
+
+    def log_odds(self, x, y):
+        """Log-odds at a world position (0 = unknown)."""
+        cx, cy = int(np.floor(x / self.resolution)), int(np.floor(y / self.resolution))
+        tile = self.tiles.get((cx // self.tile_cells, cy // self.tile_cells))
+        if tile is None:
+            return 0.0
+        return float(tile[cy % self.tile_cells, cx % self.tile_cells])
+
+    def probability(self, x, y):
+        """Occupancy probability at a world position (0.5 = unknown)."""
+        return 1.0 / (1.0 + np.exp(-self.log_odds(x, y)))
+
+    def to_array(self):
+        """
+        Assemble the loaded tiles into one dense probability image.
+
+        Returns:
+            tuple: (array [row=y, col=x], (origin_x, origin_y) of cell [0, 0] in metres)
+        """
+        if not self.tiles:
+            return np.full((0, 0), 0.5, dtype=np.float32), (0.0, 0.0)
+        keys = np.array(list(self.tiles.keys()))
+        (tx0, ty0), (tx1, ty1) = keys.min(axis=0), keys.max(axis=0)
+        n = self.tile_cells
+        logodds = np.zeros(((ty1 - ty0 + 1) * n, (tx1 - tx0 + 1) * n), dtype=np.float32)
+        for (tx, ty), tile in self.tiles.items():
+            logodds[(ty - ty0) * n:(ty - ty0 + 1) * n, (tx - tx0) * n:(tx - tx0 + 1) * n] = tile
+        origin = (tx0 * n * self.resolution, ty0 * n * self.resolution)
+        return 1.0 / (1.0 + np.exp(-logodds)), origin
+
+    def save(self, path):
+        """Save the probability image and its origin to a .npz file."""
+        image, origin = self.to_array()
+        np.savez_compressed(path, probability=image, origin=np.array(origin), resolution=self.resolution)
@@ -8,14 +8,18 @@ Description = Square pattern patrol for Raspberry Pi 3B robot
             = - Right Turn: Right LED blinks at 10ms
             = - Left Turn: Left LED blinks at 10ms
             = - Stop: Both LEDs OFF
+            = The blinking runs in the background (led_patterns.py), not in a toggle loop
 '''
 
-from gpiozero import LED
-from time import sleep
+import hardware
+from robot_clock import sleep
+from led_patterns import LedEngine, blink
 
-# GPIO pin assignments
-LED_LEFT = LED(17)
-LED_RIGHT = LED(23)
+# GPIO pin assignments: devices are created on first use (hardware.py)
+hw = hardware.get_registry()
+LED_LEFT = hw.led(17)
+LED_RIGHT = hw.led(23)
+leds = hw.device('leds', lambda: LedEngine(left=LED_LEFT, right=LED_RIGHT), close='stop')
 
 # Configuration
 FORWARD_DURATION = 2      # Seconds to move forward
@@ -37,11 +41,9 @@ def move_forward(duration=FORWARD_DURATION):
         duration: Time in seconds to move forward
     """
     print("[FORWARD] Moving forward...")
-    LED_LEFT.on()
-    LED_RIGHT.on()
+    leds.steady()
     sleep(duration)
-    LED_LEFT.off()
-    LED_RIGHT.off()
+    leds.off()
 
 
 def turn_right(duration=TURN_DURATION):
@@ -55,13 +57,8 @@ def turn_right(duration=TURN_DURATION):
     print("[RIGHT TURN] Turning right...")
     LED_LEFT.off()
     
-    # Blink right LED rapidly
-    blink_count = int(duration / (BLINK_INTERVAL * 2))  # Account for on/off cycle
-    for _ in range(blink_count):
-        LED_RIGHT.toggle()
-        sleep(BLINK_INTERVAL)
-    
-    LED_RIGHT.off()
+    # Blink right LED rapidly (toggles every BLINK_INTERVAL), off when the turn ends
+    leds.play(blink(BLINK_INTERVAL * 2), 'right', duration=duration).wait()
 
 
 def turn_left(duration=TURN_DURATION):
@@ -75,13 +72,8 @@ def turn_left(duration=TURN_DURATION):
     print("[LEFT TURN] Turning left...")
     LED_RIGHT.off()
     
-    # Blink left LED rapidly
-    blink_count = int(duration / (BLINK_INTERVAL * 2))  # Account for on/off cycle
-    for _ in range(blink_count):
-        LED_LEFT.toggle()
-        sleep(BLINK_INTERVAL)
-    
-    LED_LEFT.off()
+    # Blink left LED rapidly (toggles every BLINK_INTERVAL), off when the turn ends
+    leds.play(blink(BLINK_INTERVAL * 2), 'left', duration=duration).wait()
 
 
 def stop_movement():
@@ -90,8 +82,7 @@ def stop_movement():
     LEDs: Both OFF
     """
     print("[STOP] Stopping robot...")
-    LED_LEFT.off()
-    LED_RIGHT.off()
+    leds.stop()
 
 
 def square_patrol_cycle():
@@ -133,6 +124,11 @@ def main():
     """Main program loop for square pattern patrol."""
     global patrol_active
     
+    try:
+        hw.connect()
+    except hardware.HardwareError as e:
+        exit(str(e))
+
     try:
         print("\n" + "=" * 60)
         print("SQUARE PATTERN PATROL - Raspberry Pi 3B")
@@ -166,6 +162,7 @@ def main():
         stop_movement()
         LED_LEFT.off()
         LED_RIGHT.off()
+        hw.close()
         print("Cleanup completed")
 
 
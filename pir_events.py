@@ -0,0 +1,385 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Timestamped PIR event stream with debouncing and motion-rate queries
+            = The PIR callbacks only kept motion_count, last_motion_event and one
+            = motion_detected_time, so "how many triggers in the last 5 minutes" needed the logs.
+            = PirEvents keeps every rise / fall of the PIR output:
+            = - edges come from a pigpio callback on the PIR GPIO and are timed from the daemon's
+            =   tick (microseconds at the edge, not when Python got round to it): the edge time is
+            =   now minus the ticks since the edge, so hours without motion lose nothing to the
+            =   u32 tick wrapping
+            = - an edge is held back for debounce_s: an opposite edge inside that time cancels
+            =   both (a glitch); repeated levels are dropped, so the stream always alternates
+            =   rise, fall, rise... and each event keeps the time of its edge
+            = - events go into a bounded ring ordered by time; each record also holds the
+            =   seconds of motion before it, so count / rate / duty over any window are two
+            =   binary searches (O(log n)) and last(n) is a slice
+            = - the ring is a memory-mapped file (17 bytes per event), so history survives restarts
+            =
+            = File layout (little endian):
+            =   header : magic 'RPIR', version u16, record size u16, capacity u32, records written u64,
+            =            recording started f64 (epoch seconds)
+            =   records: capacity x record, record n is stored in slot n % capacity
+            =   record : time f64 (epoch seconds), seconds of motion before it f64, level u8
+            =   python pir_events.py robot_pir_events.bin --window 300     (report a history file)
+            =   python pir_events.py --benchmark 100000                     (query cost vs a scan)
+'''
+
+import bisect
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+
+import robot_clock
+
+MAGIC = b'RPIR'
+VERSION = 2
+HEADER = struct.Struct('<4sHHIQd')
+RECORD = struct.Struct('<ddB')
+TIME = struct.Struct('<d')
+WRITTEN_OFFSET = 12         # Offset of the "records written" counter inside the header
+DEFAULT_CAPACITY = 65536    # 17 bytes per event -> 1.1 MB file
+DEFAULT_DEBOUNCE_S = 0.05
+TICK_WRAP = 1 << 32         # pigpio ticks are u32 microseconds (wrap every 71.6 minutes)
+PIGPIO_TIMEOUT = 2          # Level reported by a pigpio watchdog, not an edge
+
+FALL = 0
+RISE = 1
+
+PirEvent = namedtuple('PirEvent', 'time level')
+Summary = namedtuple('Summary', 'window_s triggers rate_per_min duty last_motion')
+
+
+class _Times:
+    """Read-only sequence of event times, oldest first, for bisect."""
+
+    def __init__(self, log):
+        self.log = log
+
+    def __len__(self):
+        return self.log.retained
+
+    def __getitem__(self, index):
+        return TIME.unpack_from(self.log._buffer, self.log._offset(self.log.oldest + index))[0]
+
+
+class PirEvents:
+    """
+    Debounced PIR rise / fall events in a time-indexed ring.
+
+    Args:
+        path: Ring file, kept across restarts (None = in memory only)
+        capacity: Events kept before the oldest are overwritten (a new file only)
+        debounce_s: A rise and fall closer than this are dropped as a glitch (0 = no debounce)
+        readonly: Open an existing file for queries only (e.g. while the robot writes it)
+    """
+
+    def __init__(self, path=None, capacity=DEFAULT_CAPACITY, debounce_s=DEFAULT_DEBOUNCE_S, readonly=False):
+        self.path = path
+        self.debounce_s = debounce_s
+        self.readonly = readonly
+        self.stats = {'edges': 0, 'recorded': 0, 'repeats': 0, 'glitches': 0}
+        self._lock = threading.RLock()     # Edges arrive on pigpio's callback thread
+        self._callback = None
+        self._pi = None
+        self._pending = None        # Edge waiting out the debounce time
+        self._times = _Times(self)
+        if path is None:
+            self._buffer = bytearray(file_size(capacity))
+            HEADER.pack_into(self._buffer, 0, MAGIC, VERSION, RECORD.size, capacity, 0, robot_clock.time())
+        else:
+            self._buffer = self._open(path, capacity)
+        _, _, _, self.capacity, self.written, self.started = HEADER.unpack_from(self._buffer, 0)
+        last = self.last(1)
+        if last and last[0].level == RISE and not readonly:
+            # The PIR state while the robot was off is unknown: end the open motion period
+            # where it was last seen rather than counting the downtime as motion
+            self._append(last[0].time, FALL)
+
+    def _open(self, path, capacity):
+        if self.readonly:
+            with open(path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._check(buffer)
+            return buffer
+        if os.path.exists(path):
+            with open(path, 'r+b') as f:
+                buffer = mmap.mmap(f.fileno(), 0)
+            try:
+                self._check(buffer)
+                return buffer
+            except ValueError:
+                buffer.close()      # Not a PIR history (or an older format): start a new one
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w+b') as f:
+            f.truncate(file_size(capacity))
+            buffer = mmap.mmap(f.fileno(), file_size(capacity))
+        HEADER.pack_into(buffer, 0, MAGIC, VERSION, RECORD.size, capacity, 0, robot_clock.time())
+        return buffer
+
+    def _check(self, buffer):
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{self.path} is not a PIR event file")
+        magic, version, record_size, capacity, _, _ = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a PIR event file")
+        if version != VERSION or record_size != RECORD.size or len(buffer) < file_size(capacity):
+            raise ValueError(f"Unsupported PIR event format: version {version}, record size {record_size}")
+
+    # --- ring ----------------------------------------------------------------
+
+    @property
+    def oldest(self):
+        """Sequence number of the oldest event still in the ring."""
+        if self.readonly:
+            self.written = struct.unpack_from('<Q', self._buffer, WRITTEN_OFFSET)[0]
+        return max(self.written - self.capacity, 0)
+
+    @property
+    def retained(self):
+        return self.written - self.oldest
+
+    def covered_from(self):
+        """Epoch seconds from which the ring holds every event (recording start, or the oldest kept)."""
+        if not self.retained:
+            return self.started
+        first = self._times[0]
+        # Once the ring has wrapped, nothing before its oldest event is known
+        return first if self.oldest else min(self.started, first)
+
+    def _offset(self, seq):
+        return HEADER.size + (seq % self.capacity) * RECORD.size
+
+    def _record(self, seq):
+        return RECORD.unpack_from(self._buffer, self._offset(seq))
+
+    def _append(self, when, level):
+        high_s = 0.0
+        if self.written:
+            last_time, last_high_s, last_level = self._record(self.written - 1)
+            when = max(when, last_time)     # Wall clock stepped back (NTP, a new file on a new clock)
+            high_s = last_high_s + (when - last_time if last_level == RISE else 0.0)
+        RECORD.pack_into(self._buffer, self._offset(self.written), when, high_s, level)
+        # The counter is published after the record so a reader never sees a half-written slot
+        self.written += 1
+        struct.pack_into('<Q', self._buffer, WRITTEN_OFFSET, self.written)
+        self.stats['recorded'] += 1
+
+    def edge(self, level, when=None):
+        """
+        Add one PIR edge. It is held back for debounce_s: an opposite edge inside that time
+        cancels both (a glitch), otherwise it is written with its own timestamp.
+
+        Args:
+            level: RISE (motion) or FALL
+            when: Epoch seconds of the edge (default: now)
+
+        Returns:
+            bool: True if the stream changed
+        """
+        if self.readonly:
+            raise ValueError(f"{self.path} is open read-only")
+        when = robot_clock.time() if when is None else when
+        with self._lock:
+            self.stats['edges'] += 1
+            pending = self._pending
+            if pending is not None and when - pending.time < self.debounce_s:
+                self._pending = None
+                self.stats['glitches'] += 1
+                return True
+            self._settle(pending)
+            if self.written and level == self._record(self.written - 1)[2]:
+                self.stats['repeats'] += 1
+                return False
+            self._pending = pending = PirEvent(when, level)
+            if self.debounce_s > 0:
+                robot_clock.call_later(self.debounce_s, lambda: self._settle(pending))
+            else:
+                self._settle(pending)
+            return True
+
+    def _settle(self, pending):
+        """Write the held-back edge (if it is still the one held back)."""
+        with self._lock:
+            if pending is not None and self._pending is pending:
+                self._pending = None
+                self._append(pending.time, pending.level)
+
+    # --- pigpio --------------------------------------------------------------
+
+    def attach(self, pi, pin):
+        """
+        Record the edges of `pin` from a pigpio callback, timed by the daemon's tick.
+        Calling it again moves the callback (robot_daemon reloads the script).
+        """
+        import pigpio
+        with self._lock:
+            self.detach()
+            self._pi = pi
+            self._callback = pi.callback(pin, pigpio.EITHER_EDGE, self._on_edge)
+        return self
+
+    def _on_edge(self, gpio, level, tick):
+        if level == PIGPIO_TIMEOUT:
+            return
+        # Ticks since the edge, not since the previous edge: the callback runs well inside one
+        # wrap of the edge, however long the PIR was quiet before it
+        age_s = ((self._pi.get_current_tick() - tick) % TICK_WRAP) / 1e6
+        self.edge(level, robot_clock.time() - age_s)
+
+    def detach(self):
+        with self._lock:
+            if self._callback is not None:
+                self._callback.cancel()
+                self._callback = None
+
+    # --- queries -------------------------------------------------------------
+
+    def _index(self, when):
+        """Number of retained events at or before `when`."""
+        return bisect.bisect_right(self._times, when)
+
+    def _high_s(self, when):
+        """Seconds of motion in the retained history up to `when`."""
+        index = self._index(when)
+        if index == 0:
+            return self._record(self.oldest)[1] if self.retained else 0.0
+        event_time, high_s, level = self._record(self.oldest + index - 1)
+        return high_s + (when - event_time if level == RISE else 0.0)
+
+    def count(self, window_s, now=None):
+        """Motion triggers (rises) in the last `window_s` seconds."""
+        now = robot_clock.time() if now is None else now
+        with self._lock:
+            start, end = self._index(now - window_s), self._index(now)
+            if start == end:
+                return 0
+            # Levels alternate, so the first level and the number of events give the rises
+            first_level = self._record(self.oldest + start)[2]
+            return (end - start + first_level) // 2
+
+    def rate(self, window_s, now=None):
+        """Motion triggers per minute over the last `window_s` seconds."""
+        return self.count(window_s, now) * 60.0 / window_s
+
+    def duty(self, window_s, now=None):
+        """Fraction of the last `window_s` seconds with motion (counted from covered_from() at most)."""
+        now = robot_clock.time() if now is None else now
+        with self._lock:
+            if not self.retained:
+                return 0.0
+            start = max(now - window_s, self.covered_from())
+            if now <= start:
+                return 0.0
+            return (self._high_s(now) - self._high_s(start)) / (now - start)
+
+    def last(self, n):
+        """The last `n` events, oldest first."""
+        with self._lock:
+            oldest = self.oldest        # Also refreshes `written` of a read-only file
+            start = max(self.written - n, oldest)
+            end = self.written
+            return [PirEvent(*self._record(seq)[::2]) for seq in range(start, end)]
+
+    def between(self, start, end):
+        """Events with start < time <= end."""
+        with self._lock:
+            first, stop = self._index(start), self._index(end)
+            return [PirEvent(*self._record(self.oldest + index)[::2]) for index in range(first, stop)]
+
+    def last_motion(self):
+        """Epoch seconds of the latest rise, or None."""
+        for event in reversed(self.last(2)):
+            if event.level == RISE:
+                return event.time
+        return None
+
+    def summary(self, window_s, now=None):
+        with self._lock:
+            return Summary(window_s, self.count(window_s, now), self.rate(window_s, now),
+                           self.duty(window_s, now), self.last_motion())
+
+    def flush(self):
+        with self._lock:
+            if isinstance(self._buffer, mmap.mmap) and not self.readonly:
+                self._buffer.flush()
+
+    def close(self):
+        with self._lock:
+            self.detach()
+            self._settle(self._pending)
+            if isinstance(self._buffer, mmap.mmap):
+                self.flush()
+                self._buffer.close()
+                self._buffer = bytearray(file_size(self.capacity))
+                self.written = 0
+
+
+def file_size(capacity):
+    return HEADER.size + capacity * RECORD.size
+
+
+# ============================================================================
+# REPORT / BENCHMARK
+# ============================================================================
+
+def _linear_count(events, start, end):
+    return sum(1 for event in events if start < event.time <= end and event.level == RISE)
+
+
+def main():
+    """Report a PIR history file, or time the queries against a linear scan."""
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="PIR event history")
+    parser.add_argument('path', nargs='?', default='robot_pir_events.bin')
+    parser.add_argument('--window', type=float, default=300, help="query window in seconds")
+    parser.add_argument('--last', type=int, default=10, help="events to list")
+    parser.add_argument('--benchmark', type=int, metavar='N', help="time queries on N synthetic events")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        rng = random.Random(0)
+        log = PirEvents(None, capacity=args.benchmark, debounce_s=0)
+        now = 1.7e9
+        for _ in range(args.benchmark // 2):
+            now += rng.expovariate(1 / 60)
+            log.edge(RISE, now)
+            now += rng.uniform(2, 20)
+            log.edge(FALL, now)
+        events = log.last(args.benchmark)
+        repeat = 200
+        started = time.perf_counter()
+        for _ in range(repeat):
+            triggers = log.count(args.window, now)
+            log.duty(args.window, now)
+        query_us = (time.perf_counter() - started) / repeat * 1e6
+        started = time.perf_counter()
+        scanned = _linear_count(events, now - args.window, now)
+        scan_us = (time.perf_counter() - started) * 1e6
+        print(f"{log.retained} events | count + duty over {args.window:.0f} s: {query_us:.1f} us "
+              f"(linear scan: {scan_us:.0f} us) | triggers {triggers} (scan {scanned})")
+        return
+
+    if not os.path.exists(args.path):
+        exit(f"No PIR history at {args.path}")
+    log = PirEvents(args.path, readonly=True)
+    summary = log.summary(args.window)
+    print(f"{log.path}: {log.retained} events kept (capacity {log.capacity}, {log.written} recorded)")
+    print(f"Last {args.window:.0f} s: {summary.triggers} triggers | {summary.rate_per_min:.2f} per minute | "
+          f"motion {summary.duty * 100:.1f}% of the time")
+    for event in log.last(args.last):
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.time))
+        print(f"  {stamp}.{int(event.time % 1 * 1000):03d}  {'motion' if event.level == RISE else 'clear'}")
+    log.close()
+
+
+if __name__ == '__main__':
+    main()
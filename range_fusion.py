@@ -0,0 +1,232 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Streaming Kalman fusion of the ultrasonic and SHARP IR range readings
+            = One scalar Kalman filter per servo heading tracks the distance to the nearest object
+            = and its variance. Every ultrasonic sample (DistanceSampler, ~20 Hz) and every IR
+            = sample (ADCEngine channel, converted with the ir_calibration lookup table) is an
+            = update with that sensor's own noise model:
+            = - HC-SR04  : sigma = 1 cm + 1% of range, valid 2-400 cm
+            = - GP2Y0A21 : sigma = 0.5 cm + 0.0008 * d^2 (grows fast with range), valid 10-80 cm
+            = Between updates the variance grows with the process noise (the robot moves).
+            = Readings more than 3 sigma from the estimate are rejected; repeated ultrasonic
+            = rejections restart the track (a new object really appeared).
+            = point(angle) tells the filter where the servo is going: readings taken while it swings
+            = are dropped, and wait() returns as soon as the new heading's estimate has converged,
+            = which is usually well before the fixed settle sleep would have ended.
+'''
+
+import threading
+from collections import namedtuple
+
+import robot_clock
+from sweep_scan import SERVO_SPEED_DPS, SERVO_LAG_S
+
+PROCESS_NOISE_CM_S = 10.0       # Distance random walk (cm per sqrt(s)) while the robot moves
+GATE_SIGMAS = 3.0
+RESET_AFTER_REJECTS = 3
+SETTLE_MARGIN_S = 0.05          # Extra time after the estimated servo move
+POLL_INTERVAL_S = 0.05
+
+FusedRange = namedtuple('FusedRange', 'distance variance time updates heading')
+
+
+class RangeNoise:
+    """
+    Measurement noise model for one range sensor.
+
+    Args:
+        name: Source name
+        sigma0: Constant standard deviation (cm)
+        sigma_rel: Standard deviation per cm of range
+        sigma_sq: Standard deviation per cm^2 of range
+        min_cm, max_cm: Valid measurement range
+        can_reset: True if repeated rejected readings from this source may restart the track
+    """
+
+    def __init__(self, name, sigma0, sigma_rel=0.0, sigma_sq=0.0, min_cm=0.0, max_cm=float('inf'),
+                 can_reset=False):
+        self.name = name
+        self.sigma0 = sigma0
+        self.sigma_rel = sigma_rel
+        self.sigma_sq = sigma_sq
+        self.min_cm = min_cm
+        self.max_cm = max_cm
+        self.can_reset = can_reset
+
+    def valid(self, distance):
+        return distance is not None and self.min_cm <= distance <= self.max_cm
+
+    def variance(self, distance):
+        sigma = self.sigma0 + self.sigma_rel * distance + self.sigma_sq * distance * distance
+        return sigma * sigma
+
+
+ULTRASONIC_NOISE = RangeNoise('ultrasonic', 1.0, sigma_rel=0.01, min_cm=2, max_cm=400, can_reset=True)
+IR_NOISE = RangeNoise('ir', 0.5, sigma_sq=0.0008, min_cm=10, max_cm=80)
+
+
+class _Track:
+    __slots__ = ('x', 'p', 't', 'updates', 'rejects')
+
+    def __init__(self, x, p, t):
+        self.x = x
+        self.p = p
+        self.t = t
+        self.updates = 1
+        self.rejects = 0
+
+
+class RangeFusion:
+    """
+    Fuse range sources into one distance estimate per heading.
+
+    Args:
+        ultrasonic: DistanceSampler (optional)
+        ir_channel: ADCChannel of the IR sensor (optional)
+        ir_lut: ir_calibration.IRDistanceLUT used to convert IR codes
+        process_noise: Distance random walk in cm per sqrt(second)
+    """
+
+    def __init__(self, ultrasonic=None, ir_channel=None, ir_lut=None, process_noise=PROCESS_NOISE_CM_S,
+                 ultrasonic_noise=ULTRASONIC_NOISE, ir_noise=IR_NOISE):
+        self.ultrasonic = ultrasonic
+        self.ir_channel = ir_channel
+        self.ir_lut = ir_lut
+        self.q = process_noise * process_noise
+        self.ultrasonic_noise = ultrasonic_noise
+        self.ir_noise = ir_noise
+        self.heading = None
+        self.settle_until = float('-inf')
+        self.tracks = {}
+        self.stats = {'ultrasonic': 0, 'ir': 0, 'rejected': 0, 'invalid': 0, 'settling': 0, 'resets': 0}
+        self._last_ultrasonic = float('-inf')
+        self._last_ir_seq = None
+        self._lock = threading.Lock()
+        self._timer = None
+
+    # --- heading -------------------------------------------------------------
+
+    def point(self, heading, settle=None):
+        """
+        The servo is being moved to `heading` (degrees).
+
+        Args:
+            settle: Seconds of readings to drop (default: estimated from the angular distance)
+        """
+        with self._lock:
+            if settle is None:
+                travel = 180 if self.heading is None else abs(heading - self.heading)
+                settle = (travel / SERVO_SPEED_DPS + SERVO_LAG_S + SETTLE_MARGIN_S) if travel else 0.0
+            self.heading = heading
+            self.settle_until = max(self.settle_until, robot_clock.monotonic() + settle)
+
+    # --- filter --------------------------------------------------------------
+
+    def update(self, noise, timestamp, distance, heading=None):
+        """Kalman update of `heading`'s track with one reading. Returns True if it was used."""
+        heading = self.heading if heading is None else heading
+        if not noise.valid(distance):
+            self.stats['invalid'] += 1
+            return False
+        r = noise.variance(distance)
+        track = self.tracks.get(heading)
+        if track is None:
+            self.tracks[heading] = _Track(distance, r, timestamp)
+            self.stats[noise.name] += 1
+            return True
+
+        # Predict: the distance drifts while the robot moves
+        p = track.p + self.q * max(timestamp - track.t, 0.0)
+        innovation = distance - track.x
+        if innovation * innovation > GATE_SIGMAS * GATE_SIGMAS * (p + r):
+            self.stats['rejected'] += 1
+            if noise.can_reset:
+                track.rejects += 1
+                if track.rejects >= RESET_AFTER_REJECTS:
+                    self.tracks[heading] = _Track(distance, r, timestamp)
+                    self.stats['resets'] += 1
+            return False
+
+        gain = p / (p + r)
+        track.x += gain * innovation
+        track.p = (1.0 - gain) * p
+        track.t = max(track.t, timestamp)
+        track.updates += 1
+        track.rejects = 0
+        self.stats[noise.name] += 1
+        return True
+
+    def poll(self):
+        """Feed every new sample from the attached sources into the filter, oldest first."""
+        with self._lock:
+            readings = []
+            if self.ultrasonic is not None:
+                for timestamp, value in self.ultrasonic.samples():
+                    if timestamp > self._last_ultrasonic:
+                        readings.append((timestamp, self.ultrasonic_noise, value))
+                        self._last_ultrasonic = timestamp
+            if self.ir_channel is not None and self.ir_lut is not None:
+                snapshot = self.ir_channel.engine.latest()
+                if snapshot is not None and snapshot.seq != self._last_ir_seq:
+                    self._last_ir_seq = snapshot.seq
+                    code = snapshot.raw[self.ir_channel.index]
+                    readings.append((snapshot.time, self.ir_noise, self.ir_lut.convert(code)))
+            readings.sort(key=lambda reading: reading[0])
+            for timestamp, noise, value in readings:
+                if timestamp < self.settle_until:
+                    self.stats['settling'] += 1
+                    continue
+                self.update(noise, timestamp, value)
+
+    def estimate(self, heading=None):
+        """
+        Current FusedRange for `heading` (default: where the servo points), or None.
+        The variance includes the drift since the last update.
+        """
+        self.poll()
+        with self._lock:
+            heading = self.heading if heading is None else heading
+            track = self.tracks.get(heading)
+            if track is None:
+                return None
+            now = robot_clock.monotonic()
+            return FusedRange(track.x, track.p + self.q * max(now - track.t, 0.0), track.t,
+                              track.updates, heading)
+
+    def wait(self, max_std, timeout, min_updates=2):
+        """
+        Wait until the current heading has settled and its estimate is within max_std cm.
+
+        Returns:
+            FusedRange or None: The estimate when converged, or the latest one at the timeout
+        """
+        deadline = robot_clock.monotonic() + timeout
+        estimate = self.estimate()
+        # Updates that were already in the track do not count as fresh readings
+        start_updates = estimate.updates if estimate is not None else 0
+        while True:
+            now = robot_clock.monotonic()
+            if now >= self.settle_until and estimate is not None:
+                fresh = estimate.updates - start_updates
+                if fresh < 0:   # The track was restarted
+                    fresh = estimate.updates
+                if fresh >= min_updates and estimate.variance <= max_std * max_std:
+                    return estimate
+            if now >= deadline:
+                return estimate
+            robot_clock.sleep(min(POLL_INTERVAL_S, deadline - now))
+            estimate = self.estimate()
+
+    # --- background polling --------------------------------------------------
+
+    def start(self, interval=POLL_INTERVAL_S):
+        """Poll the sources on a clock timer so the estimates track the fastest sensor."""
+        if self._timer is None or not self._timer.active:
+            self._timer = robot_clock.call_every(interval, self.poll, name='range-fusion')
+        return self
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,295 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Injectable clock for every timed behaviour in the robot scripts
+            = The scripts import sleep / monotonic / time from here instead of the time module,
+            = so the same code runs on one of three clocks:
+            = - RealClock        : time.sleep / time.monotonic / time.time (default)
+            = - AcceleratedClock : real threads, but every delay is divided by a speed-up factor
+            = - VirtualClock     : simulated time, sleep() returns at once and timers run in order,
+            =                      so an 8-hour soak test only costs CPU time
+            = Pick the clock with set_clock() before the robot modules run, or with the
+            = ROBOT_CLOCK environment variable: real | accelerated:<factor> | virtual
+'''
+
+import heapq
+import os
+import threading
+import time as _time
+
+
+class ClockExpired(BaseException):
+    """
+    Raised from VirtualClock.sleep() once its duration is over.
+
+    Derived from BaseException (like KeyboardInterrupt) so the scripts'
+    "except Exception" handlers do not swallow it and their cleanup still runs.
+    """
+
+
+# ============================================================================
+# REAL AND ACCELERATED CLOCKS
+# ============================================================================
+
+class RealClock:
+    """Wall-clock time."""
+
+    factor = 1.0
+
+    def __init__(self):
+        self._mono0 = _time.monotonic()
+        self._wall0 = _time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            _time.sleep(seconds / self.factor)
+
+    def monotonic(self):
+        return self._mono0 + (_time.monotonic() - self._mono0) * self.factor
+
+    def time(self):
+        # The system clock itself, so NTP corrections are followed (a Pi 3B has no RTC and
+        # auto_start.sh runs before NTP has synced); only an accelerated clock extrapolates
+        if self.factor == 1.0:
+            return _time.time()
+        return self._wall0 + (_time.monotonic() - self._mono0) * self.factor
+
+    def wait(self, event, timeout=None):
+        """Wait for a threading.Event; returns True if it was set."""
+        return event.wait(None if timeout is None else max(timeout, 0) / self.factor)
+
+    def call_later(self, delay, callback):
+        """Run callback once after `delay` seconds on a daemon thread. Returns a handle with cancel()."""
+        timer = threading.Timer(max(delay, 0) / self.factor, callback)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def call_every(self, interval, callback, name='clock-timer'):
+        """Run callback every `interval` seconds on a daemon thread. Returns a handle with cancel()."""
+        return _PeriodicThread(self, interval, callback, name)
+
+
+class AcceleratedClock(RealClock):
+    """
+    Real threads and timers, with time running `factor` times faster.
+
+    Args:
+        factor: Speed-up factor (10 = ten simulated seconds per real second)
+    """
+
+    def __init__(self, factor):
+        if factor <= 0:
+            raise ValueError("factor must be positive")
+        super().__init__()
+        self.factor = float(factor)
+
+
+class _PeriodicThread:
+    """Drift-free periodic callback scheduled against absolute deadlines."""
+
+    def __init__(self, clock, interval, callback, name):
+        self.clock = clock
+        self.interval = interval
+        self.callback = callback
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def active(self):
+        return self._thread.is_alive() and not self._cancelled.is_set()
+
+    def _run(self):
+        deadline = self.clock.monotonic()
+        while not self._cancelled.is_set():
+            self.callback()
+            deadline += self.interval
+            delay = deadline - self.clock.monotonic()
+            if delay < 0:
+                deadline = self.clock.monotonic()
+                delay = 0
+            self.clock.wait(self._cancelled, delay)
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+
+
+# ============================================================================
+# VIRTUAL CLOCK
+# ============================================================================
+
+class _VirtualTimer:
+    def __init__(self, interval, callback):
+        self.interval = interval
+        self.callback = callback
+        self.cancelled = False
+
+    @property
+    def active(self):
+        return not self.cancelled
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualClock:
+    """
+    Simulated time. sleep() advances time instantly, running due timers and advance hooks.
+
+    Args:
+        duration: Simulated seconds before sleep() raises ClockExpired (None = forever)
+        start_time: Wall-clock time reported at simulated t = 0
+        step: Longest time jump handed to the advance hooks in one go
+    """
+
+    def __init__(self, duration=None, start_time=1_760_000_000.0, step=0.05):
+        self.now = 0.0
+        self.duration = duration
+        self.start_time = start_time
+        self.step = step
+        self.expired = False
+        self._hooks = []
+        self._timers = []   # heap of (due, seq, timer)
+        self._seq = 0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.start_time + self.now
+
+    def add_advance_hook(self, hook):
+        """Call hook(dt) for every slice of simulated time (e.g. a physics step)."""
+        self._hooks.append(hook)
+
+    def _schedule(self, due, timer):
+        self._seq += 1
+        heapq.heappush(self._timers, (due, self._seq, timer))
+        return timer
+
+    def call_later(self, delay, callback):
+        return self._schedule(self.now + max(delay, 0), _VirtualTimer(None, callback))
+
+    def call_every(self, interval, callback, name=None):
+        return self._schedule(self.now + interval, _VirtualTimer(interval, callback))
+
+    def _step_to(self, when):
+        dt = when - self.now
+        if dt > 0:
+            for hook in self._hooks:
+                hook(dt)
+            self.now = when
+
+    def advance(self, seconds):
+        """Advance simulated time, running timers and hooks in time order."""
+        target = self.now + max(seconds, 0)
+        while self.now < target:
+            slice_end = min(target, self.now + self.step)
+            while self._timers and self._timers[0][0] <= slice_end:
+                due, _, timer = heapq.heappop(self._timers)
+                if timer.cancelled:
+                    continue
+                self._step_to(due)
+                if timer.interval is not None:
+                    self._schedule(due + timer.interval, timer)
+                else:
+                    timer.cancelled = True
+                timer.callback()
+            self._step_to(slice_end)
+
+    def sleep(self, seconds):
+        if self.expired:
+            # Cleanup code after the end of the run must not raise again
+            self.now += max(seconds, 0)
+            return
+        self.advance(seconds)
+        if self.duration is not None and self.now >= self.duration:
+            self.expired = True
+            raise ClockExpired()
+
+    def wait(self, event, timeout=None):
+        """Advance until the event is set (checked after each slice) or the timeout passes."""
+        if event.is_set():
+            return True
+        end = None if timeout is None else self.now + max(timeout, 0)
+        while not event.is_set():
+            if end is not None and self.now >= end:
+                break
+            self.sleep(self.step if end is None else min(self.step, end - self.now))
+        return event.is_set()
+
+    def time_module(self):
+        """Object with the same time functions as the `time` module, for code that imports it."""
+        return _TimeModule(self)
+
+
+class _TimeModule:
+    def __init__(self, clock):
+        self.time = clock.time
+        self.sleep = clock.sleep
+        self.monotonic = clock.monotonic
+        self.perf_counter = clock.monotonic
+        self.strftime = _time.strftime
+        self.localtime = lambda secs=None: _time.localtime(clock.time() if secs is None else secs)
+
+
+# ============================================================================
+# MODULE-LEVEL CLOCK
+# ============================================================================
+
+def clock_from_spec(spec):
+    """
+    Build a clock from a ROBOT_CLOCK string.
+
+    Args:
+        spec: 'real', 'accelerated:<factor>' or 'virtual'
+    """
+    name, _, arg = (spec or 'real').partition(':')
+    if name == 'real':
+        return RealClock()
+    if name == 'accelerated':
+        return AcceleratedClock(float(arg or 10))
+    if name == 'virtual':
+        return VirtualClock()
+    raise ValueError(f"Unknown clock: {spec}")
+
+
+_clock = clock_from_spec(os.environ.get('ROBOT_CLOCK'))
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Replace the clock used by sleep(), monotonic(), time() and the timers."""
+    global _clock
+    _clock = clock
+    return clock
+
+
+def sleep(seconds):
+    _clock.sleep(seconds)
+
+
+def monotonic():
+    return _clock.monotonic()
+
+
+def time():
+    return _clock.time()
+
+
+def wait(event, timeout=None):
+    return _clock.wait(event, timeout)
+
+
+def call_later(delay, callback):
+    return _clock.call_later(delay, callback)
+
+
+def call_every(interval, callback, name='clock-timer'):
+    return _clock.call_every(interval, callback, name)
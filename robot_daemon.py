@@ -0,0 +1,342 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Resident robot daemon: hardware stays initialised, jobs arrive over a local socket
+            = A patrol script pays for the gpiozero / pigpio imports, the pigpio connection and
+            = every device before its first action (measure it with startup_profile.py). The daemon
+            = pays once at boot, keeps the devices open and runs jobs sent as one JSON line each:
+            =   {"job": "patrol", "duration": 600}   patrol_logic() in the background (duration optional)
+            =   {"job": "stop"}                      end the patrol after its current step
+            =   {"job": "scan"}                      one LEFT / CENTER / RIGHT scan (robot idle)
+            =   {"job": "read"}                      latest distance in cm
+            =   {"job": "alarm", "kind": "motion"}   queue an alarm: motion | no_motion | low_battery | silence
+            =   {"job": "motion", "window": 300}     PIR triggers, rate and duty over the window, last events
+            =   {"job": "params", "OBSTACLE_THRESHOLD_CM": 20}   change live parameters (robot_params.py)
+            =   {"job": "status"}, {"job": "reload"}, {"job": "shutdown"}
+            = reload re-imports the script, so new patrol logic starts without the setup cost: the
+            = hardware registry hands the re-declared device names the objects it already holds
+            = (changed pins or device settings still need a daemon restart).
+            =   python robot_daemon.py &                          (e.g. from auto_start.sh)
+            =   python robot_daemon.py --send patrol duration=600
+            = Every reply is one JSON line: {"ok": true, "result": ...} or {"ok": false, "error": "..."}
+'''
+
+import argparse
+import collections
+import importlib
+import json
+import os
+import signal
+import socket
+import socketserver
+import threading
+
+import hardware
+import robot_clock
+
+DEFAULT_ADDRESS = 'unix:/tmp/robot_daemon.sock'
+DEFAULT_SCRIPT = 'RSSP_CW2_surveillance_robot'
+JOBS = ('patrol', 'stop', 'scan', 'read', 'alarm', 'motion', 'params', 'status', 'reload', 'shutdown')
+ALARM_KINDS = ('motion', 'no_motion', 'low_battery', 'silence')
+
+
+class JobError(Exception):
+    """A job cannot run now (robot busy, or the script has no such feature)."""
+
+
+class RobotDaemon:
+    """
+    Keeps one robot script imported and its devices open, and runs jobs against it.
+
+    Args:
+        script: Module name of the robot script (needs patrol_logic / scan_obstacles /
+                get_distance_cm / alarm_worker for the matching jobs)
+        registry: Hardware registry the script declares its devices on
+    """
+
+    def __init__(self, script=DEFAULT_SCRIPT, registry=None):
+        self.script = script
+        self.hw = registry if registry is not None else hardware.get_registry()
+        self.module = None
+        self.started = robot_clock.monotonic()
+        self.startup_s = None
+        self.jobs = collections.Counter()
+        self.busy = None            # Job holding the servo / motors
+        self._busy_lock = threading.Lock()
+        self._patrol = None
+        self._patrol_timer = None
+        self._server = None
+        self.closing = False
+
+    # --- startup -------------------------------------------------------------
+
+    def warm_up(self):
+        """Import the script, connect and create every device (raises HardwareError)."""
+        started = robot_clock.monotonic()
+        module = importlib.import_module(self.script)
+        self.hw.connect()
+        self._load(module)
+        self.startup_s = robot_clock.monotonic() - started
+        return self
+
+    def _load(self, module):
+        self.module = module
+        self.hw.create_all()
+        start_services = getattr(module, 'start_services', None)
+        if start_services is not None:
+            start_services()
+
+    def _require(self, name):
+        if not hasattr(self.module, name):
+            raise JobError(f"{self.script} has no {name}()")
+        return getattr(self.module, name)
+
+    def _claim(self, job):
+        with self._busy_lock:
+            if self.busy is not None:
+                raise JobError(f"Robot busy: {self.busy}")
+            self.busy = job
+
+    def _release(self):
+        with self._busy_lock:
+            self.busy = None
+
+    # --- jobs ----------------------------------------------------------------
+
+    def handle(self, request):
+        """
+        Run one request.
+
+        Args:
+            request: {"job": name, **arguments}
+
+        Returns:
+            dict: {"ok": True, "result": ...} or {"ok": False, "error": message}
+        """
+        if not isinstance(request, dict) or request.get('job') not in JOBS:
+            job = request.get('job') if isinstance(request, dict) else request
+            return {'ok': False, 'error': f"Unknown job: {job!r} (jobs: {', '.join(JOBS)})"}
+        args = {key: value for key, value in request.items() if key != 'job'}
+        try:
+            result = getattr(self, 'job_' + request['job'])(**args)
+        except Exception as e:
+            return {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+        self.jobs[request['job']] += 1
+        return {'ok': True, 'result': result}
+
+    @property
+    def patrolling(self):
+        return self._patrol is not None and self._patrol.is_alive()
+
+    def job_patrol(self, duration=None):
+        patrol_logic = self._require('patrol_logic')
+        self._claim('patrol')
+        self.module.patrol_active = True
+        self._patrol = threading.Thread(target=self._run_patrol, args=(patrol_logic,),
+                                        name='daemon-patrol', daemon=True)
+        self._patrol.start()
+        if duration is not None:
+            self._patrol_timer = robot_clock.call_later(float(duration), self.job_stop)
+        return {'patrol': 'started', 'duration': duration}
+
+    def _run_patrol(self, patrol_logic):
+        try:
+            patrol_logic()
+        except Exception as e:
+            print(f"[DAEMON] Patrol stopped by error: {e}")
+        finally:
+            stop = getattr(self.module, 'stop', None)
+            if stop is not None:
+                stop()
+            self._release()
+
+    def job_stop(self):
+        if self._patrol_timer is not None:
+            self._patrol_timer.cancel()
+            self._patrol_timer = None
+        if not self.patrolling:
+            return {'patrol': 'idle'}
+        self.module.patrol_active = False
+        return {'patrol': 'stopping'}
+
+    def job_scan(self):
+        scan_obstacles = self._require('scan_obstacles')
+        self._claim('scan')
+        try:
+            return scan_obstacles()
+        finally:
+            self._release()
+
+    def job_read(self):
+        return {'distance_cm': self._require('get_distance_cm')()}
+
+    def job_alarm(self, kind='motion'):
+        if kind not in ALARM_KINDS:
+            raise JobError(f"Unknown alarm: {kind} ({', '.join(ALARM_KINDS)})")
+        worker = self._require('alarm_worker')
+        worker.silence() if kind == 'silence' else worker.push(kind)
+        return {'alarm': kind}
+
+    def job_motion(self, window=300, last=10):
+        pir_events = self._require('pir_events')
+        summary = pir_events.summary(float(window))
+        return dict(summary._asdict(), last_events=[event._asdict() for event in pir_events.last(int(last))])
+
+    def job_params(self, **changes):
+        params = self._require('params')
+        snapshot = params.update(changes)
+        return {'version': snapshot.version, 'params': params.values()}
+
+    def job_status(self):
+        return {
+            'script': self.script,
+            'pid': os.getpid(),
+            'uptime_s': round(robot_clock.monotonic() - self.started, 1),
+            'startup_s': self.startup_s,
+            'busy': self.busy,
+            'devices': [name for name in self.hw.names() if self.hw.created(name)],
+            'startup_times': {name: round(t, 4) for name, t in self.hw.startup_times.items()},
+            'jobs': dict(self.jobs),
+        }
+
+    def job_reload(self):
+        """Re-import the script; its devices and the pigpio connection stay open."""
+        self._claim('reload')
+        try:
+            started = robot_clock.monotonic()
+            self._load(importlib.reload(self.module))
+            return {'reloaded': self.script, 'reload_s': robot_clock.monotonic() - started}
+        finally:
+            self._release()
+
+    def job_shutdown(self):
+        self.closing = True
+        self.job_stop()
+        if self._server is not None:
+            # shutdown() waits for serve_forever(), so not from this handler thread
+            threading.Thread(target=self._server.shutdown, name='daemon-shutdown').start()
+        return {'shutdown': True}
+
+    # --- socket --------------------------------------------------------------
+
+    def serve(self, address=DEFAULT_ADDRESS):
+        """
+        Create the job server (serve_forever() is left to the caller).
+
+        Args:
+            address: 'unix:/path/to/socket' or 'host:port'
+        """
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        reply = daemon.handle(json.loads(line))
+                    except ValueError as e:
+                        reply = {'ok': False, 'error': f"Bad request: {e}"}
+                    self.wfile.write((json.dumps(reply, default=str) + '\n').encode())
+                    if daemon.closing:
+                        break
+
+        if address.startswith('unix:'):
+            path = address[len('unix:'):]
+            if os.path.exists(path):
+                os.unlink(path)
+            self._server = _UnixJobServer(path, Handler)
+        else:
+            host, _, port = address.rpartition(':')
+            self._server = _TCPJobServer((host or '127.0.0.1', int(port)), Handler)
+        return self._server
+
+    def close(self):
+        """Stop the patrol, close the devices and the socket."""
+        self.job_stop()
+        if self._patrol is not None:
+            self._patrol.join(timeout=10)
+        self.hw.close()
+        if self._server is not None:
+            self._server.server_close()
+
+
+class _TCPJobServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _UnixJobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def send(job, address=DEFAULT_ADDRESS, timeout=30.0, **args):
+    """
+    Send one job to a running daemon.
+
+    Returns:
+        dict: The daemon's reply
+    """
+    if address.startswith('unix:'):
+        sock, target = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address[len('unix:'):]
+    else:
+        host, _, port = address.rpartition(':')
+        sock, target = socket.socket(socket.AF_INET, socket.SOCK_STREAM), (host or '127.0.0.1', int(port))
+    with sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.sendall((json.dumps(dict(args, job=job)) + '\n').encode())
+        with sock.makefile('rb') as replies:
+            line = replies.readline()
+    if not line:
+        raise ConnectionError("Daemon closed the connection without a reply")
+    return json.loads(line)
+
+
+def _argument(text):
+    """key=value from the command line; the value is JSON if it parses (600, true, "x")."""
+    key, _, value = text.partition('=')
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident robot daemon")
+    parser.add_argument('--script', default=DEFAULT_SCRIPT, help="robot script module to keep loaded")
+    parser.add_argument('--address', default=DEFAULT_ADDRESS, help="unix:/path or host:port")
+    parser.add_argument('--send', nargs='+', metavar=('JOB', 'KEY=VALUE'),
+                        help="send a job to a running daemon instead of starting one")
+    args = parser.parse_args()
+
+    if args.send:
+        job, *rest = args.send
+        print(json.dumps(send(job, args.address, **dict(map(_argument, rest))), indent=2, default=str))
+        return
+
+    daemon = RobotDaemon(args.script)
+    try:
+        daemon.warm_up()
+    except hardware.HardwareError as e:
+        exit(str(e))
+    server = daemon.serve(args.address)
+    # systemd / kill stop the daemon like a shutdown job
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.job_shutdown())
+    print(f"[DAEMON] {args.script} ready in {daemon.startup_s:.2f} s, jobs on {args.address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+        print(f"[DAEMON] Stopped | jobs: {dict(daemon.jobs)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Live-tunable robot parameters: file, file watch and local socket
+            = Thresholds, counters, scan angles and cooldowns used to be module constants, so
+            = tuning one meant a restart (pigpio / gpiozero setup again, patrol state lost).
+            = A ParamStore starts from the script's constants and then:
+            = - load()  : applies a JSON file on top of the defaults (names left out = default)
+            = - watch() : re-loads the file whenever its mtime / size changes (polled on the clock)
+            = - serve() : takes updates over a local socket, same JSON-line protocol as robot_daemon
+            =   {"job": "params"}                               -> current snapshot
+            =   {"job": "params", "OBSTACLE_THRESHOLD_CM": 25}  -> update, then snapshot
+            = Every change builds a new immutable snapshot (a namedtuple with a version number)
+            = and swaps it in with one assignment. Hot paths read `store.snapshot` once and use
+            = its fields: no lock, no dict lookup, and one loop iteration sees one consistent set.
+            =   python robot_params.py --address unix:/tmp/robot_params.sock                (show)
+            =   python robot_params.py --address unix:/tmp/robot_params.sock OBSTACLE_THRESHOLD_CM=25
+            =   python robot_params.py --benchmark
+'''
+
+import json
+import os
+import socketserver
+import threading
+from collections import namedtuple
+
+import robot_clock
+
+WATCH_INTERVAL_S = 1.0
+
+
+class ParamError(ValueError):
+    """Unknown parameter, wrong type or value outside its limits."""
+
+
+def _coerce(name, value, default):
+    """Value converted to the type of the default (JSON gives 25.0 for an int, "true" for a bool...)."""
+    kind = type(default)
+    if kind is bool:
+        if isinstance(value, str) and value.lower() in ('true', 'false'):
+            return value.lower() == 'true'
+        if isinstance(value, bool):
+            return value
+    elif kind is int:
+        if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+            number = float(value)
+            if number.is_integer():
+                return int(number)
+    elif kind is float:
+        if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+            return float(value)
+    elif isinstance(value, kind):
+        return value
+    raise ParamError(f"{name} must be {kind.__name__}, got {value!r}")
+
+
+class ParamStore:
+    """
+    Versioned parameter snapshots.
+
+    Args:
+        defaults: dict of name -> default value (the type of each default is enforced)
+        path: JSON file for load() / save() / watch() (None = socket and update() only)
+        limits: dict of name -> (minimum, maximum), either may be None
+    """
+
+    def __init__(self, defaults, path=None, limits=None):
+        self.defaults = dict(defaults)
+        self.path = path
+        self.limits = dict(limits or {})
+        unknown = set(self.limits) - set(self.defaults)
+        if unknown:
+            raise ParamError(f"Limits for unknown parameters: {', '.join(sorted(unknown))}")
+        self.Snapshot = namedtuple('Snapshot', list(self.defaults) + ['version'])
+        self.snapshot = self.Snapshot(**self.defaults, version=0)
+        self.stats = {'updates': 0, 'loads': 0, 'rejected': 0}
+        self._listeners = []
+        self._lock = threading.Lock()       # Writers only; readers take self.snapshot
+        self._stamp = None
+        self._watch = None
+        self._server = None
+
+    def __getitem__(self, name):
+        return getattr(self.snapshot, name)
+
+    def values(self):
+        """Current parameters as a dict (without the version)."""
+        values = self.snapshot._asdict()
+        del values['version']
+        return values
+
+    def on_change(self, listener):
+        """Call listener(old, new) after every change (on the thread that made it); returns listener."""
+        self._listeners.append(listener)
+        return listener
+
+    # --- updates -------------------------------------------------------------
+
+    def _validate(self, changes):
+        checked = {}
+        for name, value in changes.items():
+            if name not in self.defaults:
+                raise ParamError(f"Unknown parameter: {name}")
+            value = _coerce(name, value, self.defaults[name])
+            low, high = self.limits.get(name, (None, None))
+            if low is not None and value < low:
+                raise ParamError(f"{name}={value} is below {low}")
+            if high is not None and value > high:
+                raise ParamError(f"{name}={value} is above {high}")
+            checked[name] = value
+        return checked
+
+    def _swap(self, changes, from_defaults=False):
+        with self._lock:        # Merged under the lock, so concurrent updates cannot drop a change
+            old = self.snapshot
+            values = dict(self.defaults) if from_defaults else old._asdict()
+            values.update(changes, version=old.version + 1)
+            new = self.Snapshot(**values)
+            if new[:-1] == old[:-1]:
+                return old
+            self.snapshot = new
+        for listener in self._listeners:
+            listener(old, new)
+        return new
+
+    def update(self, changes=None, **kwargs):
+        """
+        Change some parameters; all of them or none (raises ParamError).
+
+        Returns:
+            Snapshot: The new snapshot (the same one if nothing changed)
+        """
+        changes = dict(changes or {}, **kwargs)
+        try:
+            checked = self._validate(changes)
+        except ParamError:
+            self.stats['rejected'] += 1
+            raise
+        self.stats['updates'] += 1
+        return self._swap(checked)
+
+    def reset(self):
+        """Back to the defaults."""
+        return self._swap({}, from_defaults=True)
+
+    # --- file ----------------------------------------------------------------
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, path=None):
+        """
+        Defaults overridden by the JSON file (a missing file means all defaults).
+
+        Returns:
+            Snapshot
+        """
+        path = path or self.path
+        if path == self.path:
+            self._stamp = self._file_stamp()
+        try:
+            with open(path) as f:
+                values = json.load(f)
+        except FileNotFoundError:
+            values = {}
+        if not isinstance(values, dict):
+            raise ParamError(f"{path}: expected a JSON object of name -> value")
+        try:
+            checked = self._validate(values)
+        except ParamError as e:
+            self.stats['rejected'] += 1
+            raise ParamError(f"{path}: {e}") from None
+        self.stats['loads'] += 1
+        return self._swap(checked, from_defaults=True)
+
+    def save(self, path=None):
+        """Write the current values (atomically, so a watcher never reads half a file)."""
+        path = path or self.path
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(self.values(), f, indent=2)
+            f.write('\n')
+        os.replace(temporary, path)
+        if path == self.path:
+            self._stamp = self._file_stamp()
+
+    def watch(self, interval=WATCH_INTERVAL_S):
+        """Re-load the file when it changes; a bad edit is reported and the old values stay."""
+        self.stop_watching()
+        self._stamp = self._file_stamp()
+        self._watch = robot_clock.call_every(interval, self._check_file, name='params-watch')
+        return self._watch
+
+    def _check_file(self):
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return
+        try:
+            snapshot = self.load()
+            print(f"[PARAMS] {self.path} loaded (version {snapshot.version})")
+        except (ParamError, ValueError, OSError) as e:
+            self._stamp = stamp         # Report a bad file once, not every interval
+            print(f"[PARAMS] {self.path} ignored: {e}")
+
+    def stop_watching(self):
+        if self._watch is not None:
+            self._watch.cancel()
+            self._watch = None
+
+    # --- socket --------------------------------------------------------------
+
+    def handle(self, request):
+        """
+        One robot_daemon style request: {"job": "params", name: value, ...}.
+
+        Returns:
+            dict: {"ok": True, "result": {"version": n, "params": {...}}} or {"ok": False, "error": ...}
+        """
+        if not isinstance(request, dict) or request.get('job') != 'params':
+            return {'ok': False, 'error': "Unknown job (jobs: params)"}
+        try:
+            snapshot = self.update({key: value for key, value in request.items() if key != 'job'})
+        except ParamError as e:
+            return {'ok': False, 'error': str(e)}
+        return {'ok': True, 'result': {'version': snapshot.version, 'params': self.values()}}
+
+    def serve(self, address):
+        """
+        Take updates on a daemon thread.
+
+        Args:
+            address: 'unix:/path/to/socket' or 'host:port'
+
+        Returns:
+            Server with shutdown() / server_close()
+        """
+        store = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        reply = store.handle(json.loads(line))
+                    except ValueError as e:
+                        reply = {'ok': False, 'error': f"Bad request: {e}"}
+                    self.wfile.write((json.dumps(reply) + '\n').encode())
+
+        if address.startswith('unix:'):
+            path = address[len('unix:'):]
+            if os.path.exists(path):
+                os.unlink(path)
+            server = _UnixParamServer(path, Handler)
+        else:
+            host, _, port = address.rpartition(':')
+            server = _TCPParamServer((host or '127.0.0.1', int(port)), Handler)
+        threading.Thread(target=server.serve_forever, name='params-server', daemon=True).start()
+        self._server = server
+        return server
+
+    def close(self):
+        self.stop_watching()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _TCPParamServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _UnixParamServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+# ============================================================================
+# BENCHMARK / CLIENT
+# ============================================================================
+
+_THRESHOLD_CM = 16          # A module constant, as the scripts had
+
+
+def _benchmark(n=1_000_000):
+    """Cost of one parameter read: module constant vs snapshot field vs locked dict."""
+    import timeit
+
+    store = ParamStore({'OBSTACLE_THRESHOLD_CM': _THRESHOLD_CM, 'MOVEMENT_COUNTER_LIMIT': 5})
+    table = {'OBSTACLE_THRESHOLD_CM': _THRESHOLD_CM}
+    lock = threading.Lock()
+
+    def constant():
+        return _THRESHOLD_CM
+
+    def snapshot():
+        return store.snapshot.OBSTACLE_THRESHOLD_CM
+
+    def locked():
+        with lock:
+            return table['OBSTACLE_THRESHOLD_CM']
+
+    for name, read in (('module constant', constant), ('store.snapshot', snapshot), ('dict + lock', locked)):
+        per_read = timeit.timeit(read, number=n) / n
+        print(f"{name:16s}: {per_read * 1e9:6.1f} ns per read")
+    per_update = timeit.timeit(lambda: store.update(OBSTACLE_THRESHOLD_CM=store.snapshot.version % 50),
+                               number=n // 100) / (n // 100)
+    print(f"{'update()':16s}: {per_update * 1e6:6.2f} us per change")
+
+
+def main():
+    import argparse
+    from robot_daemon import send, _argument
+
+    parser = argparse.ArgumentParser(description="Show or change the parameters of a running robot")
+    parser.add_argument('changes', nargs='*', metavar='NAME=VALUE')
+    parser.add_argument('--address', default='unix:/tmp/robot_params.sock', help="unix:/path or host:port")
+    parser.add_argument('--benchmark', action='store_true', help="measure the cost of a parameter read")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        _benchmark()
+        return
+    reply = send('params', args.address, **dict(map(_argument, args.changes)))
+    if not reply['ok']:
+        exit(reply['error'])
+    print(f"version {reply['result']['version']}")
+    for name, value in reply['result']['params'].items():
+        print(f"  {name:28s} {value}")
+
+
+if __name__ == '__main__':
+    main()
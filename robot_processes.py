@@ -0,0 +1,384 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = The patrol robot as three processes: sense, decide and act
+            = In RSSP_CW2_surveillance_robot.py the sensor timers, the gpiozero callback threads,
+            = the alarm worker, the LED patterns and the patrol loop all share one interpreter and
+            = its GIL, so a busy thread delays everyone else's timing. Here they are split:
+            = - sense  : ultrasonic sampler, MCP3008 / battery monitor and PIR; publishes the latest
+            =            reading at SENSE_RATE_HZ
+            = - decide : the patrol flowchart (scan, avoidance policy, movement counter); publishes
+            =            commands and never touches a GPIO
+            = - act    : servo, motion LEDs and buzzer; applies each new command and acknowledges it
+            = They exchange only the newest record of each kind through seqlock slots in shared
+            = memory (shared_state.py): no pipes, no queues, and no process waits for another.
+            = The devices and settings come from the patrol script, so each process creates only
+            = the devices it uses, with its own pigpio connection.
+            = Every process keeps its own latency histograms (latency_metrics.py):
+            =   sense  - deadline of a sensor tick to its reading being published
+            =   decide - age of the reading behind each command when the command is published
+            =   act    - command published to command applied
+            = and publishes count / p50 / p99 / max into its stats slot once a second.
+            = Live tuning (robot_params.py) is by PARAMS_FILE only: decide and act each watch the file
+            = for the settings they use; the parameter socket is served by the single-process script.
+            =   python robot_processes.py --duration 600
+            =   ROBOT_HARDWARE=mock python robot_processes.py --duration 10    (no robot needed)
+'''
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import threading
+
+import hardware
+import robot_clock
+from latency_metrics import LatencyMetrics
+from led_patterns import blink
+from shared_state import SeqlockBoard, Slot
+from telemetry import MOVES
+
+DEFAULT_SCRIPT = 'RSSP_CW2_surveillance_robot'
+ROLES = ('sense', 'decide', 'act')
+SENSE_RATE_HZ = 20
+ACT_POLL_S = 0.002          # Command slot polling interval of the actuator
+READING_POLL_S = 0.005      # Reading slot polling interval of the decision process
+STATS_INTERVAL_S = 1.0
+ACK_TIMEOUT_S = 0.5
+SCAN_TIMEOUT_S = 0.8        # wait_for_range(0.8) in the patrol script
+TURN_S = 3.0                # LED_BLINK(20, 0.1) + sleep(1) in the patrol script
+FORWARD_S = 2.0
+ALARMS = ('', 'motion', 'low_battery')
+MOVE_PATTERNS = {           # LED pattern per movement, as in forward() / backward() / *_turn()
+    'backward': (blink(0.2), ('left', 'right')),
+    'left': (blink(0.2), ('left',)),
+    'right': (blink(0.2), ('right',)),
+}
+
+SLOTS = (
+    Slot('reading', '<dddd???I', 'time distance_cm regulator_v battery_v battery_low regulation_ok motion triggers'),
+    Slot('command', '<dBdBI', 'time move servo_angle alarm alarm_seq'),
+    Slot('status', '<dQdd', 'time command servo_angle settled_at'),
+) + tuple(Slot(f'stats_{role}', '<Qdddd', 'count p50_ms p99_ms max_ms overruns') for role in ROLES)
+
+
+class LoopStats:
+    """One process's latency histograms, published to its stats slot on a timer."""
+
+    def __init__(self, board, role):
+        self.board = board
+        self.role = role
+        self.metrics = LatencyMetrics(prefix=f'robot_{role}_latency', enabled=True)
+        self.overruns = 0
+        self._timer = robot_clock.call_every(STATS_INTERVAL_S, self.publish, name=f'{role}-stats')
+
+    def observe(self, seconds):
+        self.metrics.observe(self.role, seconds)
+
+    def publish(self):
+        h = self.metrics.histogram(self.role)
+        self.board.publish(f'stats_{self.role}', h.count, h.quantile(0.5) * 1000,
+                           h.quantile(0.99) * 1000, h.max * 1000, self.overruns)
+
+    def close(self):
+        self._timer.cancel()
+        self.publish()
+
+
+# ============================================================================
+# SENSE
+# ============================================================================
+
+def sense(robot, board, stats, stop):
+    """Sample every sensor in the background and publish one reading per tick."""
+    robot.distance_sampler.start()
+    robot.adc.start()
+    robot.battery_monitor.start()
+    robot.pir_events.attach(robot.hw.pi, robot.PIR_PIN)
+    interval = 1.0 / SENSE_RATE_HZ
+    deadline = robot_clock.monotonic()
+    while not stop.is_set():
+        distance = robot.distance_sampler.filtered(robot.DISTANCE_FILTER, max_age=robot.DISTANCE_WINDOW_S)
+        battery = robot.battery_monitor.current()
+        now = robot_clock.monotonic()
+        board.publish('reading', now, robot.NO_READING_CM if distance is None else distance,
+                      (battery and battery.regulator_voltage) or 0.0, battery.pack_voltage if battery else 0.0,
+                      bool(battery and battery.low), battery is None or battery.regulation_ok,
+                      robot.pir.motion_detected,
+                      robot.pir_events.count(robot.PIR_RATE_WINDOW_S))
+        stats.observe(robot_clock.monotonic() - deadline)
+        deadline += interval
+        delay = deadline - robot_clock.monotonic()
+        if delay < 0:
+            stats.overruns += 1
+            deadline = robot_clock.monotonic()
+            delay = 0
+        robot_clock.wait(stop, delay)
+
+
+# ============================================================================
+# DECIDE
+# ============================================================================
+
+class Decider:
+    """The patrol flowchart of the patrol script, driving the actuator through the command slot."""
+
+    def __init__(self, robot, board, stats, stop):
+        self.robot = robot
+        self.board = board
+        self.stats = stats
+        self.stop = stop
+        self.move = 'stop'
+        self.angle = robot.ANGLE_CENTER
+        self.alarm = 0
+        self.alarm_seq = 0
+        self.movement_counter = 0
+        self._lock = threading.Lock()       # Patrol and motion watcher both write commands
+
+    def command(self, move=None, angle=None, alarm=None):
+        """Publish a command (unchanged fields repeat the last one); returns its version."""
+        with self._lock:
+            if move is not None:
+                self.move = move
+            if angle is not None:
+                self.angle = angle
+            if alarm is not None:
+                self.alarm = ALARMS.index(alarm)
+                self.alarm_seq += 1
+            reading_time = self.board.read('reading')[1].time
+            now = robot_clock.monotonic()
+            version = self.board.publish('command', now, MOVES.index(self.move), self.angle,
+                                         self.alarm, self.alarm_seq)
+            if reading_time:
+                self.stats.observe(now - reading_time)
+            return version
+
+    def acknowledged(self, version):
+        """Actuator status once it has applied command `version` (None on timeout)."""
+        deadline = robot_clock.monotonic() + ACK_TIMEOUT_S
+        while not self.stop.is_set():
+            status = self.board.read('status')[1]
+            if status.command >= version:
+                return status
+            if robot_clock.monotonic() >= deadline:
+                return None
+            robot_clock.sleep(ACT_POLL_S)
+        return None
+
+    def reading_after(self, when, timeout):
+        """First reading taken at or after `when` (monotonic), or None on timeout."""
+        deadline = robot_clock.monotonic() + timeout
+        while not self.stop.is_set():
+            reading = self.board.read('reading')[1]
+            if reading.time >= when:
+                return reading
+            if robot_clock.monotonic() >= deadline:
+                return None
+            robot_clock.sleep(READING_POLL_S)
+        return None
+
+    def distance_at(self, angle):
+        status = self.acknowledged(self.command(angle=angle))
+        settled = status.settled_at if status else robot_clock.monotonic()
+        # Every sample in the sampler's window must come after the servo settled
+        reading = self.reading_after(settled + self.robot.DISTANCE_WINDOW_S,
+                                     SCAN_TIMEOUT_S + self.robot.DISTANCE_WINDOW_S)
+        return self.robot.NO_READING_CM if reading is None else reading.distance_cm
+
+    def scan(self):
+        robot = self.robot
+        p = robot.params.snapshot
+        results = {}
+        for side, angle in (('left', p.ANGLE_LEFT), ('center', p.ANGLE_CENTER), ('right', p.ANGLE_RIGHT)):
+            distance = self.distance_at(angle)
+            results[side] = robot.detect_obstacle(distance)
+            results[f'{side}_distance'] = distance
+        self.command(angle=p.ANGLE_CENTER)
+        return results
+
+    def drive(self, move, seconds):
+        self.command(move=move)
+        robot_clock.wait(self.stop, seconds)
+        self.command(move='stop')
+
+    def act_on(self, action):
+        if action == 'forward':
+            self.drive('forward', FORWARD_S)
+            self.movement_counter += 1
+        elif action in ('left', 'right'):
+            self.drive(action, TURN_S)
+        elif action == 'backward_left':
+            self.drive('backward', TURN_S)
+            self.drive('left', TURN_S)
+            self.movement_counter = 0
+
+    def watch_motion(self):
+        """Raise the motion alarm on each new PIR rise (runs beside the patrol)."""
+        motion = False
+        version = 0
+        while not self.stop.is_set():
+            result = self.board.wait('reading', version, timeout=STATS_INTERVAL_S, poll_s=READING_POLL_S)
+            if result is None:
+                continue
+            version, reading = result
+            if reading.motion and not motion:
+                self.command(alarm='motion')
+            motion = reading.motion
+
+    def patrol(self):
+        robot = self.robot
+        threading.Thread(target=self.watch_motion, name='motion-watcher', daemon=True).start()
+        self.reading_after(0.0, float('inf'))       # First reading from the sensor process
+        while not self.stop.is_set():
+            reading = self.board.read('reading')[1]
+            if reading.battery_low:
+                print(f"[DECIDE] Battery low ({reading.battery_v:.2f}V) - idle")
+                self.command(move='stop', alarm='low_battery')
+                robot_clock.wait(self.stop, 2)
+                continue
+            if not reading.regulation_ok:
+                # Same gate as check_voltage_regulation() in the patrol script
+                print(f"[DECIDE] Regulator low ({reading.regulator_v:.2f}V) - idle")
+                self.command(move='stop')
+                robot_clock.wait(self.stop, 2)
+                continue
+            results = self.scan()
+            obstacles = (results['left'], results['center'], results['right'])
+            if self.movement_counter < robot.params.snapshot.MOVEMENT_COUNTER_LIMIT:
+                self.act_on(robot.AVOIDANCE_POLICY.decide(obstacles))
+            elif results['right']:
+                self.act_on(robot.AVOIDANCE_POLICY.decide(obstacles))
+            else:
+                self.drive('right', TURN_S)
+                self.movement_counter = 0
+            robot_clock.wait(self.stop, 0.5)
+
+
+def decide(robot, board, stats, stop):
+    robot.start_params()        # The patrol settings follow PARAMS_FILE edits
+    Decider(robot, board, stats, stop).patrol()
+
+
+# ============================================================================
+# ACT
+# ============================================================================
+
+def act(robot, board, stats, stop):
+    """Apply every new command to the servo, LEDs and buzzer, and acknowledge it."""
+    from alarm_worker import AlarmWorker
+    # The script's worker handler logs to files owned by other processes: play patterns only
+    alarms = AlarmWorker(robot.buzzer, robot.alarm_worker.patterns, robot.alarm_worker.cooldowns,
+                         tones=robot.BUZZER_WAVES).start()
+
+    @robot.params.on_change
+    def apply_cooldown(old, new):
+        alarms.cooldowns['motion'] = new.INTRUDER_ALERT_COOLDOWN
+
+    robot.start_params()        # INTRUDER_ALERT_COOLDOWN follows PARAMS_FILE edits here too
+    applied = 0
+    move, angle, alarm_seq = None, None, 0
+    settled_at = robot_clock.monotonic()
+    try:
+        while not stop.is_set():
+            if board.version('command') <= applied:
+                robot_clock.wait(stop, ACT_POLL_S)
+                continue
+            applied, command = board.read('command')
+            name = MOVES[command.move]
+            if name != move:
+                move = name
+                if name == 'forward':
+                    robot.leds.steady()
+                elif name in MOVE_PATTERNS:
+                    pattern, leds = MOVE_PATTERNS[name]
+                    robot.leds.play(pattern, *leds)
+                else:
+                    robot.leds.off()
+            if command.servo_angle != angle:
+                angle = command.servo_angle
+                settled_at = robot_clock.monotonic() + robot.servo.move_to(angle)
+            if command.alarm_seq != alarm_seq:
+                alarm_seq = command.alarm_seq
+                alarms.push(ALARMS[command.alarm])
+            now = robot_clock.monotonic()
+            board.publish('status', now, applied, angle, settled_at)
+            stats.observe(now - command.time)
+    finally:
+        alarms.stop()
+
+
+# ============================================================================
+# PROCESSES
+# ============================================================================
+
+def run_role(role, board_name, stop, script=DEFAULT_SCRIPT):
+    """Entry point of one child process."""
+    board = SeqlockBoard(SLOTS, name=board_name)
+    robot = importlib.import_module(script)
+    robot.CONSOLE_OUTPUT = False
+    stats = LoopStats(board, role)
+    try:
+        robot.hw.connect()
+        {'sense': sense, 'decide': decide, 'act': act}[role](robot, board, stats, stop)
+    except hardware.HardwareError as e:
+        print(f"[{role.upper()}] {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()          # One process down stops the others
+        stats.close()
+        robot.hw.close()
+        print(f"[{role.upper()}] pid {os.getpid()}\n{stats.metrics.summary()}")
+        board.close()
+
+
+def stats_table(board):
+    rows = [f"{'process':8s} {'count':>8s} {'p50 ms':>9s} {'p99 ms':>9s} {'max ms':>9s} {'overruns':>9s}"]
+    for role in ROLES:
+        version, s = board.read(f'stats_{role}')
+        if version:
+            rows.append(f"{role:8s} {s.count:8d} {s.p50_ms:9.3f} {s.p99_ms:9.3f} {s.max_ms:9.3f} {s.overruns:9.0f}")
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sense / decide / act processes over shared memory")
+    parser.add_argument('--script', default=DEFAULT_SCRIPT, help="patrol script with the devices and settings")
+    parser.add_argument('--duration', type=float, help="seconds to run (default: until Ctrl+C)")
+    parser.add_argument('--backend', choices=hardware.BACKENDS, help="hardware backend (ROBOT_HARDWARE)")
+    parser.add_argument('--stats', type=float, default=10.0, help="seconds between stats tables")
+    args = parser.parse_args()
+
+    if args.backend:
+        os.environ['ROBOT_HARDWARE'] = args.backend
+    # spawn: each child starts a clean interpreter without the parent's threads or devices
+    context = multiprocessing.get_context('spawn')
+    board = SeqlockBoard(SLOTS)
+    stop = context.Event()
+    processes = [context.Process(target=run_role, args=(role, board.name, stop, args.script),
+                                 name=f'robot-{role}') for role in ROLES]
+    for process in processes:
+        process.start()
+    print("Processes: " + ", ".join(f"{p.name} pid {p.pid}" for p in processes))
+    started = robot_clock.monotonic()
+    try:
+        while not stop.is_set():
+            remaining = None if args.duration is None else args.duration - (robot_clock.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                break
+            if not robot_clock.wait(stop, args.stats if remaining is None else min(args.stats, remaining)):
+                print(stats_table(board))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        print(stats_table(board))
+        board.close()
+
+
+if __name__ == '__main__':
+    main()
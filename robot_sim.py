@@ -0,0 +1,692 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Hardware-free simulation backend for the surveillance robot scripts
+            = Runs RSSP_CW2_surveillance_robot.py or surveillance_robot_square_patrol.py unmodified
+            = on a PC, faster than real time:
+            = - 2D world: room walls, box obstacles and intruders walking between waypoints
+            = - gpiozero MockFactory pins for LEDs / buzzer, fake pigpio.pi for the SG90 servo,
+            =   the echo edges of the pigpio HC-SR04 driver (hcsr04_pigpio.py) and the buzzer
+            =   wave chains of tone_sequencer.py (timed, not sounded)
+            = - simulated DistanceSensor (ray cast from robot pose + servo angle), MCP3008
+            =   (battery / regulator model) and MotionSensor (intruder inside the PIR cone)
+            = - robot_clock.VirtualClock: sleep() jumps simulated time, so an hour of patrol takes seconds
+            = The robot has no motors, so motion is read from the indicator LEDs exactly as the
+            = scripts drive them: both steady = forward, both blinking = backward,
+            = one blinking = turn towards that side.
+            =
+            = Usage: python robot_sim.py RSSP_CW2_surveillance_robot --duration 3600 --quiet
+            = Soak : python robot_sim.py RSSP_CW2_surveillance_robot --duration 28800 --quiet
+            =        (8 hours, the battery model runs flat after 4 hours)
+'''
+
+import argparse
+import contextlib
+import importlib
+import io
+import math
+import random
+import sys
+import time
+import types
+
+import hardware
+import robot_clock
+import tone_sequencer
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+WORLD_STEP_S = 0.05           # Physics step inside one sleep()
+ROBOT_RADIUS_M = 0.10
+FORWARD_SPEED_MPS = 0.20
+TURN_RATE_DPS = 45.0
+BLINK_WINDOW_S = 0.3          # An LED that changed within this window is "blinking"
+ULTRASONIC_BEAM_DEG = 15.0    # HC-SR04 beam width
+ULTRASONIC_NOISE_CM = 0.5
+ULTRASONIC_MAX_RANGE_M = 4.0   # Range simulated behind gpio_trigger()
+SPEED_OF_SOUND_M_S = 343.4
+ECHO_DELAY_S = 0.0005         # Trigger to echo rising edge (8-cycle burst)
+IR_GAIN_V_CM = 27.86          # SHARP GP2Y0A21 output = gain / distance + offset (datasheet fit,
+IR_OFFSET_V = 0.42            # as ir_calibration.py), on MCP3008 channel 0
+IR_MIN_CM = 10.0              # Closer than this the real output folds back; held at its peak here
+IR_NOISE_V = 0.01
+PIR_RANGE_M = 5.0
+PIR_FOV_DEG = 110.0
+
+
+# sleep() raises this once the simulated duration is over
+SimulationComplete = robot_clock.ClockExpired
+
+
+# ============================================================================
+# WORLD MODEL
+# ============================================================================
+
+def _ray_segment(ox, oy, dx, dy, x1, y1, x2, y2):
+    """Distance along the ray (ox,oy)+t(dx,dy) to segment (x1,y1)-(x2,y2), or None."""
+    ex, ey = x2 - x1, y2 - y1
+    denom = dx * ey - dy * ex
+    if abs(denom) < 1e-12:
+        return None
+    t = ((x1 - ox) * ey - (y1 - oy) * ex) / denom
+    u = ((x1 - ox) * dy - (y1 - oy) * dx) / denom
+    if t >= 0 and 0 <= u <= 1:
+        return t
+    return None
+
+
+def _ray_circle(ox, oy, dx, dy, cx, cy, r):
+    """Distance along the ray to a circle, or None."""
+    fx, fy = ox - cx, oy - cy
+    b = fx * dx + fy * dy
+    c = fx * fx + fy * fy - r * r
+    disc = b * b - c
+    if disc < 0:
+        return None
+    root = math.sqrt(disc)
+    for t in (-b - root, -b + root):
+        if t >= 0:
+            return t
+    return None
+
+
+class Intruder:
+    """A person walking back and forth between waypoints."""
+
+    def __init__(self, waypoints, speed=0.8, radius=0.2):
+        self.waypoints = waypoints
+        self.speed = speed
+        self.radius = radius
+        self.x, self.y = waypoints[0]
+        self._target = 1
+
+    def step(self, dt):
+        tx, ty = self.waypoints[self._target]
+        dist = math.hypot(tx - self.x, ty - self.y)
+        travel = self.speed * dt
+        if dist <= travel:
+            self.x, self.y = tx, ty
+            self._target = (self._target + 1) % len(self.waypoints)
+        else:
+            self.x += (tx - self.x) / dist * travel
+            self.y += (ty - self.y) / dist * travel
+
+
+class World:
+    """
+    2D world in metres: wall segments, round obstacles and moving intruders.
+
+    Args:
+        walls: list of (x1, y1, x2, y2)
+        obstacles: list of (x, y, radius)
+        intruders: list of Intruder
+    """
+
+    def __init__(self, walls=(), obstacles=(), intruders=()):
+        self.walls = list(walls)
+        self.obstacles = list(obstacles)
+        self.intruders = list(intruders)
+
+    @classmethod
+    def square_room(cls, size=4.0, seed=None):
+        """A closed room with a few random boxes and one intruder crossing it."""
+        rng = random.Random(seed)
+        walls = [(0, 0, size, 0), (size, 0, size, size), (size, size, 0, size), (0, size, 0, 0)]
+        obstacles = [(rng.uniform(0.8, size - 0.8), rng.uniform(0.8, size - 0.8), rng.uniform(0.1, 0.25))
+                     for _ in range(3)]
+        intruder = Intruder([(0.3, size - 0.3), (size - 0.3, size - 0.3), (size - 0.3, 0.3), (0.3, 0.3)])
+        return cls(walls, obstacles, [intruder])
+
+    def step(self, dt):
+        for intruder in self.intruders:
+            intruder.step(dt)
+
+    def raycast(self, x, y, heading, max_range):
+        """Distance to the first wall, obstacle or intruder along a heading (radians)."""
+        dx, dy = math.cos(heading), math.sin(heading)
+        best = max_range
+        for wall in self.walls:
+            t = _ray_segment(x, y, dx, dy, *wall)
+            if t is not None and t < best:
+                best = t
+        for cx, cy, r in self.obstacles:
+            t = _ray_circle(x, y, dx, dy, cx, cy, r)
+            if t is not None and t < best:
+                best = t
+        for intruder in self.intruders:
+            t = _ray_circle(x, y, dx, dy, intruder.x, intruder.y, intruder.radius)
+            if t is not None and t < best:
+                best = t
+        return best
+
+    def collides(self, x, y, radius):
+        for cx, cy, r in self.obstacles:
+            if math.hypot(x - cx, y - cy) < r + radius:
+                return True
+        for x1, y1, x2, y2 in self.walls:
+            ex, ey = x2 - x1, y2 - y1
+            length2 = ex * ex + ey * ey
+            u = max(0.0, min(1.0, ((x - x1) * ex + (y - y1) * ey) / length2)) if length2 else 0.0
+            if math.hypot(x - (x1 + u * ex), y - (y1 + u * ey)) < radius:
+                return True
+        return False
+
+
+class Battery:
+    """
+    Linear discharge model of the robot battery pack and 3.3 V regulator.
+
+    Args:
+        full_v: Pack voltage when charged
+        empty_v: Pack voltage when flat
+        runtime_s: Seconds from full to empty
+        dropout_v: Regulator dropout (output sags once the pack falls below 3.3 V + dropout)
+    """
+
+    def __init__(self, full_v=8.4, empty_v=6.0, runtime_s=4 * 3600, dropout_v=3.5):
+        self.full_v = full_v
+        self.empty_v = empty_v
+        self.runtime_s = runtime_s
+        self.dropout_v = dropout_v
+        self.elapsed = 0.0
+
+    def step(self, dt):
+        self.elapsed += dt
+
+    @property
+    def pack_voltage(self):
+        used = min(self.elapsed / self.runtime_s, 1.0)
+        return self.full_v - (self.full_v - self.empty_v) * used
+
+    @property
+    def regulator_voltage(self):
+        return min(3.3, self.pack_voltage - self.dropout_v)
+
+
+# ============================================================================
+# SIMULATED ROBOT
+# ============================================================================
+
+class SimRobot:
+    """Robot pose in the world plus motion inferred from the indicator LEDs."""
+
+    def __init__(self, world, x=2.0, y=2.0, heading_deg=90.0):
+        self.world = world
+        self.x = x
+        self.y = y
+        self.heading = math.radians(heading_deg)
+        self.servo_angle = 90.0
+        self.distance_travelled = 0.0
+        self.collisions = 0
+        self.motion = 'stop'
+        self._leds = {}   # name -> (pin, last_state, last_change)
+
+    def watch_led(self, name, pin):
+        self._leds[name] = [pin, pin.state, -1e9]
+
+    def update_motion(self, now):
+        """Classify the current movement from the LED states."""
+        activity = {}
+        for name, entry in self._leds.items():
+            pin, last_state, last_change = entry
+            state = pin.state
+            if state != last_state:
+                entry[1] = state
+                entry[2] = last_change = now
+            blinking = now - last_change < BLINK_WINDOW_S
+            activity[name] = ('blink' if blinking else ('on' if state else 'off'))
+        left = activity.get('left', 'off')
+        right = activity.get('right', 'off')
+        if left == 'blink' and right == 'blink':
+            self.motion = 'backward'
+        elif left == 'blink':
+            self.motion = 'left'
+        elif right == 'blink':
+            self.motion = 'right'
+        elif left == 'on' and right == 'on':
+            self.motion = 'forward'
+        else:
+            self.motion = 'stop'
+
+    def step(self, dt):
+        if self.motion in ('forward', 'backward'):
+            sign = 1 if self.motion == 'forward' else -1
+            nx = self.x + sign * FORWARD_SPEED_MPS * dt * math.cos(self.heading)
+            ny = self.y + sign * FORWARD_SPEED_MPS * dt * math.sin(self.heading)
+            if self.world.collides(nx, ny, ROBOT_RADIUS_M):
+                self.collisions += 1
+            else:
+                self.distance_travelled += math.hypot(nx - self.x, ny - self.y)
+                self.x, self.y = nx, ny
+        elif self.motion == 'left':
+            self.heading += math.radians(TURN_RATE_DPS) * dt
+        elif self.motion == 'right':
+            self.heading -= math.radians(TURN_RATE_DPS) * dt
+
+    def sensor_heading(self):
+        """Ultrasonic heading: servo 90 deg = straight ahead, 180 = left, 0 = right."""
+        return self.heading + math.radians(self.servo_angle - 90.0)
+
+
+# ============================================================================
+# FAKE DEVICES
+# ============================================================================
+
+class Simulation:
+    """
+    Owns the world, the virtual clock and the fake devices handed to the scripts.
+
+    Args:
+        world: World (default: World.square_room())
+        duration: Simulated seconds to run
+        seed: Random seed for sensor noise and the default world
+    """
+
+    def __init__(self, world=None, duration=3600.0, seed=None, battery=None):
+        self.world = world if world is not None else World.square_room(seed=seed)
+        self.robot = SimRobot(self.world)
+        self.battery = battery if battery is not None else Battery()
+        self.rng = random.Random(seed)
+        self.clock = robot_clock.VirtualClock(duration, step=WORLD_STEP_S)
+        self.clock.add_advance_hook(self._advance)
+        self.motion_sensors = []
+        self.distance_reads = 0
+        self.pir_triggers = 0
+        self.pi = FakePi(self)
+        self.factory = None
+        self.grid = None          # OccupancyGrid fed with every ultrasonic reading (see map_readings)
+        self._beams = []
+        self._beam_pose = None
+        self._beam_max = None
+        # MCP3008 channel -> normalised value (0.0-1.0 of 3.3 V), wired as GPIO.txt
+        self.adc_channels = {
+            0: lambda: self.ir_voltage() / 3.3,
+            1: lambda: self.battery.pack_voltage / 3.0 / 3.3,   # 3:1 divider
+            2: lambda: self.battery.regulator_voltage / 3.3,
+        }
+
+    def _advance(self, dt):
+        self.robot.update_motion(self.clock.now)
+        self.robot.step(dt)
+        self.world.step(dt)
+        self.battery.step(dt)
+        for sensor in self.motion_sensors:
+            sensor._poll()
+
+    # --- sensor models -------------------------------------------------------
+
+    def ultrasonic_distance(self, max_distance):
+        """Closest return inside the ultrasonic beam, in metres."""
+        self.distance_reads += 1
+        centre = self.robot.sensor_heading()
+        half = math.radians(ULTRASONIC_BEAM_DEG / 2)
+        best = min(self.world.raycast(self.robot.x, self.robot.y, centre + offset, max_distance)
+                   for offset in (-half, 0.0, half))
+        best += self.rng.gauss(0.0, ULTRASONIC_NOISE_CM / 100)
+        best = min(max(best, 0.02), max_distance)
+        if self.grid is not None:
+            self._record_beam(math.radians(self.robot.servo_angle - 90.0), best, max_distance)
+        return best
+
+    def ir_voltage(self):
+        """SHARP IR output for the nearest object straight along the servo heading."""
+        distance_cm = self.world.raycast(self.robot.x, self.robot.y, self.robot.sensor_heading(),
+                                         ULTRASONIC_MAX_RANGE_M) * 100
+        volts = IR_GAIN_V_CM / max(distance_cm, IR_MIN_CM) + IR_OFFSET_V
+        return volts + self.rng.gauss(0.0, IR_NOISE_V)
+
+    # --- mapping -------------------------------------------------------------
+
+    def map_readings(self, grid):
+        """Build an occupancy grid from every ultrasonic reading, using the true pose."""
+        self.grid = grid
+
+    def _record_beam(self, bearing, distance, max_distance):
+        # Readings from one pose are ray-cast together in a single vectorized update
+        pose = (self.robot.x, self.robot.y, self.robot.heading)
+        if pose != self._beam_pose or len(self._beams) >= 64:
+            self.flush_map()
+            self._beam_pose = pose
+            self._beam_max = max_distance
+        self._beams.append((bearing, distance))
+
+    def flush_map(self):
+        if self._beams:
+            bearings, ranges = zip(*self._beams)
+            self.grid.update_beams(self._beam_pose, bearings, ranges, self._beam_max)
+            self._beams = []
+
+    def intruder_visible(self):
+        """True if an intruder is inside the PIR detection cone."""
+        for intruder in self.world.intruders:
+            dx, dy = intruder.x - self.robot.x, intruder.y - self.robot.y
+            if math.hypot(dx, dy) > PIR_RANGE_M:
+                continue
+            bearing = math.atan2(dy, dx) - self.robot.heading
+            bearing = (bearing + math.pi) % (2 * math.pi) - math.pi
+            if abs(math.degrees(bearing)) <= PIR_FOV_DEG / 2:
+                return True
+        return False
+
+    # --- installation --------------------------------------------------------
+
+    def install(self):
+        """
+        Install the virtual clock and replace pigpio and the gpiozero sensor classes
+        before a script is imported. Output devices (LED, PWMOutputDevice) stay real
+        gpiozero classes on mock pins.
+        """
+        sim = self
+        robot_clock.set_clock(self.clock)
+
+        try:
+            import pigpio as pigpio_module
+        except ImportError:
+            # No pigpio client installed: constants (ALT0, PUD_UP, ...) only need to exist
+            pigpio_module = types.ModuleType('pigpio')
+            pigpio_module.__getattr__ = _pigpio_constant
+            pigpio_module.pulse = _FakePulse
+            pigpio_module.error = type('error', (Exception,), {})
+            sys.modules['pigpio'] = pigpio_module
+        pigpio_module.pi = lambda *args, **kwargs: sim.pi
+
+        import gpiozero
+        from gpiozero.pins.mock import MockFactory, MockPWMPin
+        import gpiozero.pins.pigpio
+
+        self.factory = MockFactory(pin_class=MockPWMPin)
+        gpiozero.Device.pin_factory = self.factory
+        gpiozero.pins.pigpio.PiGPIOFactory = lambda *args, **kwargs: sim.factory
+
+        class SimDistanceSensor:
+            def __init__(self, echo=None, trigger=None, *, max_distance=1, **kwargs):
+                self.max_distance = max_distance
+
+            @property
+            def distance(self):
+                return sim.ultrasonic_distance(self.max_distance)
+
+            def close(self):
+                pass
+
+        class SimMCP3008:
+            def __init__(self, channel=0, **kwargs):
+                self.channel = channel
+
+            @property
+            def value(self):
+                return max(0.0, min(1.0, sim.adc_channels.get(self.channel, lambda: 0.0)()))
+
+            @property
+            def raw_value(self):
+                return int(self.value * 1023)
+
+            def close(self):
+                pass
+
+        class SimMotionSensor:
+            def __init__(self, pin=None, **kwargs):
+                self.pin = pin
+                if pin is not None:
+                    sim.pi.inputs[pin] = 0
+                self.when_motion = None
+                self.when_no_motion = None
+                self.motion_detected = False
+                sim.motion_sensors.append(self)
+
+            def _poll(self):
+                visible = sim.intruder_visible()
+                if visible == self.motion_detected:
+                    return
+                self.motion_detected = visible
+                if self.pin is not None:
+                    sim.pi.input_edge(self.pin, int(visible))
+                callback = self.when_motion if visible else self.when_no_motion
+                if visible:
+                    sim.pir_triggers += 1
+                if callback is not None:
+                    callback()
+
+            def close(self):
+                if self in sim.motion_sensors:
+                    sim.motion_sensors.remove(self)
+
+        gpiozero.DistanceSensor = SimDistanceSensor
+        gpiozero.MCP3008 = SimMCP3008
+        gpiozero.MotionSensor = SimMotionSensor
+
+        # Scripts on the hardware registry get the same fake pigpio and mock pins
+        hardware.set_registry(hardware.Registry('sim', pi=self.pi, pin_factory=self.factory))
+
+    def watch_motion_leds(self, left=17, right=(27, 23)):
+        """Tell the robot model which mock pins are the left / right motion LEDs."""
+        # LEDs declared on the hardware registry only get a pin when first used
+        registry = hardware.get_registry()
+        for number in (left, *right):
+            if registry.declared(f'led{number}'):
+                registry.get(f'led{number}')
+        def find(number):
+            for info, pin in self.factory.pins.items():
+                if number in info.names:
+                    return pin
+            return None
+        left_pin = find(left)
+        right_pin = next((p for p in map(find, right) if p is not None), None)
+        if left_pin is not None:
+            self.robot.watch_led('left', left_pin)
+        if right_pin is not None:
+            self.robot.watch_led('right', right_pin)
+
+    def patch_module(self, module):
+        """
+        Point a script that still calls the time module directly at the virtual clock.
+        Scripts using robot_clock already follow the clock installed by install().
+        """
+        for name, value in list(vars(module).items()):
+            if value is time:
+                setattr(module, name, self.clock.time_module())
+            elif value is time.sleep:
+                setattr(module, name, self.clock.sleep)
+
+    def report(self):
+        r = self.robot
+        return {
+            'simulated_s': round(self.clock.now, 1),
+            'distance_m': round(r.distance_travelled, 2),
+            'collisions': r.collisions,
+            'pir_triggers': self.pir_triggers,
+            'distance_reads': self.distance_reads,
+            'battery_v': round(self.battery.pack_voltage, 2),
+            'pose': (round(r.x, 2), round(r.y, 2), round(math.degrees(r.heading) % 360, 1)),
+        }
+
+
+PIGPIO_CONSTANTS = {'PUD_DOWN': 1, 'PUD_UP': 2, 'FALLING_EDGE': 1, 'EITHER_EDGE': 2, 'OUTPUT': 1}
+
+
+def _pigpio_constant(name):
+    if name.isupper():
+        return PIGPIO_CONSTANTS.get(name, 0)
+    raise AttributeError(name)
+
+
+class _FakePulse:
+    def __init__(self, gpio_on, gpio_off, delay):
+        self.gpio_on = gpio_on
+        self.gpio_off = gpio_off
+        self.delay = delay
+
+
+class FakePi:
+    """The subset of pigpio.pi used by the robot scripts."""
+
+    connected = True
+
+    def __init__(self, sim):
+        self.sim = sim
+        self.pulsewidths = {}
+        self.callbacks = []
+        self.inputs = {}            # GPIO -> level of the simulated PIR outputs and buttons
+        self.wave_us = {}           # wave id -> microseconds
+        self._wave_pending = 0
+        self._wave_until = float('-inf')
+
+    def set_servo_pulsewidth(self, gpio, pulsewidth):
+        self.pulsewidths[gpio] = pulsewidth
+        if pulsewidth:
+            self.sim.robot.servo_angle = (pulsewidth - 500) * 180 / 2000
+
+    def get_servo_pulsewidth(self, gpio):
+        return self.pulsewidths.get(gpio, 0)
+
+    # --- HC-SR04 through trigger pulses and echo callbacks (hcsr04_pigpio) ---
+
+    def set_mode(self, gpio, mode):
+        pass
+
+    def write(self, gpio, level):
+        pass
+
+    def set_pull_up_down(self, gpio, pud):
+        # A pulled-up input (the emergency stop button) idles high
+        self.inputs[gpio] = int(pud == PIGPIO_CONSTANTS['PUD_UP'])
+
+    def get_current_tick(self):
+        return int(self.sim.clock.now * 1e6) & 0xFFFFFFFF
+
+    def callback(self, gpio, edge=0, func=None):
+        entry = (gpio, func)
+        self.callbacks.append(entry)
+        return _FakeCallback(self.callbacks, entry)
+
+    def gpio_trigger(self, gpio, pulse_len=10, level=1):
+        """Echo from the simulated ultrasonic sensor: rising edge ~0.5 ms later, width = ToF."""
+        distance = self.sim.ultrasonic_distance(ULTRASONIC_MAX_RANGE_M)
+        width = 2 * distance / SPEED_OF_SOUND_M_S
+        self.sim.clock.call_later(ECHO_DELAY_S, lambda: self._echo_edge(1))
+        self.sim.clock.call_later(ECHO_DELAY_S + width, lambda: self._echo_edge(0))
+
+    def _echo_edge(self, level):
+        tick = self.get_current_tick()
+        for gpio, func in list(self.callbacks):
+            if func is not None and gpio not in self.inputs:
+                func(gpio, level, tick)
+
+    # --- input edges (pir_events, emergency_stop) ----------------------------
+
+    def input_edge(self, gpio, level):
+        self.inputs[gpio] = level
+        tick = self.get_current_tick()
+        for callback_gpio, func in list(self.callbacks):
+            if func is not None and callback_gpio == gpio:
+                func(gpio, level, tick)
+
+    def read(self, gpio):
+        return self.inputs.get(gpio, 0)
+
+    # --- buzzer waveforms (tone_sequencer) ------------------------------------
+
+    def wave_add_generic(self, pulses):
+        self._wave_pending += sum(pulse.delay for pulse in pulses)
+        return len(pulses)
+
+    def wave_create(self):
+        wave_id = len(self.wave_us)
+        self.wave_us[wave_id], self._wave_pending = self._wave_pending, 0
+        return wave_id
+
+    def wave_chain(self, data):
+        self._wave_until = self.sim.clock.now + tone_sequencer.chain_duration_us(data, self.wave_us) / 1e6
+
+    def wave_tx_busy(self):
+        return int(self.sim.clock.now < self._wave_until)
+
+    def wave_tx_stop(self):
+        self._wave_until = float('-inf')
+
+    def wave_delete(self, wave_id):
+        pass
+
+    def wave_clear(self):
+        self.wave_us.clear()
+        self._wave_until = float('-inf')
+
+    def stop(self):
+        pass
+
+
+class _FakeCallback:
+    def __init__(self, callbacks, entry):
+        self.callbacks = callbacks
+        self.entry = entry
+
+    def cancel(self):
+        if self.entry in self.callbacks:
+            self.callbacks.remove(self.entry)
+
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def run(script, duration=3600.0, seed=None, quiet=False, sim=None):
+    """
+    Run an unmodified robot script inside the simulation.
+
+    Args:
+        script: Module name, e.g. 'RSSP_CW2_surveillance_robot'
+        duration: Simulated seconds
+        seed: Random seed
+        quiet: Discard the script's console output
+        sim: Pre-configured Simulation (optional)
+
+    Returns:
+        tuple: (Simulation, wall-clock seconds taken)
+    """
+    sim = sim if sim is not None else Simulation(duration=duration, seed=seed)
+    sim.install()
+    sys.modules.pop(script, None)
+    module = importlib.import_module(script)
+    sim.watch_motion_leds()
+    sim.patch_module(module)
+
+    output = io.StringIO() if quiet else None
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+            module.main()
+    except SimulationComplete:
+        pass
+    return sim, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a robot script in the simulator")
+    parser.add_argument('script', nargs='?', default='RSSP_CW2_surveillance_robot',
+                        help="module to run (RSSP_CW2_surveillance_robot, surveillance_robot_square_patrol)")
+    parser.add_argument('--duration', type=float, default=3600.0, help="simulated seconds")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--quiet', action='store_true', help="hide the script's own output")
+    parser.add_argument('--map', metavar='FILE.npz', help="save an occupancy grid of the run")
+    args = parser.parse_args()
+
+    sim = Simulation(duration=args.duration, seed=args.seed)
+    if args.map:
+        from occupancy_grid import OccupancyGrid
+        sim.map_readings(OccupancyGrid())
+    sim, wall = run(args.script, quiet=args.quiet, sim=sim)
+    print("\n" + "=" * 60)
+    print(f"SIMULATION REPORT - {args.script}")
+    print("=" * 60)
+    for key, value in sim.report().items():
+        print(f"  {key:15}: {value}")
+    print(f"  {'wall_time_s':15}: {wall:.2f} ({sim.clock.now / wall:.0f}x real time)")
+    if args.map:
+        sim.flush_map()
+        sim.grid.save(args.map)
+        print(f"  {'map':15}: {args.map} ({len(sim.grid.tiles)} tiles, {sim.grid.memory_bytes // 1024} KB)")
+
+
+if __name__ == '__main__':
+    main()
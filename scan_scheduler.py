@@ -0,0 +1,137 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Adaptive scan scheduling for the patrol loops
+            = A full LEFT / CENTER / RIGHT scan costs ~3 s of servo moves and settling, but the
+            = avoidance rules go forward whenever the center is clear, whatever the sides say.
+            = Before each step the patrol reads only the center heading (the servo is already
+            = there) and the scheduler escalates to a full scan when:
+            = - first    : no full scan yet
+            = - heading  : the robot turned since the last full scan
+            = - clearance: the center is within threshold + margin
+            = - trend    : the least-squares closing rate of the recent center readings predicts
+            =              the clearance falls below the threshold within the lookahead
+            = - periodic : max_skips steps in a row were skipped (the sides are never seen otherwise)
+            = Every decision is counted, so the skip ratio can be printed at the end of a patrol.
+'''
+
+import collections
+from collections import namedtuple
+
+import numpy as np
+
+import robot_clock
+
+CLEAR_MARGIN_CM = 30.0      # Fast path only while the center reads more than threshold + margin
+LOOKAHEAD_S = 3.0           # About one patrol step (2 s forward + pauses)
+TREND_WINDOW = 4            # Center readings used for the closing rate
+MAX_SKIPS = 4               # A full scan at least every MAX_SKIPS + 1 steps
+
+# Reasons for a full scan
+FIRST = 'first'
+HEADING = 'heading'
+CLEARANCE = 'clearance'
+TREND = 'trend'
+PERIODIC = 'periodic'
+NO_READING = 'no_reading'
+
+ScanDecision = namedtuple('ScanDecision', 'full reason center_cm predicted_cm')
+
+
+class ScanScheduler:
+    """
+    Decide before each patrol step whether a full scan is needed.
+
+    Args:
+        threshold_cm: Obstacle threshold of the patrol (OBSTACLE_THRESHOLD_CM)
+        margin_cm: Extra clearance the center needs for the fast path
+        lookahead_s: How far ahead the closing trend is extrapolated
+        trend_window: Number of center readings in the trend fit
+        max_skips: Consecutive fast-path steps before a full scan is forced
+    """
+
+    def __init__(self, threshold_cm, margin_cm=CLEAR_MARGIN_CM, lookahead_s=LOOKAHEAD_S,
+                 trend_window=TREND_WINDOW, max_skips=MAX_SKIPS):
+        self.threshold_cm = threshold_cm
+        self.margin_cm = margin_cm
+        self.lookahead_s = lookahead_s
+        self.max_skips = max_skips
+        self.history = collections.deque(maxlen=trend_window)     # (time, center_cm)
+        self.stats = collections.Counter()
+        self.last_full = None       # Results dict of the last full scan
+        self.skips = 0              # Fast-path steps since the last full scan
+        self.turned = False
+
+    def predict(self, horizon=None):
+        """Center distance extrapolated `horizon` seconds ahead (None with fewer than 2 readings)."""
+        if len(self.history) < 2:
+            return None
+        times, distances = np.array(self.history).T
+        if times[-1] == times[0]:
+            return float(distances[-1])
+        slope = np.polyfit(times - times[-1], distances, 1)[0]     # cm per second
+        horizon = self.lookahead_s if horizon is None else horizon
+        return float(distances[-1] + min(slope, 0.0) * horizon)
+
+    def check(self, center_cm, now=None):
+        """
+        Record a center-only reading and decide.
+
+        Returns:
+            ScanDecision: full=False means the center reading alone is enough for this step
+        """
+        now = robot_clock.monotonic() if now is None else now
+        self.stats['checks'] += 1
+        if center_cm is None:
+            return self._full(NO_READING, center_cm, None)
+        self.history.append((now, center_cm))
+        predicted = self.predict()
+
+        if self.last_full is None:
+            return self._full(HEADING if self.turned else FIRST, center_cm, predicted)
+        if center_cm <= self.threshold_cm + self.margin_cm:
+            return self._full(CLEARANCE, center_cm, predicted)
+        if predicted is not None and predicted <= self.threshold_cm:
+            return self._full(TREND, center_cm, predicted)
+        if self.skips >= self.max_skips:
+            return self._full(PERIODIC, center_cm, predicted)
+        self.skips += 1
+        self.stats['skipped'] += 1
+        return ScanDecision(False, None, center_cm, predicted)
+
+    def _full(self, reason, center_cm, predicted):
+        self.stats['full'] += 1
+        self.stats[reason] += 1
+        return ScanDecision(True, reason, center_cm, predicted)
+
+    def full_scan_done(self, results):
+        """A full scan ran (scheduled or not): remember its results and restart the skip count."""
+        self.last_full = results
+        self.skips = 0
+        self.turned = False
+        if results.get('center_distance') is not None:
+            self.history.append((robot_clock.monotonic(), results['center_distance']))
+
+    def fast_results(self, decision):
+        """Scan results for a skipped step: fresh clear center, sides from the last full scan."""
+        results = dict(self.last_full)
+        results.update(center=False, center_distance=decision.center_cm, fast=True)
+        return results
+
+    def heading_changed(self):
+        """The robot turned: old readings and side results no longer apply."""
+        self.history.clear()
+        self.last_full = None
+        self.turned = True
+
+    @property
+    def skip_ratio(self):
+        checks = self.stats['checks']
+        return self.stats['skipped'] / checks if checks else 0.0
+
+    def summary(self):
+        reasons = ", ".join(f"{reason} {self.stats[reason]}"
+                            for reason in (FIRST, HEADING, CLEARANCE, TREND, PERIODIC, NO_READING)
+                            if self.stats[reason])
+        return (f"Adaptive scan: {self.stats['skipped']}/{self.stats['checks']} full scans skipped "
+                f"({self.skip_ratio:.0%}) | full scans: {reasons or 'none'}")
@@ -0,0 +1,275 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Shared SG90 servo driver: motion profiles, position estimate and settle-time model
+            = The scripts each had their own set_angle() / stop_servo() and slept a fixed 0.3-0.8 s
+            = after every move, however far the horn had to travel. SG90Servo instead:
+            = - runs a rate-limited trapezoidal profile (accelerate, cruise, decelerate) by stepping
+            =   the pulse width on a 50 Hz robot_clock timer, one step per servo frame
+            = - estimates where the horn is at any moment (profile position minus the servo lag)
+            = - computes the settle time from the angular distance, calibrated speed and acceleration,
+            =   so wait() after a 30 degree move takes ~0.2 s instead of 0.8 s
+            = - detaches the pulses after `idle_detach_s` without a new move (an SG90 holding
+            =   position draws current and buzzes)
+            = Calibrate SERVO_SPEED_DPS / SERVO_ACCEL_DPS2 by timing a 180 degree move with
+            = `python servo_driver.py --speed 600` and adjusting until the horn arrives as wait() returns.
+'''
+
+import math
+import threading
+
+import robot_clock
+from sweep_scan import SERVO_SPEED_DPS, SERVO_LAG_S
+
+SERVO_ACCEL_DPS2 = 6000.0       # Full speed reached in 0.1 s
+SETTLE_MARGIN_S = 0.05          # Horn ringing + one fresh sensor reading after the move
+IDLE_DETACH_S = 1.0
+UPDATE_HZ = 50                  # SG90 frame rate (20 ms)
+MIN_PULSE_US = 500
+MAX_PULSE_US = 2500
+
+
+def travel_time(distance, speed=SERVO_SPEED_DPS, accel=SERVO_ACCEL_DPS2):
+    """Seconds for a trapezoidal move of `distance` degrees (triangular if it never reaches speed)."""
+    distance = abs(distance)
+    if distance >= speed * speed / accel:
+        return distance / speed + speed / accel
+    return 2.0 * math.sqrt(distance / accel)
+
+
+def travelled(distance, elapsed, speed=SERVO_SPEED_DPS, accel=SERVO_ACCEL_DPS2):
+    """Degrees covered `elapsed` seconds into a trapezoidal move of `distance` degrees (>= 0)."""
+    total = travel_time(distance, speed, accel)
+    if elapsed <= 0:
+        return 0.0
+    if elapsed >= total:
+        return distance
+    peak = min(speed, math.sqrt(distance * accel))      # Cruise speed or triangle apex
+    ramp = peak / accel
+    if elapsed < ramp:
+        return 0.5 * accel * elapsed * elapsed
+    if elapsed <= total - ramp:
+        return 0.5 * peak * ramp + peak * (elapsed - ramp)
+    remaining = total - elapsed
+    return distance - 0.5 * accel * remaining * remaining
+
+
+class SG90Servo:
+    """
+    SG90 on a pigpio servo pulse output.
+
+    Args:
+        pi: pigpio.pi connection
+        pin: GPIO of the signal line
+        speed_dps: Calibrated maximum speed (degrees per second)
+        accel_dps2: Profile acceleration (degrees per second squared)
+        lag_s: Delay between a pulse change and the horn following it
+        idle_detach_s: Stop the pulses this long after the last move (None = never)
+        update_hz: Profile steps per second
+    """
+
+    def __init__(self, pi, pin, speed_dps=SERVO_SPEED_DPS, accel_dps2=SERVO_ACCEL_DPS2, lag_s=SERVO_LAG_S,
+                 idle_detach_s=IDLE_DETACH_S, update_hz=UPDATE_HZ,
+                 min_pulse_us=MIN_PULSE_US, max_pulse_us=MAX_PULSE_US):
+        self.pi = pi
+        self.pin = pin
+        self.speed_dps = speed_dps
+        self.accel_dps2 = accel_dps2
+        self.lag_s = lag_s
+        self.idle_detach_s = idle_detach_s
+        self.interval = 1.0 / update_hz
+        self.min_pulse_us = min_pulse_us
+        self.max_pulse_us = max_pulse_us
+        self.attached = False
+        self.target = None
+        self.settle_until = float('-inf')
+        self.stats = {'moves': 0, 'detaches': 0, 'move_time_s': 0.0}
+        self._move = None           # (start angle, end angle, start time, duration)
+        self._lock = threading.RLock()
+        self._step_timer = None
+        self._detach_timer = None
+
+    # --- model ---------------------------------------------------------------
+
+    def pulse_width(self, angle):
+        """Pulse width in microseconds for 0-180 degrees."""
+        return int(self.min_pulse_us + angle * (self.max_pulse_us - self.min_pulse_us) / 180)
+
+    def settle_time(self, start, end):
+        """Seconds from commanding a move until the horn has stopped at `end`."""
+        if start == end:
+            return 0.0
+        return travel_time(end - start, self.speed_dps, self.accel_dps2) + self.lag_s
+
+    def _profile_angle(self, t):
+        start, end, t0, duration = self._move
+        covered = travelled(abs(end - start), t - t0, self.speed_dps, self.accel_dps2)
+        return start + math.copysign(covered, end - start)
+
+    @property
+    def angle(self):
+        """Estimated horn position now (None before the first move)."""
+        with self._lock:
+            if self._move is None:
+                return self.target
+            return self._profile_angle(robot_clock.monotonic() - self.lag_s)
+
+    @property
+    def moving(self):
+        return robot_clock.monotonic() < self.settle_until
+
+    def settle_remaining(self):
+        return max(self.settle_until - robot_clock.monotonic(), 0.0)
+
+    # --- motion --------------------------------------------------------------
+
+    def move_to(self, angle, wait=False):
+        """
+        Start a profiled move to `angle` (0-180 degrees).
+
+        Args:
+            wait: Block until the horn has settled (plus SETTLE_MARGIN_S)
+
+        Returns:
+            float: Seconds until the move has settled
+        """
+        if not 0 <= angle <= 180:
+            raise ValueError("Angle must be between 0 and 180 degrees")
+        with self._lock:
+            now = robot_clock.monotonic()
+            self._cancel_detach()
+            start = self.angle
+            if start is None:
+                # Unknown horn position: jump and allow for a full-range move
+                self.pi.set_servo_pulsewidth(self.pin, self.pulse_width(angle))
+                self._move = None
+                settle = self.settle_time(0, 180)
+            else:
+                self._move = (start, angle, now, travel_time(angle - start, self.speed_dps, self.accel_dps2))
+                settle = self.settle_time(start, angle)
+            self.target = angle
+            self.attached = True
+            self.settle_until = now + settle
+            self.stats['moves'] += 1
+            self.stats['move_time_s'] += settle
+            if self._move is None:
+                self._schedule_detach(settle)
+            elif self._step_timer is None:
+                self._step_timer = robot_clock.call_every(self.interval, self._step, name='servo-profile')
+        self._step()
+        if wait:
+            self.wait()
+        return settle
+
+    def _step(self):
+        """Send the profile position for now (called by the 50 Hz timer)."""
+        timer = None
+        with self._lock:
+            if self._move is None or self._step_timer is None:
+                return
+            now = robot_clock.monotonic()
+            _, end, t0, duration = self._move
+            done = now >= t0 + duration
+            position = end if done else self._profile_angle(now)
+            self.pi.set_servo_pulsewidth(self.pin, self.pulse_width(position))
+            if done:
+                timer, self._step_timer = self._step_timer, None
+                self._schedule_detach(self.lag_s)
+        # Cancelled outside the lock: cancel() joins the timer thread when called from elsewhere
+        if timer is not None:
+            timer.cancel()
+
+    def wait(self, margin=SETTLE_MARGIN_S):
+        """Sleep until the current move has settled, plus `margin` seconds."""
+        robot_clock.sleep(self.settle_remaining() + margin)
+
+    # --- power ---------------------------------------------------------------
+
+    def _schedule_detach(self, delay):
+        if self.idle_detach_s is not None:
+            self._detach_timer = robot_clock.call_later(delay + self.idle_detach_s, self._idle_detach)
+
+    def _cancel_detach(self):
+        if self._detach_timer is not None:
+            self._detach_timer.cancel()
+            self._detach_timer = None
+
+    def _idle_detach(self):
+        with self._lock:
+            if self._detach_timer is not None and not self.moving:
+                self._detach_timer = None
+                self.detach()
+
+    def detach(self):
+        """Stop the pulses; the horn position estimate is kept."""
+        with self._lock:
+            self._cancel_detach()
+            timer, self._step_timer = self._step_timer, None
+            if self._move is not None:
+                # A move cut short stops roughly where the profile was
+                self.target = self._profile_angle(robot_clock.monotonic() - self.lag_s)
+                self._move = None
+            self.pi.set_servo_pulsewidth(self.pin, 0)
+            if self.attached:
+                self.stats['detaches'] += 1
+            self.attached = False
+        if timer is not None:
+            timer.cancel()
+
+    def set_position(self, angle, attached=False):
+        """
+        The horn was driven to `angle` outside the driver (sweep_scan.SweepScanner writes the
+        pulses itself): drop any profile so the next move starts from there with the right settle time.
+
+        Args:
+            attached: The other driver left the pulses on
+        """
+        with self._lock:
+            self._cancel_detach()
+            timer, self._step_timer = self._step_timer, None
+            self._move = None
+            self.target = angle
+            self.settle_until = max(self.settle_until, robot_clock.monotonic() + self.lag_s)
+            self.attached = attached
+            if attached:
+                self._schedule_detach(0.0)
+        if timer is not None:
+            timer.cancel()
+
+    def close(self):
+        self.detach()
+
+
+def main():
+    """Step through 0-180 degrees and print the modelled settle time of every move."""
+    import argparse
+    import pigpio
+
+    parser = argparse.ArgumentParser(description="SG90 profile and settle-time check")
+    parser.add_argument('--pin', type=int, default=18)
+    parser.add_argument('--speed', type=float, default=SERVO_SPEED_DPS, help="degrees per second")
+    parser.add_argument('--accel', type=float, default=SERVO_ACCEL_DPS2, help="degrees per second^2")
+    args = parser.parse_args()
+
+    pi = pigpio.pi()
+    if not pi.connected:
+        exit("Failed to connect to pigpio daemon. Run 'sudo pigpiod' first.")
+    servo = SG90Servo(pi, args.pin, speed_dps=args.speed, accel_dps2=args.accel)
+    try:
+        for angle in (90, 0, 180, 150, 120, 90, 85, 0):
+            start = servo.angle
+            settle = servo.move_to(angle)
+            print(f"{'?' if start is None else f'{start:5.1f}'} -> {angle:3d} deg: settle {settle * 1000:6.1f} ms")
+            servo.wait()
+            robot_clock.sleep(0.5)      # Time to look at the horn
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servo.close()
+        pi.stop()
+        print(f"Moves: {servo.stats['moves']} | modelled move time {servo.stats['move_time_s']:.2f} s | "
+              f"detaches: {servo.stats['detaches']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Latest-value slots in shared memory, versioned with seqlocks
+            = The sense / decide / act processes (robot_processes.py) only ever need the newest
+            = reading or command, not a queue of old ones, so they exchange fixed-size records
+            = in one multiprocessing.shared_memory block instead of pipes:
+            = - each slot has one writer and any number of readers
+            = - the writer bumps the slot's sequence number to odd, writes the record, writes the
+            =   new even number again after the record, then bumps the leading copy to even
+            = - a reader accepts its copy only if the leading number was even, did not change
+            =   during the copy and equals the trailing copy; otherwise it retries
+            = - the (even) sequence number / 2 is the record's version, so a reader can tell a new
+            =   record from one it has already seen without any message passing
+            = Nothing blocks: a writer never waits for readers and a slow reader just sees a
+            = newer version. Run this file to compare a slot with a multiprocessing.Pipe.
+            =
+            = Memory ordering: Python has no memory barriers, and the Pi's ARM cores may make the
+            = stores visible to another core out of order. The trailing copy is written after the
+            = record in a separate pack_into() call (a separate memcpy in the interpreter), so a
+            = reader that sees the new trailer with a half-written record still fails the compare,
+            = unless the trailer store overtakes the record stores. That window is not closed here.
+            = The records are latest-value samples that the next publish replaces, not commands
+            = that must never be misread.
+            =
+            = Slot layout (little endian, 8-byte aligned): sequence u64, record struct, sequence u64
+'''
+
+import struct
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import robot_clock
+
+SEQUENCE = struct.Struct('<Q')
+MAX_RETRIES = 1000          # Torn reads in a row before giving up (a writer died mid-record)
+DEFAULT_POLL_S = 0.001
+
+Slot = namedtuple('Slot', 'name format fields')
+
+
+class TornReadError(RuntimeError):
+    """A slot stayed inconsistent for MAX_RETRIES reads (its writer stopped mid-record)."""
+
+
+class _Layout:
+    def __init__(self, slot):
+        self.slot = slot
+        self.record = struct.Struct(slot.format)
+        self.type = namedtuple(slot.name.title().replace('_', ''), slot.fields)
+        self.offset = 0
+
+    @property
+    def trailer(self):
+        return self.offset + SEQUENCE.size + self.record.size
+
+    @property
+    def size(self):
+        return (2 * SEQUENCE.size + self.record.size + 7) // 8 * 8
+
+
+class SeqlockBoard:
+    """
+    Named latest-value slots in one shared memory block.
+
+    Args:
+        slots: Slot(name, struct format, field names) tuples; every process must pass the same
+        name: Shared memory name to attach to (None = create a new block)
+    """
+
+    def __init__(self, slots, name=None):
+        self.layouts = {}
+        size = 0
+        for slot in slots:
+            layout = _Layout(slot)
+            layout.offset = size
+            size += layout.size
+            self.layouts[slot.name] = layout
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shm.buf[:size] = bytes(size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.stats = {'torn_reads': 0}
+
+    def publish(self, slot, *values):
+        """
+        Write a new record (only one process may write each slot).
+
+        Returns:
+            int: Version of the new record
+        """
+        layout = self.layouts[slot]
+        buf = self.shm.buf
+        sequence = SEQUENCE.unpack_from(buf, layout.offset)[0] + 1
+        SEQUENCE.pack_into(buf, layout.offset, sequence)           # odd: write in progress
+        layout.record.pack_into(buf, layout.offset + SEQUENCE.size, *values)
+        SEQUENCE.pack_into(buf, layout.trailer, sequence + 1)      # trailer: record written
+        SEQUENCE.pack_into(buf, layout.offset, sequence + 1)       # even: record complete
+        return (sequence + 1) // 2
+
+    def version(self, slot):
+        """Version of the latest complete record (0 = never written)."""
+        return SEQUENCE.unpack_from(self.shm.buf, self.layouts[slot].offset)[0] // 2
+
+    def read(self, slot):
+        """
+        Consistent copy of the latest record.
+
+        Returns:
+            tuple: (version, record namedtuple); version 0 means never written
+        """
+        layout = self.layouts[slot]
+        buf = self.shm.buf
+        for _ in range(MAX_RETRIES):
+            before = SEQUENCE.unpack_from(buf, layout.offset)[0]
+            if before & 1:
+                self.stats['torn_reads'] += 1
+                continue
+            values = layout.record.unpack_from(buf, layout.offset + SEQUENCE.size)
+            trailer = SEQUENCE.unpack_from(buf, layout.trailer)[0]
+            if SEQUENCE.unpack_from(buf, layout.offset)[0] == before == trailer:
+                return before // 2, layout.type(*values)
+            self.stats['torn_reads'] += 1
+        raise TornReadError(f"Slot {slot} stayed inconsistent for {MAX_RETRIES} reads")
+
+    def wait(self, slot, after, timeout=None, poll_s=DEFAULT_POLL_S):
+        """
+        Poll until the slot's version is newer than `after`.
+
+        Returns:
+            tuple: read() result, or None on timeout
+        """
+        deadline = None if timeout is None else robot_clock.monotonic() + timeout
+        while self.version(slot) <= after:
+            if deadline is not None and robot_clock.monotonic() >= deadline:
+                return None
+            robot_clock.sleep(poll_s)
+        return self.read(slot)
+
+    def close(self):
+        """Detach; the creating process also frees the block."""
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _pipe_echo(connection):
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        connection.send(message)
+
+
+def main():
+    """Cost of one publish + read on a slot versus a record sent through a Pipe and back."""
+    import argparse
+    import multiprocessing
+    import time
+
+    parser = argparse.ArgumentParser(description="Seqlock slot vs multiprocessing.Pipe")
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+
+    slot = Slot('reading', '<ddddB', 'time distance_cm regulator_v battery_v motion')
+    board = SeqlockBoard([slot])
+    try:
+        record = (time.monotonic(), 42.0, 3.3, 8.1, 0)
+        started = time.perf_counter()
+        for _ in range(args.count):
+            board.publish('reading', *record)
+        publish_us = (time.perf_counter() - started) / args.count * 1e6
+        started = time.perf_counter()
+        for _ in range(args.count):
+            board.read('reading')
+        read_us = (time.perf_counter() - started) / args.count * 1e6
+
+        parent, child = multiprocessing.Pipe()
+        echo = multiprocessing.Process(target=_pipe_echo, args=(child,), daemon=True)
+        echo.start()
+        count = args.count // 10
+        started = time.perf_counter()
+        for _ in range(count):
+            parent.send(record)
+            parent.recv()
+        pipe_us = (time.perf_counter() - started) / count / 2 * 1e6
+        parent.send(None)
+        echo.join()
+        print(f"seqlock slot: publish {publish_us:.2f} us | read {read_us:.2f} us")
+        print(f"Pipe        : {pipe_us:.2f} us per message (half a round trip)")
+    finally:
+        board.close()
+
+
+if __name__ == '__main__':
+    main()
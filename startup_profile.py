@@ -0,0 +1,157 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Startup-time profile of the robot entry scripts
+            = Each script is started in a fresh interpreter (cold imports, as at boot) and timed in
+            = three stages:
+            = - import      : importing the script, gpiozero / pigpio included (the slowest
+            =                 top-level imports come from python -X importtime)
+            = - device init : hw.connect() plus creating every device the script declares
+            =                 (hardware.py records the time of each one)
+            = - first read  : until the ultrasonic sensor returns its first distance
+            = Repeated runs report the median. --daemon also times a "read" job sent to a running
+            = robot_daemon.py, the cost of the first reading when the hardware is already up.
+            =   python startup_profile.py                         (real hardware)
+            =   python startup_profile.py --backend sim --repeat 5
+'''
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+ENTRY_SCRIPTS = (
+    'RSSP_CW2_surveillance_robot',
+    'surveillance_robot_square_patrol',
+    'RSSP_CW2_surveillance_robot_claude',
+    'RSSP_CW2_rp3_obstacle_detect2',
+)
+BACKENDS = ('real', 'mock', 'sim')
+FIRST_READING_DEVICE = 'ultrasonic'
+RESULT_PREFIX = 'STARTUP '
+IMPORT_MARKER = 'STARTUP importing script'     # Separates the profiler's own imports in stderr
+TOP_N = 3
+STAGES = ('import_s', 'init_s', 'first_read_s', 'total_s')
+
+
+def profile_here(script, backend):
+    """
+    Time one cold start of `script` in this interpreter (the child side of profile()).
+
+    Returns:
+        dict: Stage times in seconds plus the slowest devices
+    """
+    started = time.perf_counter()
+    import importlib
+    import hardware
+    if backend == 'sim':
+        import robot_sim
+        robot_sim.Simulation(duration=float('inf'), seed=0).install()
+    else:
+        hardware.set_registry(hardware.Registry(backend))
+    registry = hardware.get_registry()
+
+    print(IMPORT_MARKER, file=sys.stderr, flush=True)
+    imported = time.perf_counter()
+    importlib.import_module(script)
+    import_done = time.perf_counter()
+    registry.connect().create_all()
+    init_done = time.perf_counter()
+    distance = registry.get(FIRST_READING_DEVICE).distance
+    first_read = time.perf_counter()
+    registry.close()
+
+    slowest = sorted(registry.startup_times.items(), key=lambda item: item[1], reverse=True)
+    return {
+        'script': script,
+        'import_s': import_done - imported,
+        'init_s': init_done - import_done,
+        'first_read_s': first_read - init_done,
+        'total_s': first_read - started,
+        'distance_cm': distance * 100,
+        'slowest_devices': slowest[:TOP_N],
+    }
+
+
+def parse_importtime(stderr):
+    """Slowest top-level imports of the script (name, cumulative seconds) from -X importtime output."""
+    imports = []
+    lines = stderr.splitlines()
+    if IMPORT_MARKER in lines:
+        lines = lines[lines.index(IMPORT_MARKER) + 1:]
+    for line in lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name[1:].startswith(' '):    # Nested imports are indented under their parent
+            imports.append((name.strip(), int(cumulative) / 1e6))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:TOP_N]
+
+
+def profile(script, backend):
+    """Start a fresh interpreter that profiles `script` and return its result."""
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', __file__, '--child', script, '--backend', backend],
+        capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            result = json.loads(line[len(RESULT_PREFIX):])
+            result['process_s'] = wall
+            result['top_imports'] = parse_importtime(process.stderr)
+            return result
+    errors = [line for line in process.stderr.splitlines() if not line.startswith('import time:')]
+    raise RuntimeError(f"{script} failed to start: {errors[-1] if errors else process.returncode}")
+
+
+def daemon_read_time(address, repeat):
+    """Median seconds for a 'read' job round trip to a running robot_daemon."""
+    import robot_daemon
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        reply = robot_daemon.send('read', address)
+        times.append(time.perf_counter() - started)
+        if not reply['ok']:
+            raise RuntimeError(reply['error'])
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup-time profile of the robot scripts")
+    parser.add_argument('scripts', nargs='*', default=ENTRY_SCRIPTS)
+    parser.add_argument('--backend', choices=BACKENDS, default='real',
+                        help="hardware backend (sim = robot_sim fake hardware)")
+    parser.add_argument('--repeat', type=int, default=3, help="cold starts per script")
+    parser.add_argument('--daemon', metavar='ADDRESS', help="also time a read job on a running robot_daemon")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(RESULT_PREFIX + json.dumps(profile_here(args.child, args.backend)))
+        return
+
+    print(f"{'script':36s} {'import':>8s} {'init':>8s} {'1st read':>8s} {'total':>8s} {'process':>8s}  (ms, median of {args.repeat})")
+    for script in args.scripts:
+        try:
+            runs = [profile(script, args.backend) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{script:36s} {e}")
+            continue
+        median = {stage: statistics.median(run[stage] for run in runs) * 1000
+                  for stage in STAGES + ('process_s',)}
+        print(f"{script:36s} " + " ".join(f"{median[stage]:8.1f}" for stage in STAGES + ('process_s',)))
+        last = runs[-1]
+        print(f"{'':36s} imports: " + ", ".join(f"{name} {t * 1000:.0f}" for name, t in last['top_imports']))
+        print(f"{'':36s} devices: " + ", ".join(f"{name} {t * 1000:.1f}" for name, t in last['slowest_devices']))
+
+    if args.daemon:
+        print(f"\nrobot_daemon read job: {daemon_read_time(args.daemon, args.repeat * 10) * 1000:.2f} ms "
+              f"(hardware already initialised)")
+
+
+if __name__ == '__main__':
+    main()
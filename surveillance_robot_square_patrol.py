@@ -12,32 +12,43 @@ Description = Surveillance Robot Patrol in Square Pattern with Obstacle Detectio
             = 7. LED indicators for movement direction
 '''
 
-from gpiozero import LED, MotionSensor, DistanceSensor, PWMOutputDevice
-import pigpio
-from time import sleep
-import time
+import hardware
+import robot_clock
+from robot_clock import sleep
+from sweep_scan import SweepScanner, sweep_obstacles
+from hcsr04_pigpio import open_ultrasonic
+from scan_scheduler import ScanScheduler
+from servo_driver import SG90Servo
+from tone_sequencer import ToneSequencer, tone, rest
+from led_patterns import LedEngine, blink
 
 # ============================================================================
 # GPIO CONFIGURATION
 # ============================================================================
+# Devices are created on first use and share one pigpio connection (hardware.py)
+hw = hardware.get_registry()
+
 # LEDs
-LED_LEFT = LED(17)
-LED_RIGHT = LED(23)
+LED_LEFT = hw.led(17)
+LED_RIGHT = hw.led(23)
+leds = hw.device('leds', lambda: LedEngine(left=LED_LEFT, right=LED_RIGHT), close='stop')  # led_patterns.py
 
-# Buzzer (for intruder alarm)
-buzzer = PWMOutputDevice(22, frequency=440, initial_value=0)
+# Buzzer (for intruder alarm), played by the pigpio daemon (tone_sequencer.py)
+buzzer = hw.device('buzzer', lambda: ToneSequencer(hw.pi, 22, frequency=440))
+INTRUDER_TONE = (tone(440, 0.3, 0.7), rest(0.3))    # One beep, repeated per LED flash
 
 # PIR Motion Sensor
-pir = MotionSensor(4, queue_len=1, sample_rate=10, threshold=0.5)
-
-# Ultrasonic Distance Sensor
-ultrasonic = DistanceSensor(echo=15, trigger=14)
+pir = hw.motion_sensor(4, queue_len=1, sample_rate=10, threshold=0.5)
 
 # Servo (SG90) for obstacle scanning
 SERVO_PIN = 18
-pi = pigpio.pi()
-if not pi.connected:
-    exit("Failed to connect to pigpio daemon. Run 'sudo pigpiod' first.")
+
+# Ultrasonic Distance Sensor ('pigpio' = hcsr04_pigpio.py, 'gpiozero' = DistanceSensor)
+ULTRASONIC_BACKEND = 'pigpio'
+ultrasonic = hw.device('ultrasonic', lambda: open_ultrasonic(
+    hw.pi, trigger=14, echo=15, max_distance=4, backend=ULTRASONIC_BACKEND))
+servo = hw.device('servo', lambda: SG90Servo(hw.pi, SERVO_PIN))
+sweep_scanner = hw.device('sweep_scanner', lambda: SweepScanner(hw.pi, SERVO_PIN, ultrasonic), close=None)
 
 # ============================================================================
 # CONFIGURATION
@@ -46,10 +57,15 @@ OBSTACLE_THRESHOLD_CM = 20
 SERVO_CENTER = 90
 SERVO_LEFT = 45
 SERVO_RIGHT = 135
+SWEEP_SCAN = False  # True = continuous servo sweep instead of 3 fixed angles (sweep_scan.py)
 
 MOVEMENT_COUNTER_LIMIT = 5
 INTRUDER_ALERT_COOLDOWN = 30
 
+# Adaptive scanning (scan_scheduler.py): read only the center while the way ahead is clearly open
+ADAPTIVE_SCAN = True
+scan_scheduler = ScanScheduler(OBSTACLE_THRESHOLD_CM)
+
 # ============================================================================
 # STATE TRACKING
 # ============================================================================
@@ -65,23 +81,6 @@ center_obstacle = False
 right_obstacle = False
 
 
-# ============================================================================
-# SERVO CONTROL FUNCTIONS
-# ============================================================================
-
-def set_angle(angle):
-    """Set servo angle (0-180 degrees)."""
-    if not 0 <= angle <= 180:
-        raise ValueError("Angle must be between 0 and 180 degrees")
-    pulse_width = int(500 + (angle * 2000 / 180))
-    pi.set_servo_pulsewidth(SERVO_PIN, pulse_width)
-
-
-def stop_servo():
-    """Stop servo pulses."""
-    pi.set_servo_pulsewidth(SERVO_PIN, 0)
-
-
 # ============================================================================
 # DISTANCE SENSOR FUNCTIONS
 # ============================================================================
@@ -117,32 +116,31 @@ def scan_obstacles():
     """
     global left_obstacle, center_obstacle, right_obstacle
     
+    if SWEEP_SCAN:
+        return scan_obstacles_sweep()
+
     print("\n[SCAN] Scanning for obstacles...")
     
     # LEFT direction (45°)
-    set_angle(SERVO_LEFT)
-    sleep(0.3)
+    servo.move_to(SERVO_LEFT, wait=True)
     left_distance = get_distance_cm()
     left_obstacle = detect_obstacle(left_distance)
     print(f"  LEFT (45°):   {left_distance:.1f} cm | Obstacle: {left_obstacle}")
     
     # CENTER direction (90°)
-    set_angle(SERVO_CENTER)
-    sleep(0.3)
+    servo.move_to(SERVO_CENTER, wait=True)
     center_distance = get_distance_cm()
     center_obstacle = detect_obstacle(center_distance)
     print(f"  CENTER (90°): {center_distance:.1f} cm | Obstacle: {center_obstacle}")
     
     # RIGHT direction (135°)
-    set_angle(SERVO_RIGHT)
-    sleep(0.3)
+    servo.move_to(SERVO_RIGHT, wait=True)
     right_distance = get_distance_cm()
     right_obstacle = detect_obstacle(right_distance)
     print(f"  RIGHT (135°): {right_distance:.1f} cm | Obstacle: {right_obstacle}")
     
-    # Return servo to center
-    set_angle(SERVO_CENTER)
-    stop_servo()
+    # Return servo to center (pulses stop once it is idle)
+    servo.move_to(SERVO_CENTER)
     
     return {
         'left': left_obstacle,
@@ -154,6 +152,56 @@ def scan_obstacles():
     }
 
 
+def scheduled_scan():
+    """
+    scan_obstacles(), skipped when the center reading alone shows the way ahead is open.
+
+    Returns:
+        dict with scan results ('fast': True and the last full scan's sides when skipped)
+    """
+    global center_obstacle
+
+    if not ADAPTIVE_SCAN:
+        return scan_obstacles()
+    servo.move_to(SERVO_CENTER, wait=True)
+    decision = scan_scheduler.check(get_distance_cm())
+    if not decision.full:
+        center_obstacle = False
+        print(f"\n[SCAN] CENTER (90°): {decision.center_cm:.1f} cm | clear - full scan skipped")
+        return scan_scheduler.fast_results(decision)
+    print(f"\n[SCAN] Full scan needed ({decision.reason})")
+    results = scan_obstacles()
+    scan_scheduler.full_scan_done(results)
+    return results
+
+
+def scan_obstacles_sweep():
+    """
+    Continuous-sweep version of scan_obstacles().
+    Ramps the servo across LEFT..RIGHT while reading the ultrasonic sensor.
+
+    Updates the same global obstacle flags as scan_obstacles().
+
+    Returns:
+        dict with scan results plus 'profile' (timestamp, angle, distance_cm) readings
+    """
+    global left_obstacle, center_obstacle, right_obstacle
+
+    results = sweep_obstacles(
+        sweep_scanner,
+        {'left': SERVO_LEFT, 'center': SERVO_CENTER, 'right': SERVO_RIGHT},
+        detect_obstacle,
+    )
+    left_obstacle = results['left']
+    center_obstacle = results['center']
+    right_obstacle = results['right']
+    print(f"\n[SWEEP] {len(results['profile'])} readings | "
+          f"LEFT {results['left_distance']:.1f} cm | "
+          f"CENTER {results['center_distance']:.1f} cm | "
+          f"RIGHT {results['right_distance']:.1f} cm")
+    return results
+
+
 # ============================================================================
 # MOVEMENT FUNCTIONS
 # ============================================================================
@@ -161,44 +209,36 @@ def scan_obstacles():
 def move_forward():
     """Move forward - both LEDs ON."""
     print("[MOVE] Moving forward...")
-    LED_LEFT.on()
-    LED_RIGHT.on()
+    leds.steady()
     sleep(0.5)
 
 
 def turn_right():
     """Turn right - right LED blinks."""
     print("[TURN] Turning right...")
+    scan_scheduler.heading_changed()
     LED_LEFT.off()
     
-    # Blink right LED
-    for _ in range(10):
-        LED_RIGHT.toggle()
-        sleep(0.01)
-    
-    LED_RIGHT.off()
+    # Blink right LED (10 toggles, 10 ms apart) in the background
+    leds.play(blink(0.02), 'right', duration=0.1).wait()
     sleep(0.3)
 
 
 def turn_left():
     """Turn left - left LED blinks."""
     print("[TURN] Turning left...")
+    scan_scheduler.heading_changed()
     LED_RIGHT.off()
     
-    # Blink left LED
-    for _ in range(10):
-        LED_LEFT.toggle()
-        sleep(0.01)
-    
-    LED_LEFT.off()
+    # Blink left LED (10 toggles, 10 ms apart) in the background
+    leds.play(blink(0.02), 'left', duration=0.1).wait()
     sleep(0.3)
 
 
 def stop_movement():
     """Stop - both LEDs OFF."""
     print("[STOP] Stopping...")
-    LED_LEFT.off()
-    LED_RIGHT.off()
+    leds.off()
 
 
 # ============================================================================
@@ -212,7 +252,7 @@ def on_motion():
     """
     global last_intruder_alert, alarm_active
     
-    current_time = time.time()
+    current_time = robot_clock.time()
     if current_time - last_intruder_alert >= INTRUDER_ALERT_COOLDOWN:
         alarm_active = True
         last_intruder_alert = current_time
@@ -225,30 +265,19 @@ def on_no_motion():
     global alarm_active
     alarm_active = False
     buzzer.value = 0
-    LED_LEFT.off()
-    LED_RIGHT.off()
+    leds.off()      # Also ends a flash in trigger_intruder_alarm()
 
 
 def trigger_intruder_alarm(flash_count=5):
     """Sound alarm with buzzer and LED flashing."""
     print("[ALARM] Sounding alarm...")
+    buzzer.play(INTRUDER_TONE, repeat=flash_count)
     
-    for _ in range(flash_count):
-        if not alarm_active:
-            break
-        buzzer.value = 0.7
-        LED_LEFT.on()
-        LED_RIGHT.on()
-        sleep(0.3)
-        
-        buzzer.value = 0
-        LED_LEFT.toggle()
-        LED_RIGHT.toggle()
-        sleep(0.3)
+    # 0.3 s on / 0.3 s off, in step with the beeps; on_no_motion() cuts it short
+    leds.play(blink(0.6, count=flash_count)).wait()
     
     buzzer.value = 0
-    LED_LEFT.off()
-    LED_RIGHT.off()
+    leds.off()
     print("[ALARM] Alarm deactivated")
 
 
@@ -274,6 +303,7 @@ def patrol_with_obstacle_avoidance():
     
     # Initial obstacle scan
     scan_results = scan_obstacles()
+    scan_scheduler.full_scan_done(scan_results)
     
     # Check if center is clear to proceed
     if scan_results['center']:
@@ -306,7 +336,7 @@ def patrol_with_obstacle_avoidance():
         
         # STEP 3: OBSTACLE CHECK AT EVERY COUNTER INCREMENT
         print("\n[SCAN] Checking obstacles at counter increment...")
-        scan_results = scan_obstacles()
+        scan_results = scheduled_scan()
         
         # Determine next action based on obstacle detection
         if scan_results['center']:
@@ -347,6 +377,10 @@ def patrol_with_obstacle_avoidance():
 def main():
     """Main program loop."""
     global patrol_active
+    try:
+        hw.connect()
+    except hardware.HardwareError as e:
+        exit(str(e))
     
     try:
         print("\n" + "=" * 70)
@@ -389,11 +423,10 @@ def main():
         patrol_active = False
         stop_movement()
         buzzer.value = 0
-        set_angle(SERVO_CENTER)
-        sleep(0.3)
-        stop_servo()
-        pir.close()
-        pi.stop()
+        servo.move_to(SERVO_CENTER, wait=True)
+        hw.close()
+        if ADAPTIVE_SCAN:
+            print(scan_scheduler.summary())
         print("Cleanup completed")
 
 
@@ -0,0 +1,173 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Continuous-sweep ultrasonic scanning with the SG90 servo
+            = Instead of stopping at 3 fixed angles and waiting 0.5-0.8 s at each one, the servo is
+            = ramped across the scan range while the DistanceSensor is read continuously.
+            = Every reading is tagged with the servo angle estimated for the moment it was taken,
+            = giving a dense polar profile (~30 samples) in under 1 s.
+            = For a sharp profile create the DistanceSensor with queue_len=1, otherwise gpiozero
+            = averages several echoes taken at neighbouring angles.
+'''
+
+import robot_clock
+
+# SG90 datasheet: 0.1 s / 60 degrees at 4.8 V
+SERVO_SPEED_DPS = 600.0
+# Delay between a pulse width change and the horn starting to follow it
+SERVO_LAG_S = 0.02
+SWEEP_DURATION_S = 0.8
+SAMPLE_INTERVAL_S = 0.025
+
+
+def angle_to_pulse_width(angle):
+    """
+    Convert servo angle to pulse width.
+
+    Args:
+        angle: 0-180 degrees
+
+    Returns:
+        int: Pulse width in microseconds (500-2500)
+    """
+    if not 0 <= angle <= 180:
+        raise ValueError("Angle must be between 0 and 180 degrees")
+    return int(500 + (angle * 2000 / 180))
+
+
+class SweepScanner:
+    """
+    Sweep the servo back and forth and sample the ultrasonic sensor while it moves.
+
+    Args:
+        pi: pigpio.pi connection
+        servo_pin: GPIO of the SG90 signal line
+        sensor: gpiozero DistanceSensor (anything with a .distance in metres)
+        servo_speed_dps: Maximum servo speed used to estimate the horn position
+    """
+
+    def __init__(self, pi, servo_pin, sensor, servo_speed_dps=SERVO_SPEED_DPS):
+        self.pi = pi
+        self.servo_pin = servo_pin
+        self.sensor = sensor
+        self.servo_speed_dps = servo_speed_dps
+        self.last_angle = None
+        self.last_profile = []
+
+    def _read_distance_cm(self):
+        try:
+            return self.sensor.distance * 100
+        except Exception as e:
+            print(f"Error reading distance: {e}")
+            return None
+
+    def _move_to_start(self, angle):
+        """Move to the first sweep angle and wait only as long as the move needs."""
+        self.pi.set_servo_pulsewidth(self.servo_pin, angle_to_pulse_width(angle))
+        travel = 180 if self.last_angle is None else abs(angle - self.last_angle)
+        if travel:
+            robot_clock.sleep(travel / self.servo_speed_dps + SERVO_LAG_S)
+        self.last_angle = angle
+
+    def sweep(self, start_angle=0, end_angle=180, duration=SWEEP_DURATION_S,
+              sample_interval=SAMPLE_INTERVAL_S, detach=True):
+        """
+        Ramp the servo from start_angle to end_angle while reading the sensor.
+
+        Args:
+            start_angle: First angle of the sweep (degrees)
+            end_angle: Last angle of the sweep (degrees)
+            duration: Ramp time in seconds (extended if the servo cannot move that fast)
+            sample_interval: Time between sensor reads in seconds
+            detach: Stop servo pulses after the sweep to save power
+
+        Returns:
+            list: (timestamp, angle, distance_cm) tuples ordered by time
+        """
+        span = end_angle - start_angle
+        duration = max(duration, abs(span) / self.servo_speed_dps)
+        rate = span / duration if duration else 0.0
+
+        self._move_to_start(start_angle)
+
+        profile = []
+        t0 = robot_clock.monotonic()
+        t_end = t0 + duration
+        next_sample = t0
+        while True:
+            now = robot_clock.monotonic()
+            elapsed = min(now - t0, duration)
+            commanded = start_angle + rate * elapsed
+            self.pi.set_servo_pulsewidth(self.servo_pin, angle_to_pulse_width(commanded))
+
+            distance = self._read_distance_cm()
+            stamp = robot_clock.monotonic()
+            if distance is not None:
+                # The horn trails the command by the servo lag
+                lagged = min(max(stamp - t0 - SERVO_LAG_S, 0.0), duration)
+                profile.append((stamp, start_angle + rate * lagged, distance))
+
+            if now >= t_end:
+                break
+            next_sample += sample_interval
+            delay = next_sample - robot_clock.monotonic()
+            if delay > 0:
+                robot_clock.sleep(delay)
+
+        self.last_angle = end_angle
+        if detach:
+            self.pi.set_servo_pulsewidth(self.servo_pin, 0)
+        self.last_profile = profile
+        return profile
+
+    def sweep_alternating(self, angle_a, angle_b, **kwargs):
+        """Sweep between two angles, starting from whichever end the servo is nearest to."""
+        low, high = min(angle_a, angle_b), max(angle_a, angle_b)
+        if self.last_angle is not None and abs(self.last_angle - high) < abs(self.last_angle - low):
+            return self.sweep(high, low, **kwargs)
+        return self.sweep(low, high, **kwargs)
+
+
+def profile_to_sectors(profile, sector_angles):
+    """
+    Reduce a sweep profile to the closest distance seen in each named sector.
+
+    Every sample belongs to the sector whose scan angle is nearest to it.
+
+    Args:
+        profile: list of (timestamp, angle, distance_cm) from SweepScanner.sweep()
+        sector_angles: dict of sector name -> centre angle, e.g. {'left': 180, 'center': 90, 'right': 0}
+
+    Returns:
+        dict: sector name -> minimum distance in cm (None if the sector got no samples)
+    """
+    closest = {name: None for name in sector_angles}
+    for _, angle, distance in profile:
+        name = min(sector_angles, key=lambda n: abs(sector_angles[n] - angle))
+        if closest[name] is None or distance < closest[name]:
+            closest[name] = distance
+    return closest
+
+
+def sweep_obstacles(scanner, sector_angles, detect_obstacle, no_reading=999):
+    """
+    Sweep once and build a result dict in the same format as scan_obstacles().
+
+    Args:
+        scanner: SweepScanner
+        sector_angles: dict of sector name -> centre angle
+        detect_obstacle: function(distance_cm) -> bool from the calling script
+        no_reading: Distance reported for a sector that got no samples
+
+    Returns:
+        dict: '<sector>' -> bool, '<sector>_distance' -> float, plus 'profile'
+    """
+    angles = sector_angles.values()
+    profile = scanner.sweep_alternating(min(angles), max(angles))
+    results = {'profile': profile}
+    for name, distance in profile_to_sectors(profile, sector_angles).items():
+        if distance is None:
+            distance = no_reading
+        results[name] = detect_obstacle(distance)
+        results[f'{name}_distance'] = distance
+    return results
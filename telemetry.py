@@ -0,0 +1,202 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Structured binary telemetry for the patrol loop
+            = Typed events (scan, decision, move, alarm, voltage) are packed into fixed-size
+            = records and written into a memory-mapped ring file. Logging an event is one
+            = struct.pack_into() into the mapping: no string formatting and no terminal or SSH I/O
+            = in the control loop. When the ring is full the oldest records are overwritten.
+            = Pretty-printing is done separately by telemetry_reader.py, which can also follow the
+            = file while the robot is running.
+            =
+            = File layout (little endian):
+            =   header : magic 'RTLM', version u16, record size u16, capacity u32, records written u64
+            =   records: capacity x record, record n is stored in slot n % capacity
+            =   record : seq u64, time f64, type u8, code u8, flags u16, count i32, values 4 x f32
+'''
+
+import mmap
+import os
+import struct
+import threading
+from collections import namedtuple
+
+import robot_clock
+
+MAGIC = b'RTLM'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+RECORD = struct.Struct('<QdBBHi4f')
+WRITTEN_OFFSET = 12     # Offset of the "records written" counter inside the header
+DEFAULT_CAPACITY = 65536    # 40 bytes per record -> 2.5 MB file
+N_VALUES = 4
+
+# Event types
+SCAN = 1
+DECISION = 2
+MOVE = 3
+ALARM = 4
+VOLTAGE = 5
+EVENT_NAMES = {SCAN: 'scan', DECISION: 'decision', MOVE: 'move', ALARM: 'alarm', VOLTAGE: 'voltage'}
+
+# Codes stored in the `code` field
+ACTIONS = ('forward', 'left', 'right', 'backward_left')        # avoidance_policy.ACTIONS
+MOVES = ('stop', 'forward', 'backward', 'left', 'right')
+ALARMS = ('motion', 'no_motion', 'low_voltage', 'obstacle')
+
+# Obstacle bits stored in the `flags` field of scan and decision events
+LEFT_BIT = 1
+CENTER_BIT = 2
+RIGHT_BIT = 4
+
+Record = namedtuple('Record', 'seq time type code flags count values')
+
+
+def obstacle_flags(left, center, right):
+    """Pack the three obstacle booleans into a bit field."""
+    return (LEFT_BIT if left else 0) | (CENTER_BIT if center else 0) | (RIGHT_BIT if right else 0)
+
+
+def file_size(capacity):
+    return HEADER.size + capacity * RECORD.size
+
+
+class TelemetryWriter:
+    """
+    Append typed events to a memory-mapped ring file.
+
+    Args:
+        path: Ring file; created (or reset) on open
+        capacity: Number of records kept before the oldest are overwritten
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.written = 0
+        self._lock = threading.Lock()   # PIR callbacks log from gpiozero's thread
+        with open(path, 'w+b') as f:
+            f.truncate(file_size(capacity))
+            self._map = mmap.mmap(f.fileno(), file_size(capacity))
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, RECORD.size, capacity, 0)
+
+    def record(self, event_type, code=0, flags=0, count=0, values=()):
+        """
+        Write one event.
+
+        Args:
+            event_type: SCAN, DECISION, MOVE, ALARM or VOLTAGE
+            code: Small enum for the event (action, move or alarm index)
+            flags: Bit field (e.g. obstacle bits)
+            count: Integer payload (e.g. movement counter, motion event number)
+            values: Up to 4 floats
+        """
+        values = tuple(values)[:N_VALUES]
+        values += (0.0,) * (N_VALUES - len(values))
+        with self._lock:
+            if self._map is None:
+                return
+            seq = self.written
+            offset = HEADER.size + (seq % self.capacity) * RECORD.size
+            RECORD.pack_into(self._map, offset, seq, robot_clock.time(), event_type, code, flags, count, *values)
+            # The counter is published after the record so a reader never sees a half-written slot
+            self.written = seq + 1
+            struct.pack_into('<Q', self._map, WRITTEN_OFFSET, self.written)
+
+    def scan(self, left, center, right, obstacles, readings=0, sweep=False):
+        """Distances in cm; obstacles = (left, center, right) booleans."""
+        self.record(SCAN, int(sweep), obstacle_flags(*obstacles), readings, (left, center, right))
+
+    def decision(self, obstacles, action, movement_counter=0):
+        self.record(DECISION, ACTIONS.index(action), obstacle_flags(*obstacles), movement_counter)
+
+    def move(self, move, duration=0.0, movement_counter=0):
+        self.record(MOVE, MOVES.index(move), 0, movement_counter, (duration,))
+
+    def alarm(self, kind, count=0):
+        self.record(ALARM, ALARMS.index(kind), 0, count)
+
+    def voltage(self, adc_value, voltage, min_voltage, ok):
+        self.record(VOLTAGE, 0, int(bool(ok)), 0, (adc_value, voltage, min_voltage))
+
+    def flush(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+                self._map.close()
+                self._map = None
+
+
+class TelemetryReader:
+    """
+    Read records from a ring file written by TelemetryWriter (safe while it is being written).
+
+    Args:
+        path: Ring file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.capacity, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a telemetry file")
+        if version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"Unsupported telemetry format: version {version}, record size {record_size}")
+
+    @property
+    def written(self):
+        return struct.unpack_from('<Q', self._map, WRITTEN_OFFSET)[0]
+
+    def read(self, since=0):
+        """
+        Return the records with seq >= since that are still in the ring, oldest first.
+
+        Records overwritten by the writer while they were being read are skipped.
+        """
+        end = self.written
+        start = max(since, end - self.capacity, 0)
+        records = []
+        for seq in range(start, end):
+            offset = HEADER.size + (seq % self.capacity) * RECORD.size
+            fields = RECORD.unpack_from(self._map, offset)
+            if fields[0] != seq:
+                continue
+            records.append(Record(*fields[:6], fields[6:]))
+        return records
+
+    def close(self):
+        self._map.close()
+
+
+def open_writer(path, capacity=DEFAULT_CAPACITY):
+    """TelemetryWriter for path, or a NullTelemetry if path is None (telemetry disabled)."""
+    if path is None:
+        return NullTelemetry()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return TelemetryWriter(path, capacity)
+
+
+class NullTelemetry:
+    """Drop-in TelemetryWriter that records nothing."""
+
+    written = 0
+
+    def record(self, *args, **kwargs):
+        pass
+
+    scan = decision = move = alarm = voltage = record
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,83 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Pretty-printer for the binary telemetry ring written by telemetry.py
+            = Usage: python telemetry_reader.py robot_telemetry.bin
+            =        python telemetry_reader.py robot_telemetry.bin --follow
+            =        python telemetry_reader.py robot_telemetry.bin --type scan --type alarm --last 20
+'''
+
+import argparse
+import time
+
+import telemetry
+
+
+def obstacles_text(flags):
+    return (f"LEFT:{bool(flags & telemetry.LEFT_BIT)} "
+            f"CENTER:{bool(flags & telemetry.CENTER_BIT)} "
+            f"RIGHT:{bool(flags & telemetry.RIGHT_BIT)}")
+
+
+def format_record(record):
+    """One line of text for a telemetry.Record."""
+    stamp = time.strftime('%H:%M:%S', time.localtime(record.time)) + f".{int(record.time * 1000) % 1000:03d}"
+    values = record.values
+    if record.type == telemetry.SCAN:
+        kind = 'SWEEP' if record.code else 'SCAN'
+        text = (f"[{kind}] LEFT {values[0]:6.2f} cm | CENTER {values[1]:6.2f} cm | RIGHT {values[2]:6.2f} cm"
+                f" | {obstacles_text(record.flags)}")
+        if record.count:
+            text += f" | {record.count} readings"
+    elif record.type == telemetry.DECISION:
+        text = f"[LOGIC] {obstacles_text(record.flags)} → {telemetry.ACTIONS[record.code]} (counter {record.count})"
+    elif record.type == telemetry.MOVE:
+        text = f"[MOVE] {telemetry.MOVES[record.code]}"
+        if values[0]:
+            text += f" for {values[0]:.1f}s"
+        text += f" (counter {record.count})"
+    elif record.type == telemetry.ALARM:
+        text = f"[ALARM] {telemetry.ALARMS[record.code]} (event #{record.count})"
+    elif record.type == telemetry.VOLTAGE:
+        status = 'OK' if record.flags else 'LOW'
+        text = f"[VOLTAGE] ADC: {values[0]:.3f} → {values[1]:.2f}V (min {values[2]:.2f}V) {status}"
+    else:
+        text = f"[UNKNOWN {record.type}] code={record.code} flags={record.flags} count={record.count} values={values}"
+    return f"{record.seq:8d} {stamp} {text}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a robot telemetry ring file")
+    parser.add_argument('path', help="telemetry file written by the robot")
+    parser.add_argument('--follow', '-f', action='store_true', help="keep printing new records")
+    parser.add_argument('--type', action='append', choices=sorted(telemetry.EVENT_NAMES.values()),
+                        help="only show these event types (repeatable)")
+    parser.add_argument('--last', type=int, help="only show the last N records")
+    parser.add_argument('--interval', type=float, default=0.2, help="poll interval for --follow (s)")
+    args = parser.parse_args()
+
+    wanted = None
+    if args.type:
+        wanted = {code for code, name in telemetry.EVENT_NAMES.items() if name in args.type}
+
+    reader = telemetry.TelemetryReader(args.path)
+    since = 0
+    if args.last is not None:
+        since = max(reader.written - args.last, 0)
+    try:
+        while True:
+            for record in reader.read(since):
+                if wanted is None or record.type in wanted:
+                    print(format_record(record))
+                since = record.seq + 1
+            if not args.follow:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = pir_events.py regressions, on a VirtualClock and a fake pigpio connection
+            =   python -m pytest test_pir_events.py
+'''
+
+import robot_clock
+from pir_events import PirEvents, RISE, FALL, TICK_WRAP
+
+PIR_PIN = 4
+
+
+class _Callback:
+    def cancel(self):
+        pass
+
+
+class _FakePi:
+    """pigpio connection whose u32 microsecond tick follows the clock."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.func = None
+
+    def get_current_tick(self):
+        return int(self.clock.monotonic() * 1e6) % TICK_WRAP
+
+    def callback(self, gpio, edge, func):
+        self.func = func
+        return _Callback()
+
+    def edge(self, level):
+        self.func(PIR_PIN, level, self.get_current_tick())
+
+
+def _run(test):
+    previous = robot_clock.get_clock()
+    clock = robot_clock.set_clock(robot_clock.VirtualClock(step=60.0))
+    try:
+        test(clock)
+    finally:
+        robot_clock.set_clock(previous)
+
+
+def test_edge_after_idle_longer_than_tick_wrap():
+    def test(clock):
+        pi = _FakePi(clock)
+        log = PirEvents(None).attach(pi, PIR_PIN)
+        pi.edge(RISE)
+        clock.advance(2)
+        pi.edge(FALL)
+        clock.advance(80 * 60)          # Quiet for longer than one 71.6 minute tick wrap
+        pi.edge(RISE)
+        clock.advance(1)
+        assert log.count(300) == 1
+        assert abs(log.last_motion() - (clock.time() - 1)) < 1e-3
+    _run(test)
+
+
+def test_duty_counts_from_recording_start():
+    def test(clock):
+        log = PirEvents(None)
+        clock.advance(99)
+        log.edge(RISE)
+        clock.advance(1)
+        # 1 s of motion in the 100 s recorded so far, not 1 s out of the 1 s since the first event
+        assert abs(log.duty(300) - 0.01) < 1e-6
+    _run(test)
@@ -0,0 +1,342 @@
+'''
+Author      = KOH KHENG CHOONG
+Date        = 2026-10-17
+Description = Buzzer tone sequencer played by the pigpio daemon from DMA waveforms
+            = buzzer_tones.py and the alarm loops switched the buzzer from Python
+            = (buzzer.play(Tone...) / buzzer.value = x, then sleep), so every note edge waited for
+            = the interpreter and jittered when the Pi was busy. Here a melody, siren or beep pattern
+            = is a tuple of Note(frequency, duration, duty) that ToneSequencer compiles once into:
+            = - one waveform per distinct (frequency, duty, periods) block of square-wave periods
+            = - a wave chain: blocks repeated inline or with a chain loop, rests as chain delays,
+            =   the whole pattern optionally looped
+            = play() hands the chain to the daemon and returns at once; stop() cancels it.
+            = Compiled waves and chains are cached, so an alarm played again costs one wave_chain().
+            = ToneSequencer also has the .value of PWMOutputDevice (duty at the default frequency,
+            = 0 = silent), so it replaces the buzzer device without changing the callers.
+'''
+
+import re
+import threading
+from collections import namedtuple
+
+import robot_clock
+
+DEFAULT_FREQUENCY_HZ = 440      # PWMOutputDevice(22, frequency=440) in the patrol scripts
+BLOCK_S = 0.05                  # Target length of one waveform block
+MAX_INLINE_BLOCKS = 8           # Longer notes loop their block in the chain instead
+MAX_CHAIN_LOOPS = 20            # pigpio chain loop counters
+MAX_CHAIN_ENTRIES = 600         # pigpio chain size (bytes)
+MAX_DELAY_US = 0xFFFF           # Longest single chain delay
+MAX_LOOP_COUNT = 0xFFFF
+
+Note = namedtuple('Note', 'frequency duration duty')
+
+NOTE_NAMES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+
+def note_frequency(name):
+    """Equal-tempered frequency of a note name: 'A4' = 440 Hz, 'C#5', 'Bb3' ('R' = rest, 0 Hz)."""
+    if name.upper() == 'R':
+        return 0.0
+    match = re.fullmatch(r'([A-Ga-g])([#b]?)(-?\d)', name)
+    if match is None:
+        raise ValueError(f"Bad note name: {name}")
+    letter, accidental, octave = match.groups()
+    semitone = NOTE_NAMES[letter.upper()] + {'#': 1, 'b': -1, '': 0}[accidental]
+    midi = 12 * (int(octave) + 1) + semitone
+    return 440.0 * 2 ** ((midi - 69) / 12)
+
+
+def tone(frequency, duration, duty=0.5):
+    return Note(float(frequency), float(duration), float(duty))
+
+
+def rest(duration):
+    return Note(0.0, float(duration), 0.0)
+
+
+def melody(names, duration=0.3, duty=0.5, gap=0.1):
+    """Notes for a sequence of note names, each followed by a `gap` rest."""
+    notes = []
+    for name in names:
+        notes.append(tone(note_frequency(name), duration, duty))
+        if gap:
+            notes.append(rest(gap))
+    return tuple(notes)
+
+
+def siren(low=500, high=2000, step_hz=100, step_s=0.05, duty=0.5):
+    """One rising and falling sweep (repeat it with play(..., repeat=n))."""
+    up = [tone(f, step_s, duty) for f in range(low, high, step_hz)]
+    down = [tone(f, step_s, duty) for f in range(high, low, -step_hz)]
+    return tuple(up + down)
+
+
+def from_steps(steps, frequency=DEFAULT_FREQUENCY_HZ):
+    """Notes for alarm_worker.beep_pattern() steps: (buzzer value, seconds), value = duty."""
+    return tuple(tone(frequency, seconds, value) if value > 0 else rest(seconds) for value, seconds in steps)
+
+
+def _loop(count):
+    return [255, 1, count & 0xFF, count >> 8]
+
+
+def _delay(microseconds):
+    entries = []
+    while microseconds > 0:
+        chunk = min(microseconds, MAX_DELAY_US)
+        entries += [255, 2, chunk & 0xFF, chunk >> 8]
+        microseconds -= chunk
+    return entries
+
+
+def chain_duration_us(chain, wave_us):
+    """
+    Length of a wave chain in microseconds (loop forever counts once).
+
+    Args:
+        chain: wave_chain() data
+        wave_us: dict of wave id -> waveform length in microseconds
+    """
+    stack = [0]
+    i = 0
+    while i < len(chain):
+        entry = chain[i]
+        if entry != 255:
+            stack[-1] += wave_us[entry]
+            i += 1
+            continue
+        command = chain[i + 1]
+        if command == 0:
+            stack.append(0)
+            i += 2
+        elif command == 1:
+            block = stack.pop()
+            stack[-1] += block * (chain[i + 2] + 256 * chain[i + 3])
+            i += 4
+        elif command == 2:
+            stack[-1] += chain[i + 2] + 256 * chain[i + 3]
+            i += 4
+        else:
+            i += 2
+    return sum(stack)
+
+
+class ToneSequencer:
+    """
+    Square-wave buzzer on one GPIO, driven by pigpio waveforms.
+
+    Args:
+        pi: pigpio.pi connection
+        pin: GPIO of the buzzer
+        frequency: Tone used by the .value interface
+    """
+
+    def __init__(self, pi, pin, frequency=DEFAULT_FREQUENCY_HZ):
+        import pigpio
+
+        self.pi = pi
+        self.pin = pin
+        self.frequency = frequency
+        self.stats = {'plays': 0, 'compiles': 0, 'waves': 0}
+        self._waves = {}            # (period_us, high_us, periods) -> wave id
+        self._wave_us = {}          # wave id -> microseconds
+        self._chains = {}           # (notes, repeat) -> chain
+        self._value = 0.0
+        self._until = float('-inf')
+        self._lock = threading.RLock()
+        pi.set_mode(pin, pigpio.OUTPUT)
+        pi.write(pin, 0)
+
+    # --- compiling -----------------------------------------------------------
+
+    def _wave(self, period_us, high_us, periods):
+        key = (period_us, high_us, periods)
+        wave_id = self._waves.get(key)
+        if wave_id is None:
+            import pigpio
+            mask = 1 << self.pin
+            self.pi.wave_add_generic([pigpio.pulse(mask, 0, high_us),
+                                      pigpio.pulse(0, mask, period_us - high_us)] * periods)
+            wave_id = self.pi.wave_create()
+            self._waves[key] = wave_id
+            self._wave_us[wave_id] = period_us * periods
+            self.stats['waves'] += 1
+        return wave_id
+
+    def _note_chain(self, note):
+        """Chain entries for one note; returns (entries, loop counters used)."""
+        length_us = int(round(note.duration * 1e6))
+        if note.frequency <= 0 or note.duty <= 0:
+            return _delay(length_us), 0
+        period_us = int(round(1e6 / note.frequency))
+        high_us = min(max(int(round(period_us * note.duty)), 1), period_us)
+        periods = max(int(round(length_us / period_us)), 1)
+        if high_us == period_us:
+            # Keep 1 us low per period so every block, and the pattern, ends with the pin low
+            high_us -= 1
+        block = max(int(BLOCK_S * 1e6 // period_us), 1)
+        count, remainder = divmod(periods, block)
+        entries, loops = [], 0
+        if count:
+            wave_id = self._wave(period_us, high_us, block)
+            if count <= MAX_INLINE_BLOCKS:
+                entries += [wave_id] * count
+            else:
+                while count:
+                    chunk = min(count, MAX_LOOP_COUNT)
+                    entries += [255, 0, wave_id] + _loop(chunk)
+                    loops += 1
+                    count -= chunk
+        if remainder:
+            entries.append(self._wave(period_us, high_us, remainder))
+        return entries, loops
+
+    def compile(self, notes, repeat=1):
+        """
+        Build (or fetch) the wave chain of a pattern.
+
+        Args:
+            notes: Tuple of Note
+            repeat: Times to play the pattern (None = until stop())
+
+        Returns:
+            list: wave_chain() data
+        """
+        key = (tuple(notes), repeat)
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is not None:
+                return chain
+            import pigpio
+            try:
+                chain = self._build(notes, repeat)
+            except pigpio.error:
+                # Out of wave ids or pulses: drop every cached wave and build this one alone
+                self.clear()
+                chain = self._build(notes, repeat)
+            self._chains[key] = chain
+            self.stats['compiles'] += 1
+            return chain
+
+    def _build(self, notes, repeat):
+        chain, loops = [], 0
+        for note in notes:
+            entries, used = self._note_chain(note)
+            chain += entries
+            loops += used
+        if repeat is None:
+            chain += [255, 3]
+        elif repeat > 1:
+            chain = [255, 0] + chain + _loop(repeat)
+            loops += 1
+        if loops > MAX_CHAIN_LOOPS or len(chain) > MAX_CHAIN_ENTRIES:
+            raise ValueError(f"Pattern too long for one wave chain ({len(chain)} entries, {loops} loops)")
+        return chain
+
+    def clear(self):
+        """Stop playing and delete every compiled wave (they are rebuilt on the next play)."""
+        with self._lock:
+            self.stop()
+            self.pi.wave_clear()
+            self._waves.clear()
+            self._wave_us.clear()
+            self._chains.clear()
+
+    # --- playing -------------------------------------------------------------
+
+    def play(self, notes, repeat=1):
+        """
+        Start a pattern in the pigpio daemon and return at once (cuts off the one playing).
+
+        Returns:
+            float: Seconds the pattern lasts (inf with repeat=None)
+        """
+        with self._lock:
+            chain = self.compile(notes, repeat)
+            self.pi.wave_tx_stop()
+            self.pi.wave_chain(chain)
+            seconds = float('inf') if repeat is None else chain_duration_us(chain, self._wave_us) / 1e6
+            self._until = robot_clock.monotonic() + seconds
+            self._value = 0.0
+            self.stats['plays'] += 1
+            return seconds
+
+    @property
+    def playing(self):
+        return robot_clock.monotonic() < self._until and bool(self.pi.wave_tx_busy())
+
+    def stop(self):
+        """Cancel whatever is playing and leave the pin low."""
+        with self._lock:
+            self.pi.wave_tx_stop()
+            self.pi.write(self.pin, 0)
+            self._until = float('-inf')
+            self._value = 0.0
+
+    # --- PWMOutputDevice interface -----------------------------------------
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        """Continuous tone at self.frequency with duty `value` (0 = off)."""
+        with self._lock:
+            if value <= 0:
+                self.stop()
+                return
+            if value == self._value and self.playing:
+                return
+            self.play((tone(self.frequency, BLOCK_S, min(value, 1.0)),), repeat=None)
+            self._value = value
+
+    def off(self):
+        self.value = 0
+
+    def close(self):
+        self.clear()
+
+
+def main():
+    """Compile the demo patterns, report their cost and play them without blocking."""
+    import argparse
+    import time
+    import pigpio
+
+    parser = argparse.ArgumentParser(description="pigpio wave buzzer sequencer")
+    parser.add_argument('--pin', type=int, default=22)
+    args = parser.parse_args()
+
+    pi = pigpio.pi()
+    if not pi.connected:
+        exit("Failed to connect to pigpio daemon. Run 'sudo pigpiod' first.")
+    sequencer = ToneSequencer(pi, args.pin)
+    patterns = {
+        'scale': (melody(['C4', 'D4', 'E4', 'F4', 'G4', 'A4', 'B4', 'C5']), 1),
+        'siren': (siren(), 3),
+        'intruder': (from_steps(((0.7, 0.3), (0, 0.3)) * 5), 1),
+    }
+    try:
+        for name, (notes, repeat) in patterns.items():
+            started = time.perf_counter()
+            chain = sequencer.compile(notes, repeat)
+            compile_ms = (time.perf_counter() - started) * 1e3
+            started = time.perf_counter()
+            seconds = sequencer.play(notes, repeat)
+            submit_ms = (time.perf_counter() - started) * 1e3
+            print(f"{name:9s} {len(notes):3d} notes x{repeat} = {seconds:5.2f} s | chain {len(chain):3d} entries | "
+                  f"compile {compile_ms:6.2f} ms | play() returned after {submit_ms:5.2f} ms")
+            robot_clock.sleep(seconds + 0.3)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sequencer.close()
+        pi.stop()
+        print(f"Waves: {sequencer.stats['waves']} | compiles: {sequencer.stats['compiles']} | "
+              f"plays: {sequencer.stats['plays']}")
+
+
+if __name__ == '__main__':
+    main()